@@ -4,6 +4,8 @@
 from fastapi import APIRouter
 from .datasets import router as datasets_router
 from .training import router as training_router
+from .sweeps import router as sweeps_router
+from .pipelines import router as pipelines_router
 from .prediction import router as prediction_router
 from .auth import router as auth_router
 from .users import router as users_router
@@ -17,6 +19,8 @@ api_router.include_router(auth_router, tags=["认证"])
 api_router.include_router(users_router, tags=["用户管理"])
 api_router.include_router(datasets_router, tags=["数据集管理"])
 api_router.include_router(training_router, tags=["模型训练"])
+api_router.include_router(sweeps_router, tags=["超参搜索"])
+api_router.include_router(pipelines_router, tags=["训练流水线"])
 api_router.include_router(prediction_router, tags=["模型预测"])
 api_router.include_router(chat_router, tags=["本地对话"])
 
@@ -0,0 +1,49 @@
+# 训练流水线相关API路由
+from fastapi import APIRouter, Depends
+
+from ..api.auth import get_current_active_user
+from ..models import User
+from ..core.logger import setup_logger
+from ..core.decorators import standardized_response
+from ..schemas import PipelineRequest
+from ..services.pipeline_service import pipeline_service
+
+# 创建路由器
+router = APIRouter(prefix="/pipelines", tags=["pipelines"])
+logger = setup_logger(__name__)
+
+
+@router.post("", response_model=dict)
+@standardized_response("流水线已创建并开始运行")
+async def create_pipeline(request: PipelineRequest, current_user: User = Depends(get_current_active_user)):
+    """
+    创建训练流水线并开始运行
+    
+    - **name**: 流水线名称
+    - **steps**: 步骤列表，每个步骤包含name、type（preprocess/train/evaluate/export）、depends_on和params，
+      例如 [{"name": "clean", "type": "preprocess", "params": {"dataset_id": 1}},
+      {"name": "train", "type": "train", "depends_on": ["clean"], "params": {"epochs": 3}}]
+    """
+    return await pipeline_service.create_pipeline(request, user_id=current_user.id)
+
+
+@router.post("/{pipeline_id}/run", response_model=dict)
+@standardized_response("流水线已开始运行")
+async def run_pipeline(pipeline_id: int, current_user: User = Depends(get_current_active_user)):
+    """
+    重新运行流水线，输入未变化的步骤复用上次的输出
+    
+    - **pipeline_id**: 流水线ID
+    """
+    return await pipeline_service.run_pipeline(pipeline_id, user_id=current_user.id)
+
+
+@router.get("/{pipeline_id}", response_model=dict)
+@standardized_response("获取流水线成功")
+async def get_pipeline(pipeline_id: int, current_user: User = Depends(get_current_active_user)):
+    """
+    获取流水线定义和最近一次运行的步骤状态
+    
+    - **pipeline_id**: 流水线ID
+    """
+    return await pipeline_service.get_pipeline(pipeline_id, user_id=current_user.id)
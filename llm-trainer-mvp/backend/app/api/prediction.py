@@ -1,6 +1,9 @@
 # 预测相关API路由
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Depends
+from typing import Optional, Literal
 
+from ..api.auth import get_current_admin_user
+from ..schemas import User
 from ..core.logger import setup_logger
 from ..core.decorators import standardized_response
 from ..schemas import PredictionRequest, PredictionResponse
@@ -20,6 +23,61 @@ async def predict(request: PredictionRequest):
     
     - **text**: 待预测的文本内容
     - **model_id**: 使用的模型ID (可选，默认使用预训练模型)
+    - **variant**: 使用训练任务的导出或量化变体 (可选，onnx/torchscript/int8，需先通过 /train/export 生成)
     """
     result = await prediction_service.predict(request)
-    return result  # 装饰器会自动包装为标准格式
\ No newline at end of file
+    return result  # 装饰器会自动包装为标准格式
+
+
+@router.get("/cache")
+@standardized_response("获取模型缓存状态成功")
+async def get_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    获取推理模型缓存状态（需要管理员权限）
+    
+    - 返回命中、未命中、淘汰次数，缓存占用字节数和上限，以及按最近使用顺序排列的已缓存模型
+    """
+    return prediction_service.get_cache_stats()
+
+
+@router.get("/stats")
+@standardized_response("获取预测统计成功")
+async def get_batching_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    获取预测请求的动态组批统计（需要管理员权限）
+    
+    - 每个模型返回请求数、批次数、平均批次大小，以及最近请求从提交到返回的p50/p99延迟（毫秒）
+    """
+    return prediction_service.get_batching_stats()
+
+
+@router.post("/cache/pin")
+@standardized_response("固定模型成功")
+async def pin_model(
+    model_id: Optional[int] = Query(default=None, description="训练任务ID，为空时固定默认预训练模型"),
+    variant: Optional[Literal["onnx", "torchscript", "int8"]] = Query(default=None, description="模型产物变体"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    加载并固定常用模型，固定的模型不会被缓存淘汰（需要管理员权限）
+    
+    - **model_id**: 训练任务ID (可选)
+    - **variant**: 模型产物变体 (可选，需同时指定model_id)
+    """
+    return await prediction_service.pin_model(model_id, variant)
+
+
+@router.delete("/cache/pin")
+@standardized_response("取消固定模型成功")
+async def unpin_model(
+    model_id: Optional[int] = Query(default=None, description="训练任务ID，为空时为默认预训练模型"),
+    variant: Optional[Literal["onnx", "torchscript", "int8"]] = Query(default=None, description="模型产物变体"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    取消固定模型，之后按最近使用顺序参与淘汰（需要管理员权限）
+    
+    - **model_id**: 训练任务ID (可选)
+    - **variant**: 模型产物变体 (可选，需同时指定model_id)
+    """
+    return await prediction_service.unpin_model(model_id, variant)
@@ -0,0 +1,51 @@
+# 超参搜索相关API路由
+from fastapi import APIRouter, Depends
+
+from ..api.auth import get_current_active_user
+from ..models import User
+from ..core.logger import setup_logger
+from ..core.decorators import standardized_response
+from ..schemas import SweepRequest
+from ..services.sweep_service import sweep_service
+
+# 创建路由器
+router = APIRouter(prefix="/sweeps", tags=["sweeps"])
+logger = setup_logger(__name__)
+
+
+@router.post("/start", response_model=dict)
+@standardized_response("超参搜索已提交")
+async def start_sweep(request: SweepRequest, current_user: User = Depends(get_current_active_user)):
+    """
+    启动超参搜索
+    
+    - **dataset_id**: 数据集ID
+    - **strategy**: grid（网格）或 random（随机）
+    - **search_space**: 例如 {"learning_rate": {"min": 1e-5, "max": 1e-3, "log": true}, "batch_size": [8, 16, 32]}
+    - **max_trials**: 最大试验数
+    - **metric / mode**: 比较试验的指标及优化方向
+    - **reduction_factor / grace_epochs**: ASHA淘汰参数
+    """
+    return await sweep_service.start_sweep(request, user_id=current_user.id)
+
+
+@router.get("/{sweep_id}", response_model=dict)
+@standardized_response("获取超参搜索成功")
+async def get_sweep(sweep_id: int, current_user: User = Depends(get_current_active_user)):
+    """
+    获取超参搜索详情和各试验状态
+    
+    - **sweep_id**: 超参搜索ID
+    """
+    return await sweep_service.get_sweep(sweep_id, user_id=current_user.id)
+
+
+@router.post("/{sweep_id}/stop")
+@standardized_response("超参搜索已停止")
+async def stop_sweep(sweep_id: int, current_user: User = Depends(get_current_active_user)):
+    """
+    停止超参搜索及其所有未结束的试验
+    
+    - **sweep_id**: 超参搜索ID
+    """
+    return await sweep_service.stop_sweep(sweep_id, user_id=current_user.id)
@@ -1,9 +1,10 @@
 # 训练相关API路由
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Depends
-from typing import List
+from fastapi.responses import StreamingResponse, FileResponse
+from typing import List, Optional, Literal
 from datetime import datetime
 
-from ..api.auth import get_current_active_user
+from ..api.auth import get_current_active_user, get_current_admin_user
 from ..schemas import User
 
 from ..core.response import APIResponse
@@ -11,18 +12,18 @@ from ..core.errors import TrainingNotFoundException, DatasetNotFoundException
 from ..core.logger import setup_logger
 from ..schemas import (
     TrainingRequest, TrainingResponse, TrainingStatusResponse, 
-    TrainingJobResponse, StopTrainingRequest
+    TrainingJobResponse, StopTrainingRequest, ExportRequest
 )
-from ..services.training_service import TrainingService
+from ..services.training_service import training_service
+from ..services.metrics_service import metrics_service
+from ..services.progress_broker import progress_broker
+from ..services.export_service import export_service
 from ..core.decorators import standardized_response
 
 # 创建路由器
 router = APIRouter(prefix="/train", tags=["training"])
 logger = setup_logger(__name__)
 
-# 初始化服务
-training_service = TrainingService()
-
 
 @router.post("/start", response_model=dict)
 @standardized_response("训练任务已提交")
@@ -38,13 +39,17 @@ async def start_training(
     - **epochs**: 训练轮数 (1-50)
     - **learning_rate**: 学习率 (0-1)
     - **batch_size**: 批次大小 (1-128)
+    - **seed**: 随机种子
+    - **force**: 为true时忽略训练结果缓存；否则相同数据集和配置的已完成任务直接返回，cached为true
     - **description**: 训练描述 (可选)
     """
     job = await training_service.start_training(request, user_id=current_user.id)
     # 返回简化的数据，装饰器会自动包装为标准格式
     return {
         "job_id": job.id,
-        "status": job.status
+        "status": job.status,
+        # 新提交的任务不会是已完成状态，已完成即命中了训练结果缓存
+        "cached": job.status == "completed"
     }
 
 
@@ -60,6 +65,32 @@ async def get_training_status(job_id: int, current_user: User = Depends(get_curr
     return status_data
 
 
+@router.get("/stream/{job_id}")
+async def stream_training_progress(job_id: int, current_user: User = Depends(get_current_active_user)):
+    """
+    以SSE推送训练进度、指标和新增日志
+    
+    - **job_id**: 训练任务ID
+    - 首个事件为任务快照，任务结束（completed/failed/stopped）后关闭连接
+    """
+    # 先订阅再读取快照，读取快照期间发布的事件（包括结束状态）留在队列中，不会丢失
+    queue = progress_broker.subscribe(job_id)
+    try:
+        snapshot = await training_service.get_training_snapshot(job_id, user_id=current_user.id)
+    except Exception:
+        progress_broker.unsubscribe(job_id, queue)
+        raise
+    return StreamingResponse(
+        training_service.stream_training_events(job_id, snapshot, queue),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
 @router.post("/stop")
 @standardized_response("训练任务已停止")
 async def stop_training(request: StopTrainingRequest, current_user: User = Depends(get_current_active_user)):
@@ -74,12 +105,43 @@ async def stop_training(request: StopTrainingRequest, current_user: User = Depen
 
 @router.get("/jobs", response_model=dict)
 @standardized_response("获取训练任务列表成功")
-async def get_training_jobs(current_user: User = Depends(get_current_active_user)):
+async def get_training_jobs(
+    status: Optional[str] = Query(default=None, description="状态过滤"),
+    dataset_id: Optional[int] = Query(default=None, gt=0, description="数据集ID过滤"),
+    limit: int = Query(default=50, ge=1, le=200, description="每页数量"),
+    cursor: Optional[int] = Query(default=None, gt=0, description="上一页返回的next_cursor"),
+    current_user: User = Depends(get_current_active_user)
+):
     """
     获取当前用户的训练任务列表
+    
+    - **status**: 按状态过滤
+    - **dataset_id**: 按数据集过滤
+    - **limit**: 每页数量，范围1-200
+    - **cursor**: 游标，传入上一页响应中的next_cursor获取下一页；next_cursor为空表示没有更多
     """
-    jobs = await training_service.get_training_jobs(user_id=current_user.id)
-    return jobs  # 装饰器会自动包装为标准格式
+    return await training_service.get_training_jobs(
+        status_filter=status,
+        limit=limit,
+        cursor=cursor,
+        user_id=current_user.id,
+        dataset_id=dataset_id
+    )  # 装饰器会自动包装为标准格式
+
+
+@router.get("/usage")
+@standardized_response("获取资源用量汇总成功")
+async def get_usage_by_user(
+    since: Optional[datetime] = Query(default=None, description="只统计该时间之后开始的任务"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    按用户汇总训练任务的资源用量（需要管理员权限）
+    
+    - **since**: 只统计该时间之后开始的任务 (可选)
+    - 每个用户返回任务数、CPU时间、磁盘读写字节数、最大峰值内存和平均每秒训练样本数
+    """
+    return await training_service.get_usage_by_user(since=since)
 
 
 @router.get("/logs/{job_id}")
@@ -87,13 +149,100 @@ async def get_training_jobs(current_user: User = Depends(get_current_active_user
 async def get_training_logs(
     job_id: int,
     lines: int = Query(default=50, ge=1, le=1000, description="日志行数"),
+    after_offset: Optional[int] = Query(default=None, ge=0, description="上次返回的日志偏移量"),
+    level: Optional[Literal["DEBUG", "INFO", "WARNING", "ERROR"]] = Query(default=None, description="最低日志级别"),
+    start_step: Optional[int] = Query(default=None, ge=0, description="起始步数"),
+    end_step: Optional[int] = Query(default=None, ge=0, description="结束步数"),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     获取训练日志
     
     - **job_id**: 训练任务ID
-    - **lines**: 日志行数，范围1-1000
+    - **lines**: 日志条数，范围1-1000（未指定after_offset时生效）
+    - **after_offset**: 只返回该偏移量之后新增的日志，响应中的offset用于下次请求
+    - **level**: 只返回不低于该级别的日志
+    - **start_step** / **end_step**: 只返回该优化步范围内的日志
     """
-    logs = await training_service.get_training_logs(job_id, lines, user_id=current_user.id)
-    return {"logs": logs}
\ No newline at end of file
+    return await training_service.get_training_logs(
+        job_id, lines, user_id=current_user.id, after_offset=after_offset,
+        level=level, start_step=start_step, end_step=end_step
+    )
+
+
+@router.get("/metrics/{job_id}")
+@standardized_response("获取训练指标成功")
+async def get_training_metrics(
+    job_id: int,
+    names: Optional[str] = Query(default=None, description="指标名，多个用逗号分隔，默认全部"),
+    points: int = Query(default=500, ge=10, le=10000, description="每条序列返回的点数"),
+    method: str = Query(default="lttb", description="降采样方法: lttb/minmax"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    获取训练指标时间序列（服务端降采样）
+    
+    - **job_id**: 训练任务ID
+    - **names**: 指标名，如 loss,accuracy,learning_rate
+    - **points**: 每条序列降采样后的点数，范围10-10000
+    - **method**: lttb保留曲线形状，minmax保留每个区间的极值
+    """
+    name_list = [name.strip() for name in names.split(",") if name.strip()] if names else None
+    return await metrics_service.get_metric_series(
+        job_id, names=name_list, points=points, method=method, user_id=current_user.id
+    )
+
+
+@router.get("/profile/{job_id}")
+@standardized_response("获取性能分析报告成功")
+async def get_training_profile(job_id: int, current_user: User = Depends(get_current_active_user)):
+    """
+    获取训练性能分析报告（需以profile=true启动训练）
+    
+    - **job_id**: 训练任务ID
+    - **phases**: 取数据、前向、反向、优化器各阶段的总耗时、每步平均耗时和占比
+    - **operators**: 采样窗口内自身CPU耗时最多的算子
+    - **trace_available**: 为true时可从 /train/profile/{job_id}/trace 下载Chrome trace
+    """
+    return await training_service.get_training_profile(job_id, user_id=current_user.id)
+
+
+@router.get("/profile/{job_id}/trace")
+async def download_training_trace(job_id: int, current_user: User = Depends(get_current_active_user)):
+    """
+    下载性能分析采样窗口的Chrome trace，可在chrome://tracing或Perfetto中打开
+    
+    - **job_id**: 训练任务ID
+    """
+    trace_file = training_service.get_profile_trace_file(job_id, user_id=current_user.id)
+    return FileResponse(trace_file, media_type="application/json", filename=f"training_job_{job_id}_trace.json")
+
+
+@router.post("/export/{job_id}")
+@standardized_response("模型导出完成")
+async def export_model(
+    job_id: int,
+    request: ExportRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    将训练任务最新的模型产物导出为ONNX和/或TorchScript
+    
+    - **job_id**: 训练任务ID
+    - **formats**: 导出格式，onnx（动态批次和序列长度）/torchscript
+    - 每种格式在样本批次上校验与原模型的数值一致性并测量单条推理延迟，
+      校验通过的导出结果登记为模型产物变体；失败的格式在结果中给出error
+    """
+    return await export_service.export_job(job_id, request.formats, user_id=current_user.id)
+
+
+@router.get("/artifacts/{job_id}")
+@standardized_response("获取模型产物成功")
+async def list_model_artifacts(job_id: int, current_user: User = Depends(get_current_active_user)):
+    """
+    获取训练任务的模型产物及其导出变体
+    
+    - **job_id**: 训练任务ID
+    """
+    return await export_service.list_variants(job_id, user_id=current_user.id)
+
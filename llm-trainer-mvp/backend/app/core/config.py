@@ -41,6 +41,11 @@ class Settings(BaseSettings):
     UPLOAD_PATH: str = Field(default="../data/uploads", env="UPLOAD_PATH")
     MODEL_PATH: str = Field(default="../data/models", env="MODEL_PATH")
     LOG_PATH: str = Field(default="../data/logs", env="LOG_PATH")
+    # 预分词结果缓存目录，相同数据集和分词器的训练任务复用
+    TOKEN_CACHE_PATH: str = Field(default="../data/token_cache", env="TOKEN_CACHE_PATH")
+    # 训练日志活动分段超过该大小（MB）后压缩归档；压缩方式为gzip或zstd（需安装zstandard）
+    LOG_ROTATE_MB: int = Field(default=4, env="LOG_ROTATE_MB")
+    LOG_COMPRESSION: str = Field(default="gzip", env="LOG_COMPRESSION")
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
     LOG_FILE: str = Field(default="../data/training.log", env="LOG_FILE")
     
@@ -49,11 +54,38 @@ class Settings(BaseSettings):
     
     # 模型配置
     DEFAULT_MODEL: str = Field(default="bert-base-uncased", env="DEFAULT_MODEL")
+    # 知识蒸馏默认的学生模型
+    DEFAULT_STUDENT_MODEL: str = Field(default="distilbert-base-uncased", env="DEFAULT_STUDENT_MODEL")
     
     # 训练配置
     DEFAULT_BATCH_SIZE: int = Field(default=8, env="DEFAULT_BATCH_SIZE")
     DEFAULT_EPOCHS: int = Field(default=3, env="DEFAULT_EPOCHS")
     DEFAULT_LEARNING_RATE: float = Field(default=2e-5, env="DEFAULT_LEARNING_RATE")
+    # 训练后端：auto(已安装torch时使用真实训练)/torch/simulated
+    TRAINING_BACKEND: str = Field(default="auto", env="TRAINING_BACKEND")
+    # 同时运行的训练任务数上限，超出的任务排队
+    MAX_CONCURRENT_TRAINING_JOBS: int = Field(default=2, env="MAX_CONCURRENT_TRAINING_JOBS")
+    # 训练任务可用的内存总量（MB），0表示按本机物理内存的TRAINING_MEMORY_FRACTION计算
+    TRAINING_MEMORY_BUDGET_MB: int = Field(default=0, env="TRAINING_MEMORY_BUDGET_MB")
+    TRAINING_MEMORY_FRACTION: float = Field(default=0.8, env="TRAINING_MEMORY_FRACTION")
+    # 单个训练任务数据并行的工作进程数上限
+    MAX_DATA_PARALLEL_WORKERS: int = Field(default=8, env="MAX_DATA_PARALLEL_WORKERS")
+    # 停止训练时等待训练进程自行退出的宽限期（秒），超时后终止进程
+    TRAINING_CANCEL_GRACE_SECONDS: float = Field(default=10.0, env="TRAINING_CANCEL_GRACE_SECONDS")
+    # 训练数据后台组批的线程数（0表示在训练循环中同步组批）和提前组装的批次数
+    TRAINING_DATA_WORKERS: int = Field(default=2, env="TRAINING_DATA_WORKERS")
+    TRAINING_PREFETCH_BATCHES: int = Field(default=4, env="TRAINING_PREFETCH_BATCHES")
+    # 训练进度推送流的心跳间隔（秒）
+    TRAINING_STREAM_HEARTBEAT: int = Field(default=15, env="TRAINING_STREAM_HEARTBEAT")
+    # 训练指标批量写入的缓冲条数
+    METRICS_FLUSH_SIZE: int = Field(default=200, env="METRICS_FLUSH_SIZE")
+    
+    # 推理配置
+    # 推理模型缓存可占用的内存（MB），超出时淘汰最久未使用且未固定的模型
+    PREDICTION_CACHE_MB: int = Field(default=2048, env="PREDICTION_CACHE_MB")
+    # 预测请求动态组批：收集并发请求的最长等待时间（毫秒）和单批最大请求数
+    PREDICTION_MAX_WAIT_MS: float = Field(default=5.0, env="PREDICTION_MAX_WAIT_MS")
+    PREDICTION_MAX_BATCH_SIZE: int = Field(default=32, env="PREDICTION_MAX_BATCH_SIZE")
     
     # 安全配置
     SECRET_KEY: str = Field(default="your-secret-key-for-jwt-please-change-in-production", env="SECRET_KEY")
@@ -1,9 +1,10 @@
 # 导入必要的库和模块
 from contextlib import contextmanager  # 用于创建上下文管理器
-from typing import Iterator, Optional  # 类型提示
+from typing import Iterator, List, Optional  # 类型提示
 import logging  # 日志记录
 from sqlmodel import create_engine, Session, SQLModel  # SQLModel ORM库
 from sqlalchemy.pool import QueuePool  # 连接池
+from sqlalchemy import inspect, text  # 表结构检查和原始SQL
 from sqlalchemy.exc import SQLAlchemyError  # SQL异常处理
 from .core.config import settings  # 应用配置
 
@@ -41,6 +42,67 @@ def init_db() -> None:
     from . import models  # noqa: F401 (忽略未使用导入的警告)
     # 创建所有在SQLModel中定义的表
     SQLModel.metadata.create_all(engine)
+    # create_all不会给已存在的表添加新列，补齐旧数据库缺少的列
+    upgrade_schema(engine)
+
+
+def upgrade_schema(target_engine) -> List[str]:
+    """
+    给已存在的表补齐模型中新增的列
+
+    新列按模型的默认值添加，并创建涉及新列的索引。不可为空又没有固定默认值的列
+    无法自动补齐，此时抛出异常并列出这些列，而不是等到第一次查询时才失败。
+
+    Args:
+        target_engine: 数据库引擎
+
+    Returns:
+        List[str]: 添加的列，格式为"表名.列名"
+
+    Raises:
+        RuntimeError: 存在无法自动添加的列
+    """
+    inspector = inspect(target_engine)
+    added, unsupported = [], []
+    with target_engine.begin() as connection:
+        for table in SQLModel.metadata.tables.values():
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            new_columns = [column for column in table.columns if column.name not in existing]
+            for column in new_columns:
+                definition = _column_definition(column, target_engine.dialect)
+                if definition is None:
+                    unsupported.append(f"{table.name}.{column.name}")
+                    continue
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {definition}'))
+                added.append(f"{table.name}.{column.name}")
+            # 新列上的索引
+            for index in table.indexes:
+                if any(column in new_columns for column in index.columns):
+                    index.create(connection, checkfirst=True)
+    if unsupported:
+        raise RuntimeError(
+            f"数据库缺少无法自动添加的列: {', '.join(unsupported)}，请手动迁移或重建数据库"
+        )
+    if added:
+        logger.info(f"已为旧数据库补齐{len(added)}个列: {', '.join(added)}")
+    return added
+
+
+def _column_definition(column, dialect) -> Optional[str]:
+    """新增列的DDL；不可为空且没有固定默认值时返回None"""
+    definition = f'"{column.name}" {column.type.compile(dialect=dialect)}'
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is None:
+        return definition if column.nullable else None
+    if isinstance(default, bool):
+        literal = "TRUE" if default else "FALSE"
+    elif isinstance(default, (int, float)):
+        literal = repr(default)
+    else:
+        literal = "'" + str(default).replace("'", "''") + "'"
+    return f"{definition} NOT NULL DEFAULT {literal}" if not column.nullable else f"{definition} DEFAULT {literal}"
 
 
 # 创建数据库会话的上下文管理器
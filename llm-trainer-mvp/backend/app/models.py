@@ -1,5 +1,6 @@
 # 导入必要的库和模块
 from sqlmodel import SQLModel, Field  # SQLModel ORM库
+from sqlalchemy import Index  # 复合索引
 from typing import Optional, List, Union, Dict, Any  # 类型提示，用于可选字段
 from datetime import datetime, timedelta  # 日期时间处理
 from passlib.context import CryptContext  # 密码加密
@@ -77,6 +78,13 @@ class TrainingJob(SQLModel, table=True):
     # 关闭Pydantic v2的受保护命名空间限制，允许使用 model_name 字段
     # 因为model是Pydantic的保留字，需要特殊配置才能使用model_name
     model_config = {"protected_namespaces": ()}
+    __table_args__ = (
+        # 任务列表按id倒序做游标分页，索引以过滤列开头、以id结尾，任意深度的翻页都是索引范围扫描
+        Index("ix_trainingjob_user_id_id", "user_id", "id"),
+        Index("ix_trainingjob_user_id_status_id", "user_id", "status", "id"),
+        Index("ix_trainingjob_dataset_id_id", "dataset_id", "id"),
+        Index("ix_trainingjob_status_id", "status", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)  # 主键ID，自动生成
     dataset_id: int = Field(foreign_key="dataset.id")  # 关联的数据集ID
@@ -86,10 +94,78 @@ class TrainingJob(SQLModel, table=True):
     epochs: int = 3  # 训练轮数，默认3轮
     learning_rate: float = 2e-5  # 学习率，默认2e-5
     batch_size: int = 8  # 批次大小，默认8
+    max_seq_length: int = 128  # 最大序列长度，超出部分截断
+    bucket_by_length: bool = True  # 是否按长度分桶组批
+    shuffle_within_buckets: bool = True  # 是否每轮打乱桶内样本和批次顺序
+    gradient_accumulation_steps: int = 1  # 梯度累积步数
+    precision: str = "fp32"  # 训练精度：fp32/bf16
+    gradient_checkpointing: bool = False  # 是否启用梯度检查点
+    method: str = "full"  # 微调方式：full(全参数)/lora(低秩适配器)
+    lora_rank: int = 8  # LoRA秩
+    lora_alpha: int = 16  # LoRA缩放系数
+    lora_dropout: float = 0.05  # LoRA dropout
+    data_parallel_workers: int = 1  # 数据并行的工作进程数
+    save_checkpoint_on_stop: bool = False  # 被停止时是否保存检查点
+    validation_split: float = 0.0  # 验证集比例，0表示不划分验证集
+    eval_steps: Optional[int] = None  # 评估间隔（优化步），为空时每轮评估
+    early_stopping_patience: Optional[int] = None  # 提前停止的耐心次数
+    early_stopping_min_delta: float = 0.0  # 视为改进的最小降幅
+    keep_best_checkpoint: bool = True  # 是否保留验证loss最优的检查点
+    autotune_batch_size: bool = False  # 是否在训练前自动调优批次大小
+    autotune_max_batch_size: int = 128  # 自动调优的批次大小上限
+    autotune_results: Optional[str] = None  # 自动调优的试跑结果，JSON格式字符串
+    parent_job_id: Optional[int] = Field(default=None, foreign_key="trainingjob.id")  # 增量训练的父任务ID
+    init_artifact_id: Optional[int] = Field(default=None, foreign_key="modelartifact.id")  # 初始化权重的模型产物ID
+    init_optimizer_state: bool = False  # 是否加载初始化产物的优化器状态
+    save_optimizer_state: bool = False  # 是否随模型保存优化器状态
+    profile: bool = False  # 是否开启性能分析
+    profile_start_step: int = 3  # torch.profiler采样窗口的起始优化步
+    profile_steps: int = 5  # torch.profiler采样的优化步数
+    profile_path: Optional[str] = None  # 性能分析报告目录
+    mode: str = "finetune"  # 训练模式：finetune(微调)/distill(知识蒸馏)
+    teacher_job_id: Optional[int] = Field(default=None, foreign_key="trainingjob.id")  # 蒸馏的教师训练任务ID
+    teacher_artifact_id: Optional[int] = Field(default=None, foreign_key="modelartifact.id")  # 蒸馏使用的教师模型产物ID
+    student_model: Optional[str] = None  # 蒸馏的学生模型名称或路径
+    distill_temperature: float = 2.0  # 蒸馏温度
+    distill_alpha: float = 0.5  # 软标签损失权重
+    cache_teacher_logits: bool = True  # 是否缓存教师模型软标签
+    export_formats: Optional[str] = None  # 训练完成后导出的格式，JSON格式字符串
+    seed: int = 42  # 随机种子
+    fingerprint: Optional[str] = Field(default=None, index=True)  # 训练结果指纹：数据集内容、基座模型、超参数、随机种子和代码版本的哈希
+    best_step: Optional[int] = None  # 验证loss最优的优化步
+    stopped_step: Optional[int] = None  # 提前停止时的优化步，未提前停止为空
+    estimated_memory_bytes: Optional[int] = None  # 准入时按模型估算的峰值内存（字节，未经历史校准）
+    cpu_seconds: Optional[float] = None  # 训练工作进程累计CPU时间（秒，用户态加内核态）
+    peak_rss_bytes: Optional[int] = None  # 采样得到的工作进程常驻内存之和的峰值（字节），用于校准准入时的内存估算
+    avg_rss_bytes: Optional[int] = None  # 采样得到的工作进程常驻内存之和的平均值（字节）
+    io_read_bytes: Optional[int] = None  # 工作进程从磁盘读取的字节数
+    io_write_bytes: Optional[int] = None  # 工作进程写入磁盘的字节数
+    examples_per_sec: Optional[float] = None  # 每秒训练样本数
     progress: float = 0.0  # 训练进度，范围0-100
     log_file: Optional[str] = None  # 训练日志文件路径
     started_at: Optional[datetime] = None  # 训练开始时间
     completed_at: Optional[datetime] = None  # 训练完成时间
+    sweep_id: Optional[int] = Field(default=None, foreign_key="trainingsweep.id", index=True)  # 所属超参搜索ID
+    metrics: Optional[str] = None  # 任务级汇总指标（如填充效率），JSON格式字符串
+
+
+# 超参搜索模型
+class TrainingSweep(SQLModel, table=True):
+    """超参搜索模型，将搜索空间展开为多个子训练任务，并用异步逐次减半（ASHA）提前停止较差的试验"""
+    id: Optional[int] = Field(default=None, primary_key=True)  # 主键ID，自动生成
+    dataset_id: int = Field(foreign_key="dataset.id")  # 关联的数据集ID
+    user_id: int = Field(foreign_key="user.id")  # 关联的用户ID
+    strategy: str = "grid"  # 搜索策略：grid(网格)/random(随机)
+    search_space: str  # 搜索空间，JSON格式字符串
+    metric: str = "eval_loss"  # 用于比较试验的指标名称
+    mode: str = "min"  # 指标优化方向：min/max
+    reduction_factor: int = 3  # 每一级保留的比例为1/reduction_factor
+    grace_epochs: int = 1  # 第一次淘汰前至少训练的轮数
+    status: str = "running"  # 搜索状态：running(运行中)/completed(完成)/stopped(已停止)/failed(试验创建失败)
+    best_job_id: Optional[int] = None  # 最优试验的训练任务ID
+    description: Optional[str] = None  # 搜索描述
+    created_at: datetime = Field(default_factory=datetime.utcnow)  # 创建时间
+    completed_at: Optional[datetime] = None  # 完成时间
 
 
 # 模型文件模型
@@ -100,5 +176,59 @@ class ModelArtifact(SQLModel, table=True):
     user_id: int = Field(foreign_key="user.id")  # 关联的用户ID
     name: str  # 模型名称
     file_path: str  # 模型文件在服务器上的路径
+    artifact_type: str = "full"  # 文件类型：full(完整模型)/lora_adapter(仅适配器权重，推理时叠加到基座模型)/onnx/torchscript/int8(导出和量化变体)
+    base_model: Optional[str] = None  # 基座模型名称或路径
+    source_artifact_id: Optional[int] = Field(default=None, foreign_key="modelartifact.id")  # 导出或量化变体的来源产物ID
     created_at: datetime = Field(default_factory=datetime.utcnow)  # 创建时间，默认为当前UTC时间
-    metrics: Optional[str] = None  # 模型评估指标，JSON格式字符串
\ No newline at end of file
+    metrics: Optional[str] = None  # 模型评估指标，JSON格式字符串
+
+
+# 训练流水线模型
+class TrainingPipeline(SQLModel, table=True):
+    """训练流水线模型，描述由预处理、训练、评估、导出等步骤组成的有向无环图"""
+    id: Optional[int] = Field(default=None, primary_key=True)  # 主键ID，自动生成
+    user_id: int = Field(foreign_key="user.id", index=True)  # 关联的用户ID
+    name: str  # 流水线名称
+    steps: str  # 步骤定义，JSON格式字符串
+    status: str = "pending"  # 最近一次运行的状态：pending/running/completed/failed
+    run_count: int = 0  # 已运行次数
+    created_at: datetime = Field(default_factory=datetime.utcnow)  # 创建时间
+    started_at: Optional[datetime] = None  # 最近一次运行开始时间
+    completed_at: Optional[datetime] = None  # 最近一次运行结束时间
+
+
+# 流水线步骤运行记录模型
+class PipelineStepRun(SQLModel, table=True):
+    """流水线步骤的一次执行记录；相同类型和输入哈希的已完成记录作为缓存被后续运行复用"""
+    __table_args__ = (
+        # 按(用户, 步骤类型, 输入哈希)查找可复用的输出
+        Index("ix_pipelinesteprun_user_type_hash", "user_id", "step_type", "input_hash"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)  # 主键ID，自动生成
+    pipeline_id: int = Field(foreign_key="trainingpipeline.id", index=True)  # 所属流水线ID
+    user_id: int = Field(foreign_key="user.id")  # 关联的用户ID
+    run_number: int  # 第几次运行
+    step_name: str  # 步骤名称
+    step_type: str  # 步骤类型：preprocess/train/evaluate/export
+    status: str = "pending"  # 状态：pending/running/completed/cached(复用缓存)/failed/skipped(上游失败)
+    input_hash: Optional[str] = None  # 输入哈希（步骤参数、上游输入哈希和源数据内容）
+    outputs: Optional[str] = None  # 步骤输出，JSON格式字符串
+    error: Optional[str] = None  # 失败原因
+    started_at: Optional[datetime] = None  # 开始时间
+    completed_at: Optional[datetime] = None  # 结束时间
+
+
+# 训练指标模型
+class TrainingMetric(SQLModel, table=True):
+    """训练指标模型，按(任务, 指标名, 步数)存储逐步的loss/accuracy/学习率等时间序列"""
+    __table_args__ = (
+        # 包含value列，按任务和指标名读取整条(step, value)序列时只需扫描索引
+        Index("ix_trainingmetric_job_name_step_value", "training_job_id", "name", "step", "value"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)  # 主键ID，自动生成
+    training_job_id: int = Field(foreign_key="trainingjob.id")  # 关联的训练任务ID
+    name: str  # 指标名称，如loss、accuracy、learning_rate
+    step: int  # 训练步数
+    value: float  # 指标值
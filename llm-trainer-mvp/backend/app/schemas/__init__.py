@@ -1,7 +1,7 @@
 # 请求和响应数据模型定义
 # 使用Pydantic模型进行数据验证和序列化
 
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict, Union
 from datetime import datetime
 from pydantic import BaseModel, Field, validator, EmailStr
 from app.models import UserRole, User
@@ -97,6 +97,41 @@ class TrainingRequest(BaseModel):
     epochs: int = Field(default=3, description="训练轮数", ge=1, le=50)
     learning_rate: float = Field(default=2e-5, description="学习率", gt=0, le=1)
     batch_size: int = Field(default=8, description="批次大小", ge=1, le=128)
+    max_seq_length: int = Field(default=128, description="最大序列长度", ge=8, le=512)
+    bucket_by_length: bool = Field(default=True, description="是否按长度分桶组批，批次只填充到批内最长序列")
+    shuffle_within_buckets: bool = Field(default=True, description="是否每轮打乱桶内样本和批次顺序")
+    gradient_accumulation_steps: int = Field(default=1, description="梯度累积步数，有效批次大小为batch_size乘以该值", ge=1, le=64)
+    precision: str = Field(default="fp32", description="训练精度：fp32/bf16（CPU自动混合精度）")
+    gradient_checkpointing: bool = Field(default=False, description="是否启用梯度检查点，以重算换取更低的激活内存")
+    method: str = Field(default="full", description="微调方式：full（全参数）/lora（只训练低秩适配器）")
+    lora_rank: int = Field(default=8, description="LoRA秩", ge=1, le=256)
+    lora_alpha: int = Field(default=16, description="LoRA缩放系数", ge=1, le=512)
+    lora_dropout: float = Field(default=0.05, description="LoRA dropout", ge=0, lt=1)
+    data_parallel_workers: int = Field(default=1, description="数据并行的工作进程数，大于1时使用gloo后端多进程训练", ge=1, le=64)
+    save_checkpoint_on_stop: bool = Field(default=False, description="被停止时是否保存当前模型作为检查点")
+    validation_split: float = Field(default=0.0, description="验证集比例，默认为0即全部样本用于训练、不做训练中评估；大于0时划分验证集并评估", ge=0, le=0.5)
+    eval_steps: Optional[int] = Field(None, description="每隔多少个优化步评估一次，为空时只在每轮结束时评估", ge=1)
+    early_stopping_patience: Optional[int] = Field(None, description="连续多少次评估验证loss没有改进时提前停止，为空时不提前停止", ge=1, le=100)
+    early_stopping_min_delta: float = Field(default=0.0, description="验证loss至少降低多少才算改进", ge=0)
+    keep_best_checkpoint: bool = Field(default=True, description="是否以验证loss最优的检查点作为最终模型")
+    autotune_batch_size: bool = Field(default=False, description="训练前试跑递增的批次大小，选择吞吐量最高的一个替代batch_size")
+    autotune_max_batch_size: int = Field(default=128, description="自动调优的批次大小上限", ge=1, le=1024)
+    parent_job_id: Optional[int] = Field(None, description="从该训练任务最新的模型产物初始化权重（增量训练）", gt=0)
+    init_from_artifact: Optional[int] = Field(None, description="从指定的模型产物ID初始化权重，与parent_job_id二选一", gt=0)
+    init_optimizer_state: bool = Field(default=False, description="是否同时加载初始化产物中保存的优化器状态")
+    save_optimizer_state: bool = Field(default=False, description="是否随模型保存优化器状态，供后续增量训练加载")
+    profile: bool = Field(default=False, description="是否开启性能分析，记录各阶段耗时并采样torch.profiler trace")
+    profile_start_step: int = Field(default=3, description="torch.profiler采样窗口的起始优化步", ge=1)
+    profile_steps: int = Field(default=5, description="torch.profiler采样的优化步数", ge=1, le=50)
+    mode: str = Field(default="finetune", description="训练模式：finetune（微调）/distill（知识蒸馏，以教师任务的模型产物训练学生模型）")
+    teacher_job_id: Optional[int] = Field(None, description="蒸馏模式的教师训练任务ID，必须已完成", gt=0)
+    student_model: Optional[str] = Field(None, description="蒸馏模式的学生模型名称或路径，为空时使用DEFAULT_STUDENT_MODEL", max_length=200)
+    distill_temperature: float = Field(default=2.0, description="蒸馏温度，越高教师的软标签越平滑", gt=0, le=20)
+    distill_alpha: float = Field(default=0.5, description="软标签损失的权重，其余为真实标签交叉熵", ge=0, le=1)
+    cache_teacher_logits: bool = Field(default=True, description="是否缓存教师模型的软标签，同一教师和数据集的后续蒸馏直接复用")
+    seed: int = Field(default=42, description="随机种子，决定验证集划分、批次顺序和参数初始化", ge=0)
+    force: bool = Field(default=False, description="忽略训练结果缓存，即使已有相同配置的已完成任务也重新训练")
+    export_formats: List[str] = Field(default_factory=list, description="训练完成后导出的格式：onnx/torchscript/int8（动态量化），导出结果登记为模型产物变体")
     description: Optional[str] = Field(None, description="训练描述", max_length=500)
     
     @validator('learning_rate')
@@ -104,6 +139,65 @@ class TrainingRequest(BaseModel):
         if v <= 0 or v > 1:
             raise ValueError('学习率必须在0到1之间')
         return v
+    
+    @validator('precision')
+    def validate_precision(cls, v):
+        if v not in ("fp32", "bf16"):
+            raise ValueError('训练精度只能是fp32或bf16')
+        return v
+    
+    @validator('method')
+    def validate_method(cls, v):
+        if v not in ("full", "lora"):
+            raise ValueError('微调方式只能是full或lora')
+        return v
+    
+    @validator('early_stopping_patience')
+    def validate_early_stopping(cls, v, values):
+        if v is not None and not values.get('validation_split'):
+            raise ValueError('提前停止需要划分验证集（validation_split大于0）')
+        return v
+    
+    @validator('init_from_artifact')
+    def validate_init_from_artifact(cls, v, values):
+        if v is not None and values.get('parent_job_id') is not None:
+            raise ValueError('parent_job_id和init_from_artifact只能指定一个')
+        return v
+    
+    @validator('init_optimizer_state')
+    def validate_init_optimizer_state(cls, v, values):
+        if v and values.get('parent_job_id') is None and values.get('init_from_artifact') is None:
+            raise ValueError('加载优化器状态需要指定parent_job_id或init_from_artifact')
+        return v
+    
+    @validator('mode')
+    def validate_mode(cls, v):
+        if v not in ("finetune", "distill"):
+            raise ValueError('训练模式只能是finetune或distill')
+        return v
+    
+    @validator('teacher_job_id', always=True)
+    def validate_teacher_job_id(cls, v, values):
+        if values.get('mode') == "distill":
+            if v is None:
+                raise ValueError('蒸馏模式需要指定teacher_job_id')
+            if values.get('parent_job_id') is not None or values.get('init_from_artifact') is not None:
+                raise ValueError('蒸馏模式不支持从已有产物初始化')
+        elif v is not None:
+            raise ValueError('teacher_job_id只能用于蒸馏模式')
+        return v
+    
+    @validator('export_formats')
+    def validate_export_formats(cls, v):
+        return validate_export_format_list(v)
+
+
+def validate_export_format_list(formats: List[str]) -> List[str]:
+    """校验导出格式并去重，保持请求中的顺序"""
+    for fmt in formats:
+        if fmt not in ("onnx", "torchscript", "int8"):
+            raise ValueError('导出格式只能是onnx、torchscript或int8')
+    return list(dict.fromkeys(formats))
 
 
 class TrainingResponse(BaseModel):
@@ -144,16 +238,111 @@ class StopTrainingRequest(BaseModel):
     job_id: int = Field(..., description="训练任务ID", gt=0)
 
 
+class ExportRequest(BaseModel):
+    """模型导出请求模型"""
+    formats: List[str] = Field(default=["onnx", "torchscript"], description="导出格式：onnx/torchscript/int8（动态量化）", min_items=1)
+    
+    @validator('formats')
+    def validate_formats(cls, v):
+        return validate_export_format_list(v)
+
+
+class SearchRange(BaseModel):
+    """连续取值的搜索范围，仅用于随机搜索"""
+    min: float = Field(..., description="最小值")
+    max: float = Field(..., description="最大值")
+    log: bool = Field(default=False, description="是否按对数均匀采样")
+    
+    @validator('max')
+    def validate_max(cls, v, values):
+        if 'min' in values and v <= values['min']:
+            raise ValueError('max必须大于min')
+        return v
+    
+    @validator('log')
+    def validate_log(cls, v, values):
+        if v and values.get('min', 1) <= 0:
+            raise ValueError('对数采样要求min大于0')
+        return v
+
+
+class SweepRequest(BaseModel):
+    """超参搜索请求模型"""
+    dataset_id: int = Field(..., description="数据集ID", gt=0)
+    strategy: str = Field(default="grid", description="搜索策略: grid/random")
+    search_space: Dict[str, Union[List[float], SearchRange]] = Field(
+        ..., description="搜索空间，支持learning_rate/batch_size/epochs，取值为离散列表或范围"
+    )
+    max_trials: int = Field(default=16, description="最大试验数", ge=1, le=100)
+    metric: str = Field(default="eval_loss", description="用于比较试验的指标: train_loss/eval_loss/eval_accuracy")
+    validation_split: float = Field(default=0.1, description="每个试验划分的验证集比例，eval_loss和eval_accuracy需要大于0", ge=0, le=0.5)
+    mode: str = Field(default="min", description="指标优化方向: min/max")
+    reduction_factor: int = Field(default=3, description="每一级保留1/reduction_factor的试验", ge=2, le=10)
+    grace_epochs: int = Field(default=1, description="第一次淘汰前至少训练的轮数", ge=1, le=50)
+    seed: Optional[int] = Field(None, description="随机搜索的随机种子")
+    description: Optional[str] = Field(None, description="搜索描述", max_length=500)
+    
+    @validator('strategy')
+    def validate_strategy(cls, v):
+        if v not in ('grid', 'random'):
+            raise ValueError('搜索策略必须为grid或random')
+        return v
+    
+    @validator('mode')
+    def validate_mode(cls, v):
+        if v not in ('min', 'max'):
+            raise ValueError('优化方向必须为min或max')
+        return v
+    
+    @validator('search_space')
+    def validate_search_space(cls, v):
+        if not v:
+            raise ValueError('搜索空间不能为空')
+        for name, space in v.items():
+            if isinstance(space, list) and not space:
+                raise ValueError(f'参数{name}的取值列表不能为空')
+        return v
+
+
+class PipelineStep(BaseModel):
+    """流水线步骤定义"""
+    name: str = Field(..., description="步骤名称，流水线内唯一", min_length=1, max_length=100)
+    type: str = Field(..., description="步骤类型: preprocess/train/evaluate/export")
+    depends_on: List[str] = Field(default_factory=list, description="依赖的步骤名称")
+    params: Dict[str, Any] = Field(default_factory=dict, description="步骤参数")
+    
+    @validator('type')
+    def validate_type(cls, v):
+        if v not in ('preprocess', 'train', 'evaluate', 'export'):
+            raise ValueError('步骤类型必须为preprocess、train、evaluate或export')
+        return v
+
+
+class PipelineRequest(BaseModel):
+    """训练流水线请求模型"""
+    name: str = Field(..., description="流水线名称", min_length=1, max_length=100)
+    steps: List[PipelineStep] = Field(..., description="步骤列表，按depends_on组成有向无环图", min_items=1, max_items=50)
+
+
 class PredictionRequest(BaseModel):
     """预测请求模型"""
     text: str = Field(..., description="待预测文本", min_length=1, max_length=10000)
     model_id: Optional[int] = Field(None, description="模型ID")
+    variant: Optional[str] = Field(None, description="使用的模型产物变体：onnx/torchscript/int8，为空时使用训练产物")
     
     @validator('text')
     def validate_text(cls, v):
         if not v.strip():
             raise ValueError('文本内容不能为空')
         return v.strip()
+    
+    @validator('variant')
+    def validate_variant(cls, v, values):
+        if v is not None:
+            validate_export_format_list([v])
+            if values.get('model_id') is None:
+                raise ValueError('指定变体时需要指定model_id')
+        return v
 
 
 class PredictionResponse(BaseModel):
@@ -162,6 +351,7 @@ class PredictionResponse(BaseModel):
     predicted_class: str = Field(..., description="预测类别")
     confidence: float = Field(..., description="置信度", ge=0, le=1)
     model_id: Optional[int] = Field(None, description="使用的模型ID")
+    variant: Optional[str] = Field(None, description="使用的模型产物变体")
 
 
 class DatasetResponse(BaseModel):
@@ -0,0 +1,213 @@
+# 模型导出服务层
+# 将训练产物导出为ONNX和TorchScript，或动态量化为int8，结果登记为来源产物的变体
+
+import os
+import json
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional
+
+from sqlmodel import select
+
+from ..models import TrainingJob, Dataset, ModelArtifact
+from ..db import get_db_context
+from ..core.config import settings
+from ..core.errors import (
+    TrainingNotFoundException, InvalidParamsException, InternalServerException, ResourceNotFoundException
+)
+from ..training import engine_available, onnx_available
+from ..training.data import load_text_classification_csv, train_validation_split
+from ..training.export import SAMPLE_BATCH_SIZE
+from ..training.quantize import QUANTIZED_FORMAT
+
+logger = logging.getLogger(__name__)
+
+# 可以继续训练、导出的产物类型；导出变体只用于推理
+TRAINABLE_ARTIFACT_TYPES = ("full", "lora_adapter")
+
+
+class ExportService:
+    """模型导出服务类"""
+
+    def __init__(self):
+        self.export_path = os.path.join(settings.MODEL_PATH, "exports")
+
+    def check_formats(self, formats: List[str]):
+        """
+        检查导出格式所需的依赖
+
+        Raises:
+            InvalidParamsException: 未安装torch/transformers，或导出ONNX但未安装onnx/onnxruntime
+        """
+        if not engine_available():
+            raise InvalidParamsException("模型导出需要安装torch和transformers")
+        if "onnx" in formats and not onnx_available():
+            raise InvalidParamsException("导出ONNX需要安装onnx和onnxruntime")
+
+    async def export_job(self, job_id: int, formats: List[str], user_id: int = None) -> Dict[str, Any]:
+        """
+        导出训练任务最新的模型产物
+
+        Args:
+            job_id: 训练任务ID
+            formats: 导出格式列表
+            user_id: 用户ID，用于验证权限
+
+        Returns:
+            Dict: 来源产物ID和每种格式的导出结果
+
+        Raises:
+            TrainingNotFoundException: 训练任务不存在或无权访问
+            ResourceNotFoundException: 训练任务没有可导出的模型产物
+            InvalidParamsException: 缺少导出所需的依赖
+        """
+        try:
+            with get_db_context() as session:
+                job = session.get(TrainingJob, job_id)
+                if not job:
+                    raise TrainingNotFoundException("训练任务", job_id)
+                if user_id is not None and job.user_id != user_id:
+                    raise TrainingNotFoundException("您没有权限访问此训练任务")
+                artifact = latest_trained_artifact(session, job_id)
+                if not artifact:
+                    raise ResourceNotFoundException(f"训练任务{job_id}没有可导出的模型产物")
+                artifact_id = artifact.id
+
+            self.check_formats(formats)
+            variants = await self.export_artifact(artifact_id, formats)
+            return {"job_id": job_id, "source_artifact_id": artifact_id, "variants": variants}
+
+        except Exception as e:
+            logger.error(f"导出模型失败: {str(e)}")
+            if isinstance(e, (TrainingNotFoundException, ResourceNotFoundException, InvalidParamsException)):
+                raise
+            raise InternalServerException(f"导出模型失败: {str(e)}")
+
+    async def export_artifact(self, artifact_id: int, formats: List[str]) -> List[Dict[str, Any]]:
+        """
+        导出模型产物并登记变体
+
+        逐个格式导出，某个格式失败（如数值一致性校验不通过）不影响其他格式，失败原因记录在结果的error中。
+        int8动态量化在验证集上比较量化前后的准确率。
+        同一来源产物重复导出同一格式时覆盖之前的变体。
+
+        Args:
+            artifact_id: 来源模型产物ID
+            formats: 导出格式列表，onnx/torchscript/int8
+
+        Returns:
+            List[Dict]: 每种格式的导出结果，成功时包含变体的artifact_id
+        """
+        with get_db_context() as session:
+            artifact = session.get(ModelArtifact, artifact_id)
+            job = session.get(TrainingJob, artifact.training_job_id)
+            dataset = session.get(Dataset, job.dataset_id)
+            if not dataset or not os.path.exists(dataset.file_path):
+                raise InvalidParamsException("训练数据集已不存在，无法取样校验导出结果")
+            source_dir, source_name, max_seq_length = artifact.file_path, artifact.name, job.max_seq_length
+            dataset_path, validation_split, seed = dataset.file_path, job.validation_split, job.seed
+
+        texts, labels, label_names = await asyncio.to_thread(load_text_classification_csv, dataset_path)
+        # 量化的准确率对比使用训练时划分的验证集，未划分验证集时使用整个数据集
+        _, validation = train_validation_split(len(texts), validation_split, seed)
+        validation = validation or range(len(texts))
+        validation_texts = [texts[i] for i in validation]
+        validation_labels = [label_names[labels[i]] for i in validation]
+
+        results = []
+        for fmt in formats:
+            output_dir = os.path.join(self.export_path, source_name, fmt)
+            try:
+                if fmt == QUANTIZED_FORMAT:
+                    from ..training.quantize import quantize_model
+
+                    result = await asyncio.to_thread(
+                        quantize_model, source_dir, output_dir, validation_texts, validation_labels, max_seq_length
+                    )
+                else:
+                    from ..training.export import export_model
+
+                    result = await asyncio.to_thread(
+                        export_model, source_dir, output_dir, fmt, texts[:SAMPLE_BATCH_SIZE], max_seq_length
+                    )
+            except Exception as e:
+                logger.error(f"产物{artifact_id}导出{fmt}失败: {str(e)}")
+                results.append({"format": fmt, "error": str(e)})
+                continue
+            result["artifact_id"] = self._register_variant(artifact_id, fmt, output_dir, result)
+            # 重新导出会覆盖同一变体的文件，推理服务中已加载的旧模型需要丢弃
+            from .prediction_service import prediction_service
+
+            prediction_service.invalidate_model(f"artifact:{result['artifact_id']}")
+            results.append(result)
+        return results
+
+    async def list_variants(self, job_id: int, user_id: int = None) -> List[Dict[str, Any]]:
+        """
+        列出训练任务的模型产物及其导出变体
+
+        Raises:
+            TrainingNotFoundException: 训练任务不存在或无权访问
+        """
+        with get_db_context() as session:
+            job = session.get(TrainingJob, job_id)
+            if not job:
+                raise TrainingNotFoundException("训练任务", job_id)
+            if user_id is not None and job.user_id != user_id:
+                raise TrainingNotFoundException("您没有权限访问此训练任务")
+            artifacts = session.exec(
+                select(ModelArtifact).where(ModelArtifact.training_job_id == job_id).order_by(ModelArtifact.id)
+            ).all()
+            return [
+                {
+                    "artifact_id": artifact.id,
+                    "name": artifact.name,
+                    "artifact_type": artifact.artifact_type,
+                    "source_artifact_id": artifact.source_artifact_id,
+                    "created_at": artifact.created_at.isoformat(),
+                    "metrics": json.loads(artifact.metrics) if artifact.metrics else None,
+                }
+                for artifact in artifacts
+            ]
+
+    def _register_variant(self, source_id: int, fmt: str, output_dir: str, result: Dict[str, Any]) -> int:
+        """登记导出变体，已有同一来源和格式的变体时更新它"""
+        with get_db_context() as session:
+            source = session.get(ModelArtifact, source_id)
+            variant = session.exec(
+                select(ModelArtifact).where(
+                    ModelArtifact.source_artifact_id == source_id,
+                    ModelArtifact.artifact_type == fmt
+                )
+            ).first()
+            if variant is None:
+                variant = ModelArtifact(
+                    training_job_id=source.training_job_id,
+                    user_id=source.user_id,
+                    name=f"{source.name}-{fmt}",
+                    artifact_type=fmt,
+                    base_model=source.base_model,
+                    source_artifact_id=source_id,
+                    file_path=output_dir
+                )
+            variant.metrics = json.dumps({key: value for key, value in result.items() if key not in ("format", "file")})
+            session.add(variant)
+            session.commit()
+            session.refresh(variant)
+            return variant.id
+
+
+def latest_trained_artifact(session, job_id: int) -> Optional[ModelArtifact]:
+    """训练任务最新登记的训练产物（完成时的最终模型或停止前的检查点），不含导出变体"""
+    return session.exec(
+        select(ModelArtifact)
+        .where(
+            ModelArtifact.training_job_id == job_id,
+            ModelArtifact.artifact_type.in_(TRAINABLE_ARTIFACT_TYPES)
+        )
+        .order_by(ModelArtifact.id.desc())
+    ).first()
+
+
+# 全局导出服务实例
+export_service = ExportService()
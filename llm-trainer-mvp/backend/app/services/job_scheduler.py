@@ -0,0 +1,130 @@
+# 训练任务调度器
+# 限制同时运行的训练任务数量和预计内存总量，超出的任务排队等待
+
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from ..core.config import settings
+from ..training.memory import host_memory_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_memory_budget() -> Optional[int]:
+    """
+    训练任务可用的内存总量（字节）
+
+    TRAINING_MEMORY_BUDGET_MB大于0时直接使用，否则取本机物理内存的TRAINING_MEMORY_FRACTION，
+    给API进程和操作系统留出余量。无法获取物理内存时返回None，不按内存限制。
+    """
+    if settings.TRAINING_MEMORY_BUDGET_MB > 0:
+        return settings.TRAINING_MEMORY_BUDGET_MB * 1024 ** 2
+    total = host_memory_bytes()
+    if total is None:
+        return None
+    return int(total * settings.TRAINING_MEMORY_FRACTION)
+
+
+class TrainingScheduler:
+    """训练任务调度器
+
+    所有训练任务（单个任务、超参搜索的子任务）都通过调度器提交。任务在并发数未满、
+    且已运行任务的预计内存加上本任务不超过内存预算时才开始运行，否则排队；
+    排队的任务按提交顺序启动，只有队首任务可以开始，后面内存较小的任务不会一直抢在大任务之前。
+    调度器同时持有任务引用避免被垃圾回收。
+    """
+
+    def __init__(self, max_concurrent: int, memory_budget: Optional[int] = None):
+        self.max_concurrent = max_concurrent
+        self.memory_budget = memory_budget
+        self._condition: Optional[asyncio.Condition] = None
+        self._tasks: Dict[int, asyncio.Task] = {}
+        # 按提交顺序排队等待启动的任务ID
+        self._waiting: Deque[int] = deque()
+        self._running = 0
+        self._reserved_memory = 0
+
+    def _get_condition(self) -> asyncio.Condition:
+        # 延迟创建，确保绑定到当前事件循环
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def submit(self, job_id: int, runner: Callable[[int], Awaitable[None]], memory_bytes: int = 0) -> None:
+        """
+        提交训练任务
+
+        Args:
+            job_id: 训练任务ID
+            runner: 执行训练的协程函数，参数为任务ID
+            memory_bytes: 任务预计峰值内存（字节）
+        """
+        self._waiting.append(job_id)
+        task = asyncio.create_task(self._run(job_id, runner, memory_bytes))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._forget(job_id))
+        logger.info(f"训练任务已提交调度: ID={job_id}, 排队={self.queued_count}, 运行中={self._running}")
+
+    def _forget(self, job_id: int) -> None:
+        self._tasks.pop(job_id, None)
+        if job_id in self._waiting:
+            # 任务在开始执行前就被取消，没有经过_run的清理，移出队列后唤醒其余排队任务
+            self._waiting.remove(job_id)
+            asyncio.ensure_future(self._notify())
+
+    async def _notify(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            condition.notify_all()
+
+    def fits_budget(self, memory_bytes: int) -> bool:
+        """任务单独运行时是否在内存预算内"""
+        return self.memory_budget is None or memory_bytes <= self.memory_budget
+
+    def _can_start(self, job_id: int, memory_bytes: int) -> bool:
+        if self._waiting[0] != job_id or self._running >= self.max_concurrent:
+            return False
+        # 没有任务运行时总是放行，避免预算变化后单个任务永远无法启动
+        if self._running == 0 or self.memory_budget is None:
+            return True
+        return self._reserved_memory + memory_bytes <= self.memory_budget
+
+    async def _run(self, job_id: int, runner: Callable[[int], Awaitable[None]], memory_bytes: int) -> None:
+        condition = self._get_condition()
+        async with condition:
+            try:
+                await condition.wait_for(lambda: self._can_start(job_id, memory_bytes))
+            finally:
+                # 启动或排队时被取消都离开队列，由下一个任务检查能否启动
+                self._waiting.remove(job_id)
+                condition.notify_all()
+            self._running += 1
+            self._reserved_memory += memory_bytes
+        try:
+            await runner(job_id)
+        finally:
+            async with condition:
+                self._running -= 1
+                self._reserved_memory -= memory_bytes
+                condition.notify_all()
+
+    @property
+    def running_count(self) -> int:
+        """正在运行的任务数"""
+        return self._running
+
+    @property
+    def queued_count(self) -> int:
+        """排队等待的任务数"""
+        return len(self._waiting)
+
+    @property
+    def reserved_memory(self) -> int:
+        """正在运行的任务预计占用的内存总量（字节）"""
+        return self._reserved_memory
+
+
+# 全局训练调度器实例
+training_scheduler = TrainingScheduler(settings.MAX_CONCURRENT_TRAINING_JOBS, resolve_memory_budget())
@@ -0,0 +1,154 @@
+# 训练指标服务层
+# 负责逐步训练指标的追加写入和降采样查询
+
+import logging
+from typing import List, Dict, Any, Optional
+
+from sqlmodel import select
+
+from ..models import TrainingJob, TrainingMetric
+from ..db import get_db_context
+from ..core.config import settings
+from ..core.errors import TrainingNotFoundException, InvalidParamsException, InternalServerException
+from ..utils.downsample import DOWNSAMPLE_METHODS
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsService:
+    """训练指标服务类
+
+    指标按(任务, 指标名, 步数)以窄表形式追加写入，写入端先在内存中缓冲，
+    攒够一批后批量插入，避免每一步都提交一次事务。查询时合并尚未写入的指标，运行中的任务也能看到最新的点。
+    """
+
+    def __init__(self):
+        self.flush_size = settings.METRICS_FLUSH_SIZE
+        self._buffers: Dict[int, List[Dict[str, Any]]] = {}
+        # 正在写入数据库的批次，写入完成前查询仍从内存读取
+        self._flushing: Dict[int, List[Dict[str, Any]]] = {}
+
+    def record(self, job_id: int, step: int, metrics: Dict[str, float]):
+        """
+        记录一个训练步的指标
+
+        Args:
+            job_id: 训练任务ID
+            step: 训练步数
+            metrics: 指标名到指标值的映射
+        """
+        buffer = self._buffers.setdefault(job_id, [])
+        for name, value in metrics.items():
+            if value is None:
+                continue
+            buffer.append({
+                "training_job_id": job_id,
+                "name": name,
+                "step": step,
+                "value": float(value)
+            })
+        if len(buffer) >= self.flush_size:
+            self.flush(job_id)
+
+    def flush(self, job_id: int):
+        """
+        将缓冲的指标批量写入数据库
+
+        Args:
+            job_id: 训练任务ID
+        """
+        rows = self._buffers.pop(job_id, None)
+        if not rows:
+            return
+        self._flushing[job_id] = rows
+        try:
+            with get_db_context() as session:
+                session.execute(TrainingMetric.__table__.insert(), rows)
+        except Exception as e:
+            logger.error(f"写入训练指标失败: job_id={job_id}, 共{len(rows)}条, 错误: {str(e)}")
+        finally:
+            self._flushing.pop(job_id, None)
+
+    def _pending_rows(self, job_id: int) -> List[Dict[str, Any]]:
+        """尚未写入数据库的指标，包括正在写入的批次"""
+        return list(self._flushing.get(job_id, ())) + list(self._buffers.get(job_id, ()))
+
+    async def get_metric_series(
+        self,
+        job_id: int,
+        names: Optional[List[str]] = None,
+        points: int = 500,
+        method: str = "lttb",
+        user_id: int = None
+    ) -> Dict[str, Any]:
+        """
+        获取降采样后的指标序列
+
+        Args:
+            job_id: 训练任务ID
+            names: 指标名列表，为空时返回该任务的全部指标
+            points: 每条序列的目标点数
+            method: 降采样方法，lttb或minmax
+            user_id: 用户ID，用于验证权限
+
+        Returns:
+            Dict: 包含各指标序列（steps/values/total_points）的字典
+
+        Raises:
+            TrainingNotFoundException: 训练任务不存在或无权访问
+            InvalidParamsException: 降采样方法无效
+        """
+        downsample = DOWNSAMPLE_METHODS.get(method)
+        if downsample is None:
+            raise InvalidParamsException(f"不支持的降采样方法: {method}")
+
+        try:
+            with get_db_context() as session:
+                job = session.get(TrainingJob, job_id)
+                if not job:
+                    raise TrainingNotFoundException("训练任务", job_id)
+
+                # 验证用户权限
+                if user_id is not None and job.user_id != user_id:
+                    raise TrainingNotFoundException("您没有权限访问此训练任务")
+
+                pending = self._pending_rows(job_id)
+                if not names:
+                    names = session.exec(
+                        select(TrainingMetric.name)
+                        .where(TrainingMetric.training_job_id == job_id)
+                        .distinct()
+                    ).all()
+                    names = list(dict.fromkeys([*names, *(row["name"] for row in pending)]))
+
+                series = {}
+                for name in names:
+                    # 只查询(step, value)两列，由复合索引覆盖
+                    rows = session.exec(
+                        select(TrainingMetric.step, TrainingMetric.value)
+                        .where(TrainingMetric.training_job_id == job_id, TrainingMetric.name == name)
+                        .order_by(TrainingMetric.step)
+                    ).all()
+                    # 按步数合并未写入的指标；批次写入完成的瞬间可能同时出现在两边，以步数去重
+                    by_step = dict(rows)
+                    by_step.update((row["step"], row["value"]) for row in pending if row["name"] == name)
+                    steps = sorted(by_step)
+                    values = [by_step[step] for step in steps]
+                    sampled_steps, sampled_values = downsample(steps, values, points)
+                    series[name] = {
+                        "steps": sampled_steps,
+                        "values": sampled_values,
+                        "total_points": len(steps)
+                    }
+
+            return {"job_id": job_id, "method": method, "series": series}
+
+        except Exception as e:
+            logger.error(f"获取训练指标失败: {str(e)}")
+            if isinstance(e, TrainingNotFoundException):
+                raise
+            raise InternalServerException(f"获取训练指标失败: {str(e)}")
+
+
+# 全局指标服务实例
+metrics_service = MetricsService()
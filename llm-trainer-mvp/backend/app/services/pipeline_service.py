@@ -0,0 +1,592 @@
+# 训练流水线服务层
+# 将预处理、训练、评估、导出步骤组成有向无环图执行，无依赖关系的步骤并发运行，
+# 每个步骤按输入哈希缓存输出，重新运行时跳过输入未变化的步骤
+
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+import pandas as pd
+from pydantic import ValidationError
+from sqlmodel import select
+
+from ..models import TrainingPipeline, PipelineStepRun, TrainingJob, Dataset, ModelArtifact
+from ..db import get_db_context
+from ..schemas import PipelineRequest, PipelineStep, TrainingRequest, validate_export_format_list
+from ..core.config import settings
+from ..core.errors import ResourceNotFoundException, InvalidParamsException, InternalServerException
+from ..training import engine_available
+from ..utils.file_hash import file_sha256
+from .progress_broker import TERMINAL_STATUSES
+from .training_service import training_service
+from .export_service import export_service, latest_trained_artifact
+
+logger = logging.getLogger(__name__)
+
+# 训练步骤轮询训练任务状态的间隔（秒）
+TRAIN_POLL_INTERVAL = 2.0
+# 各类型步骤需要的上游输出
+STEP_REQUIREMENTS = {
+    "preprocess": None,
+    "train": None,
+    "evaluate": "training_job_id",
+    "export": "training_job_id",
+}
+
+
+def topological_order(steps: List[PipelineStep]) -> List[str]:
+    """
+    校验步骤图并返回拓扑顺序
+
+    Args:
+        steps: 步骤列表
+
+    Returns:
+        List[str]: 按依赖排序的步骤名称
+
+    Raises:
+        InvalidParamsException: 步骤名称重复、依赖不存在或存在环
+    """
+    names = [step.name for step in steps]
+    if len(set(names)) != len(names):
+        raise InvalidParamsException("流水线步骤名称不能重复")
+
+    pending = {}
+    for step in steps:
+        for dep in step.depends_on:
+            if dep not in names:
+                raise InvalidParamsException(f"步骤{step.name}依赖的步骤不存在: {dep}")
+        pending[step.name] = set(step.depends_on)
+
+    order = []
+    ready = [name for name in names if not pending[name]]
+    while ready:
+        name = ready.pop(0)
+        order.append(name)
+        for other in names:
+            if name in pending[other]:
+                pending[other].discard(name)
+                if not pending[other] and other not in order and other not in ready:
+                    ready.append(other)
+    if len(order) != len(names):
+        cyclic = [name for name in names if name not in order]
+        raise InvalidParamsException(f"流水线步骤存在循环依赖: {', '.join(cyclic)}")
+    return order
+
+
+def step_input_hash(
+    step_type: str,
+    params: Dict[str, Any],
+    upstream_hashes: List[str],
+    source_fingerprint: Optional[str] = None
+) -> str:
+    """
+    计算步骤的输入哈希
+
+    上游步骤的输入哈希参与计算，任何上游参数或源数据变化都会逐级传递到下游。
+
+    Args:
+        step_type: 步骤类型
+        params: 步骤参数
+        upstream_hashes: 依赖步骤的输入哈希
+        source_fingerprint: 直接引用的数据集内容哈希
+
+    Returns:
+        str: sha256十六进制字符串
+    """
+    payload = json.dumps({
+        "type": step_type,
+        "params": params,
+        "upstream": sorted(upstream_hashes),
+        "source": source_fingerprint,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def clean_dataframe(df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
+    """
+    清洗文本分类数据
+
+    Args:
+        df: 包含text和label列的数据
+        params: strip（去除首尾空白，默认True）、lowercase、dedupe（按text去重，默认True）、
+            min_length/max_length（按字符数过滤）
+
+    Returns:
+        pd.DataFrame: 清洗后的数据
+    """
+    df = df.dropna(subset=["text", "label"]).copy()
+    df["text"] = df["text"].astype(str)
+    if params.get("strip", True):
+        df["text"] = df["text"].str.strip()
+    if params.get("lowercase", False):
+        df["text"] = df["text"].str.lower()
+    df = df[df["text"] != ""]
+    if params.get("min_length"):
+        df = df[df["text"].str.len() >= params["min_length"]]
+    if params.get("max_length"):
+        df = df[df["text"].str.len() <= params["max_length"]]
+    if params.get("dedupe", True):
+        df = df.drop_duplicates(subset=["text"], keep="first")
+    return df.reset_index(drop=True)
+
+
+class PipelineService:
+    """训练流水线服务类"""
+
+    def __init__(self):
+        # 运行中的流水线任务引用，避免被垃圾回收
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    async def create_pipeline(self, request: PipelineRequest, user_id: int) -> Dict[str, Any]:
+        """
+        创建流水线并开始第一次运行
+
+        Args:
+            request: 流水线请求
+            user_id: 用户ID
+
+        Returns:
+            Dict: 流水线ID和运行序号
+
+        Raises:
+            InvalidParamsException: 步骤图无效
+        """
+        self._validate_steps(request.steps)
+        with get_db_context() as session:
+            pipeline = TrainingPipeline(
+                user_id=user_id,
+                name=request.name,
+                steps=json.dumps([step.dict() for step in request.steps])
+            )
+            session.add(pipeline)
+            session.commit()
+            session.refresh(pipeline)
+            pipeline_id = pipeline.id
+
+        logger.info(f"流水线创建成功: ID={pipeline_id}, 共{len(request.steps)}个步骤")
+        return await self.run_pipeline(pipeline_id, user_id)
+
+    async def run_pipeline(self, pipeline_id: int, user_id: int = None) -> Dict[str, Any]:
+        """
+        运行流水线，输入未变化的步骤直接复用缓存
+
+        Args:
+            pipeline_id: 流水线ID
+            user_id: 用户ID，用于验证权限
+
+        Returns:
+            Dict: 流水线ID和运行序号
+
+        Raises:
+            ResourceNotFoundException: 流水线不存在或无权访问
+            InvalidParamsException: 流水线正在运行
+        """
+        with get_db_context() as session:
+            pipeline = self._get_pipeline(session, pipeline_id, user_id)
+            if pipeline.status == "running":
+                if pipeline_id in self._tasks:
+                    raise InvalidParamsException("流水线正在运行")
+                # 状态为running但本进程中没有执行任务，上次运行已中断
+                logger.warning(f"流水线{pipeline_id}第{pipeline.run_count}次运行已中断，重新运行")
+                self._fail_unfinished_runs(session, pipeline_id, pipeline.run_count)
+            pipeline.run_count += 1
+            pipeline.status = "running"
+            pipeline.started_at = datetime.utcnow()
+            pipeline.completed_at = None
+            session.add(pipeline)
+
+            steps = [PipelineStep(**step) for step in json.loads(pipeline.steps)]
+            run_number = pipeline.run_count
+            owner_id = pipeline.user_id
+            for step in steps:
+                session.add(PipelineStepRun(
+                    pipeline_id=pipeline_id,
+                    user_id=owner_id,
+                    run_number=run_number,
+                    step_name=step.name,
+                    step_type=step.type
+                ))
+            session.commit()
+
+        task = asyncio.create_task(self._execute(pipeline_id, run_number, steps, owner_id))
+        self._tasks[pipeline_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(pipeline_id, None))
+        return {"pipeline_id": pipeline_id, "run_number": run_number, "status": "running"}
+
+    async def get_pipeline(self, pipeline_id: int, user_id: int = None) -> Dict[str, Any]:
+        """
+        获取流水线定义和最近一次运行的步骤状态
+
+        Args:
+            pipeline_id: 流水线ID
+            user_id: 用户ID，用于验证权限
+
+        Returns:
+            Dict: 流水线详情
+
+        Raises:
+            ResourceNotFoundException: 流水线不存在或无权访问
+        """
+        with get_db_context() as session:
+            pipeline = self._get_pipeline(session, pipeline_id, user_id)
+            runs = session.exec(
+                select(PipelineStepRun).where(
+                    PipelineStepRun.pipeline_id == pipeline_id,
+                    PipelineStepRun.run_number == pipeline.run_count
+                ).order_by(PipelineStepRun.id)
+            ).all()
+
+            return {
+                "pipeline_id": pipeline.id,
+                "name": pipeline.name,
+                "status": pipeline.status,
+                "run_number": pipeline.run_count,
+                "steps": json.loads(pipeline.steps),
+                "created_at": pipeline.created_at.isoformat() if pipeline.created_at else None,
+                "started_at": pipeline.started_at.isoformat() if pipeline.started_at else None,
+                "completed_at": pipeline.completed_at.isoformat() if pipeline.completed_at else None,
+                "step_runs": [
+                    {
+                        "name": run.step_name,
+                        "type": run.step_type,
+                        "status": run.status,
+                        "input_hash": run.input_hash,
+                        "outputs": json.loads(run.outputs) if run.outputs else None,
+                        "error": run.error,
+                        "started_at": run.started_at.isoformat() if run.started_at else None,
+                        "completed_at": run.completed_at.isoformat() if run.completed_at else None
+                    }
+                    for run in runs
+                ]
+            }
+
+    def _validate_steps(self, steps: List[PipelineStep]):
+        """校验步骤图和各步骤的上游依赖"""
+        topological_order(steps)
+        by_name = {step.name: step for step in steps}
+        for step in steps:
+            required = STEP_REQUIREMENTS[step.type]
+            if required and not any(by_name[dep].type == "train" for dep in step.depends_on):
+                raise InvalidParamsException(f"{step.type}步骤{step.name}必须依赖一个train步骤")
+            if step.type in ("preprocess", "train") and "dataset_id" not in step.params:
+                if not any(by_name[dep].type == "preprocess" for dep in step.depends_on):
+                    raise InvalidParamsException(f"步骤{step.name}需要指定dataset_id或依赖一个preprocess步骤")
+
+    async def _execute(self, pipeline_id: int, run_number: int, steps: List[PipelineStep], user_id: int):
+        """
+        按依赖关系执行步骤，每个步骤等待其依赖完成后立即开始
+
+        Args:
+            pipeline_id: 流水线ID
+            run_number: 运行序号
+            steps: 步骤列表
+            user_id: 流水线所属用户ID
+        """
+        loop = asyncio.get_running_loop()
+        results: Dict[str, asyncio.Future] = {step.name: loop.create_future() for step in steps}
+
+        async def run(step: PipelineStep):
+            upstream = [await results[dep] for dep in step.depends_on]
+            result = None
+            try:
+                if any(r is None for r in upstream):
+                    self._update_run(pipeline_id, run_number, step.name, status="skipped", error="上游步骤失败")
+                else:
+                    result = await self._run_step(pipeline_id, run_number, step, upstream, user_id)
+            finally:
+                results[step.name].set_result(result)
+
+        # 执行过程中出现异常（包括任务被取消）时流水线记为失败，避免一直停留在running状态而无法重新运行
+        status = "failed"
+        try:
+            await asyncio.gather(*(run(step) for step in steps), return_exceptions=True)
+            if all(future.done() and future.result() is not None for future in results.values()):
+                status = "completed"
+        finally:
+            try:
+                with get_db_context() as session:
+                    pipeline = session.get(TrainingPipeline, pipeline_id)
+                    pipeline.status = status
+                    pipeline.completed_at = datetime.utcnow()
+                    session.add(pipeline)
+                    if status == "failed":
+                        self._fail_unfinished_runs(session, pipeline_id, run_number)
+                    session.commit()
+            except Exception as e:
+                logger.error(f"更新流水线状态失败: ID={pipeline_id}, 错误: {str(e)}")
+            logger.info(f"流水线运行结束: ID={pipeline_id}, 第{run_number}次, 状态={status}")
+
+    def recover_interrupted_runs(self) -> int:
+        """
+        将服务重启前未结束的流水线运行标记为失败
+
+        Returns:
+            int: 标记为失败的流水线数
+        """
+        with get_db_context() as session:
+            pipelines = session.exec(select(TrainingPipeline).where(TrainingPipeline.status == "running")).all()
+            for pipeline in pipelines:
+                pipeline.status = "failed"
+                pipeline.completed_at = datetime.utcnow()
+                session.add(pipeline)
+                self._fail_unfinished_runs(session, pipeline.id, pipeline.run_count)
+            session.commit()
+            if pipelines:
+                logger.warning(f"{len(pipelines)}个流水线在服务重启前未运行结束，已标记为失败")
+            return len(pipelines)
+
+    @staticmethod
+    def _fail_unfinished_runs(session, pipeline_id: int, run_number: int):
+        """将一次运行中仍为pending/running的步骤标记为失败"""
+        runs = session.exec(
+            select(PipelineStepRun).where(
+                PipelineStepRun.pipeline_id == pipeline_id,
+                PipelineStepRun.run_number == run_number,
+                PipelineStepRun.status.in_(("pending", "running"))
+            )
+        ).all()
+        for run in runs:
+            run.status = "failed"
+            run.error = "流水线运行中断"
+            run.completed_at = datetime.utcnow()
+            session.add(run)
+
+    async def _run_step(
+        self,
+        pipeline_id: int,
+        run_number: int,
+        step: PipelineStep,
+        upstream: List[Dict[str, Any]],
+        user_id: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        执行单个步骤，命中缓存时直接复用输出
+
+        Returns:
+            Optional[Dict]: 包含input_hash和outputs的结果，失败时返回None
+        """
+        try:
+            source = None
+            if "dataset_id" in step.params:
+                source = self._dataset_fingerprint(self._get_dataset(step.params["dataset_id"], user_id))
+            input_hash = step_input_hash(step.type, step.params, [r["input_hash"] for r in upstream], source)
+
+            cached = self._find_cached(user_id, step.type, input_hash)
+            if cached is not None:
+                self._update_run(
+                    pipeline_id, run_number, step.name, status="cached", input_hash=input_hash,
+                    outputs=cached, started_at=datetime.utcnow(), completed_at=datetime.utcnow()
+                )
+                logger.info(f"流水线{pipeline_id}步骤{step.name}输入未变化，复用缓存")
+                return {"input_hash": input_hash, "outputs": cached}
+
+            self._update_run(
+                pipeline_id, run_number, step.name, status="running", input_hash=input_hash,
+                started_at=datetime.utcnow()
+            )
+            inputs = {}
+            for result in upstream:
+                inputs.update(result["outputs"])
+            runner = getattr(self, f"_run_{step.type}")
+            outputs = await runner(step, inputs, user_id)
+
+            self._update_run(
+                pipeline_id, run_number, step.name, status="completed", outputs=outputs,
+                completed_at=datetime.utcnow()
+            )
+            return {"input_hash": input_hash, "outputs": outputs}
+
+        except Exception as e:
+            logger.error(f"流水线{pipeline_id}步骤{step.name}失败: {str(e)}")
+            self._update_run(
+                pipeline_id, run_number, step.name, status="failed", error=str(e),
+                completed_at=datetime.utcnow()
+            )
+            return None
+
+    async def _run_preprocess(self, step: PipelineStep, inputs: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+        """清洗数据集并登记为新的数据集"""
+        source = self._get_dataset(step.params.get("dataset_id", inputs.get("dataset_id")), user_id)
+        df = await asyncio.to_thread(pd.read_csv, source.file_path)
+        cleaned = clean_dataframe(df, step.params)
+        if cleaned.empty:
+            raise InvalidParamsException("清洗后数据集为空")
+
+        os.makedirs(settings.UPLOAD_PATH, exist_ok=True)
+        file_path = os.path.join(
+            settings.UPLOAD_PATH, f"{int(datetime.now().timestamp())}_{step.name}_{os.path.basename(source.file_path)}"
+        )
+        await asyncio.to_thread(cleaned.to_csv, file_path, index=False)
+        with get_db_context() as session:
+            dataset = Dataset(
+                name=f"{source.name} ({step.name})",
+                file_path=file_path,
+                total_rows=len(cleaned),
+                user_id=user_id
+            )
+            session.add(dataset)
+            session.commit()
+            session.refresh(dataset)
+            return {"dataset_id": dataset.id, "rows_in": len(df), "rows_out": len(cleaned)}
+
+    async def _run_train(self, step: PipelineStep, inputs: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+        """提交训练任务并等待结束"""
+        params = dict(step.params)
+        params.setdefault("dataset_id", inputs.get("dataset_id"))
+        try:
+            request = TrainingRequest(**params)
+        except ValidationError as e:
+            raise InvalidParamsException(f"训练参数无效: {e.errors()[0]['msg']}")
+
+        with get_db_context() as session:
+            training_service.get_usable_dataset(session, request.dataset_id, user_id)
+            job_id = training_service.create_job(session, request, user_id).id
+        training_service.submit_job(job_id)
+
+        while True:
+            await asyncio.sleep(TRAIN_POLL_INTERVAL)
+            with get_db_context() as session:
+                job = session.get(TrainingJob, job_id)
+                status, model_name = job.status, job.model_name
+            if status in TERMINAL_STATUSES:
+                break
+        if status != "completed":
+            raise InternalServerException(f"训练任务{job_id}未完成，状态为{status}")
+
+        artifact = self._get_artifact(job_id)
+        return {
+            "training_job_id": job_id,
+            "dataset_id": request.dataset_id,
+            "model_name": model_name,
+            "artifact_path": artifact.file_path if artifact else None
+        }
+
+    async def _run_evaluate(self, step: PipelineStep, inputs: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+        """在数据集上评估训练产物；没有模型文件（模拟训练）时使用训练记录的指标"""
+        job_id = inputs["training_job_id"]
+        dataset = self._get_dataset(step.params.get("dataset_id", inputs.get("dataset_id")), user_id)
+        artifact_path = inputs.get("artifact_path")
+
+        if artifact_path and os.path.exists(artifact_path) and engine_available():
+            from ..training.inference import evaluate_classifier
+            metrics = await asyncio.to_thread(
+                evaluate_classifier, artifact_path, dataset.file_path,
+                step.params.get("max_seq_length", 128), step.params.get("batch_size", 32)
+            )
+            source = "evaluation"
+        else:
+            with get_db_context() as session:
+                job = session.get(TrainingJob, job_id)
+                metrics = json.loads(job.metrics) if job.metrics else {}
+            source = "training_metrics"
+        return {"training_job_id": job_id, "dataset_id": dataset.id, "metrics": metrics, "metrics_source": source}
+
+    async def _run_export(self, step: PipelineStep, inputs: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+        """通过导出服务将训练产物导出为params.formats指定的格式（默认onnx），任一格式失败时步骤失败"""
+        job_id = inputs["training_job_id"]
+        try:
+            formats = validate_export_format_list(step.params.get("formats", ["onnx"]))
+        except ValueError as e:
+            raise InvalidParamsException(str(e))
+        export_service.check_formats(formats)
+        artifact = self._get_artifact(job_id)
+        if not artifact or not os.path.isdir(artifact.file_path):
+            raise InvalidParamsException(f"训练任务{job_id}没有可导出的模型文件")
+
+        results = await export_service.export_artifact(artifact.id, formats)
+        errors = [f"{result['format']}: {result['error']}" for result in results if "error" in result]
+        if errors:
+            raise InternalServerException(f"导出失败: {'; '.join(errors)}")
+        return {
+            "training_job_id": job_id,
+            "source_artifact_id": artifact.id,
+            "variants": {result["format"]: result["artifact_id"] for result in results}
+        }
+
+    def _find_cached(self, user_id: int, step_type: str, input_hash: str) -> Optional[Dict[str, Any]]:
+        """查找相同输入哈希的已完成步骤，且其输出仍然可用"""
+        with get_db_context() as session:
+            runs = session.exec(
+                select(PipelineStepRun.outputs).where(
+                    PipelineStepRun.user_id == user_id,
+                    PipelineStepRun.step_type == step_type,
+                    PipelineStepRun.input_hash == input_hash,
+                    PipelineStepRun.status == "completed"
+                ).order_by(PipelineStepRun.id.desc())
+            ).all()
+            for outputs in runs:
+                outputs = json.loads(outputs)
+                if self._outputs_available(session, outputs):
+                    return outputs
+        return None
+
+    def _outputs_available(self, session, outputs: Dict[str, Any]) -> bool:
+        """检查缓存输出引用的数据集、训练任务和文件是否仍然存在"""
+        if "dataset_id" in outputs:
+            dataset = session.get(Dataset, outputs["dataset_id"])
+            if not dataset or not os.path.exists(dataset.file_path):
+                return False
+        if "training_job_id" in outputs:
+            job = session.get(TrainingJob, outputs["training_job_id"])
+            if not job or job.status != "completed":
+                return False
+        if outputs.get("artifact_path") and not os.path.exists(outputs["artifact_path"]):
+            return False
+        for artifact_id in outputs.get("variants", {}).values():
+            variant = session.get(ModelArtifact, artifact_id)
+            if not variant or not os.path.exists(variant.file_path):
+                return False
+        return True
+
+    def _dataset_fingerprint(self, dataset: Dataset) -> str:
+        """数据集文件内容的sha256"""
+        return file_sha256(dataset.file_path)
+
+    def _get_dataset(self, dataset_id: Optional[int], user_id: int) -> Dataset:
+        with get_db_context() as session:
+            if dataset_id is None:
+                raise InvalidParamsException("步骤缺少数据集")
+            dataset = training_service.get_usable_dataset(session, dataset_id, user_id)
+            # 会话退出时会提交并使对象过期，脱离会话后继续读取其属性
+            session.expunge(dataset)
+            return dataset
+
+    def _get_artifact(self, job_id: int) -> Optional[ModelArtifact]:
+        """训练任务最新的训练产物；训练完成后异步导出的变体同样登记在该任务下，需要排除"""
+        with get_db_context() as session:
+            artifact = latest_trained_artifact(session, job_id)
+            if artifact:
+                session.expunge(artifact)
+            return artifact
+
+    def _update_run(self, pipeline_id: int, run_number: int, step_name: str, outputs: Dict[str, Any] = None, **fields):
+        """更新步骤运行记录"""
+        with get_db_context() as session:
+            run = session.exec(
+                select(PipelineStepRun).where(
+                    PipelineStepRun.pipeline_id == pipeline_id,
+                    PipelineStepRun.run_number == run_number,
+                    PipelineStepRun.step_name == step_name
+                )
+            ).first()
+            for name, value in fields.items():
+                setattr(run, name, value)
+            if outputs is not None:
+                run.outputs = json.dumps(outputs)
+            session.add(run)
+            session.commit()
+
+    def _get_pipeline(self, session, pipeline_id: int, user_id: int = None) -> TrainingPipeline:
+        pipeline = session.get(TrainingPipeline, pipeline_id)
+        if not pipeline or (user_id is not None and pipeline.user_id != user_id):
+            raise ResourceNotFoundException(f"流水线不存在: {pipeline_id}")
+        return pipeline
+
+
+# 全局流水线服务实例
+pipeline_service = PipelineService()
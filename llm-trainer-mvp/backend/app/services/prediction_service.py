@@ -3,15 +3,23 @@
 
 import logging
 import asyncio
+import functools
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 
 from sqlmodel import Session, select
 
-from ..models import Dataset, TrainingJob
-from ..db import get_session
+from ..models import Dataset, TrainingJob, ModelArtifact
+from ..db import get_db_context
+from ..core.config import settings
+from ..core.errors import InvalidParamsException
 from ..schemas import PredictionRequest, PredictionResponse
+from ..training import engine_available
+from ..training.serving import DEFAULT_MAX_SEQ_LENGTH, Predictor, load_predictor
 from ..utils.exceptions import PredictionException, ResourceNotFoundException
+from ..utils.micro_batch import MicroBatcher
+from ..utils.model_cache import ModelCache
+from .export_service import latest_trained_artifact
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +29,13 @@ class PredictionService:
     
     def __init__(self):
         self.default_model_name = "cardiffnlp/twitter-roberta-base-sentiment-latest"
-        self.model_cache = {}
+        self.model_cache = ModelCache(settings.PREDICTION_CACHE_MB * 1024 * 1024)
+        # 同一模型并发加载时只加载一次
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        # 每个模型一个组批队列，并发请求合并为一次批量推理
+        self._batchers: Dict[str, MicroBatcher] = {}
+        # 超出缓存剩余容量而未缓存的最近一个模型，避免每个批次都从磁盘重新加载；只保留一个，内存仍有上限
+        self._uncached: Optional[Tuple[str, Predictor]] = None
     
     async def predict(self, request: PredictionRequest) -> PredictionResponse:
         """
@@ -38,7 +52,7 @@ class PredictionService:
             PredictionException: 预测执行失败
         """
         try:
-            logger.info(f"开始文本预测: text_length={len(request.text)}, model_id={request.model_id}")
+            logger.info(f"开始文本预测: text_length={len(request.text)}, model_id={request.model_id}, variant={request.variant}")
             
             # 验证输入
             if not request.text or len(request.text.strip()) == 0:
@@ -46,10 +60,10 @@ class PredictionService:
             
             # 获取模型信息
             model_info = await self._get_model_info(request.model_id)
-            model_name = model_info.get('model_name', self.default_model_name)
+            if request.variant is not None:
+                model_info.update(self._get_variant_info(request.model_id, request.variant))
             
-            # 模拟预测过程
-            predicted_class, confidence = await self._simulate_prediction(request.text)
+            predicted_class, confidence = await self._get_batcher(model_info).submit(request.text)
             
             logger.info(f"预测完成: class={predicted_class}, confidence={confidence:.4f}")
             
@@ -57,7 +71,8 @@ class PredictionService:
                 text=request.text,
                 predicted_class=predicted_class,
                 confidence=confidence,
-                model_id=request.model_id
+                model_id=request.model_id,
+                variant=request.variant
             )
             
         except Exception as e:
@@ -78,14 +93,10 @@ class PredictionService:
         """
         if model_id is None:
             logger.info("使用默认预训练模型")
-            return {
-                'model_id': None,
-                'model_name': self.default_model_name,
-                'model_type': 'pretrained'
-            }
+            return self._default_model_info()
         
         # 查询训练任务中的模型
-        with get_session() as session:
+        with get_db_context() as session:
             training_job = session.exec(
                 select(TrainingJob).where(
                     TrainingJob.id == model_id,
@@ -93,22 +104,209 @@ class PredictionService:
                 )
             ).first()
             
-            if training_job and training_job.model_name:
+            artifact = latest_trained_artifact(session, model_id) if training_job else None
+            if artifact:
                 logger.info(f"使用训练模型: {training_job.model_name}")
                 return {
                     'model_id': model_id,
                     'model_name': training_job.model_name,
-                    'model_type': 'trained'
+                    'model_type': 'trained',
+                    'model_path': artifact.file_path,
+                    'artifact_type': artifact.artifact_type,
+                    'cache_key': f"artifact:{artifact.id}",
+                    'max_seq_length': training_job.max_seq_length
                 }
             
             # 如果找不到训练模型，回退到默认模型
-            logger.warning(f"模型ID {model_id} 不存在或未完成训练，使用默认模型")
+            logger.warning(f"模型ID {model_id} 不存在、未完成训练或没有模型产物，使用默认模型")
+            return self._default_model_info()
+    
+    def _default_model_info(self) -> Dict[str, Any]:
+        """默认预训练模型的信息"""
+        return {
+            'model_id': None,
+            'model_name': self.default_model_name,
+            'model_type': 'pretrained',
+            'model_path': self.default_model_name,
+            'artifact_type': 'full',
+            'cache_key': f"pretrained:{self.default_model_name}",
+            'max_seq_length': DEFAULT_MAX_SEQ_LENGTH
+        }
+    
+    def _get_variant_info(self, model_id: int, variant: str) -> Dict[str, Any]:
+        """
+        获取训练任务最新的导出或量化变体
+        
+        Args:
+            model_id: 训练任务ID
+            variant: 变体类型，onnx/torchscript/int8
+            
+        Returns:
+            Dict: 变体的产物ID、名称和文件路径
+            
+        Raises:
+            ValueError: 训练任务没有该变体
+        """
+        with get_db_context() as session:
+            artifact = session.exec(
+                select(ModelArtifact).where(
+                    ModelArtifact.training_job_id == model_id,
+                    ModelArtifact.artifact_type == variant
+                ).order_by(ModelArtifact.id.desc())
+            ).first()
+            if not artifact:
+                raise ValueError(f"训练任务{model_id}没有{variant}变体，请先导出")
+            logger.info(f"使用模型变体: {artifact.name}")
             return {
-                'model_id': None,
-                'model_name': self.default_model_name,
-                'model_type': 'pretrained'
+                'artifact_id': artifact.id,
+                'model_name': artifact.name,
+                'model_path': artifact.file_path,
+                'artifact_type': variant,
+                'cache_key': f"artifact:{artifact.id}",
+                'variant': variant
             }
     
+    async def _get_predictor(self, model_info: Dict[str, Any]) -> Predictor:
+        """
+        从缓存取出推理模型，未缓存时加载并放入缓存
+        
+        Args:
+            model_info: 模型信息，包含cache_key、model_path、artifact_type和max_seq_length
+            
+        Returns:
+            Predictor: 推理模型
+        """
+        key = model_info['cache_key']
+        predictor = self.model_cache.get(key) or self._peek_uncached(key)
+        if predictor is not None:
+            return predictor
+        
+        async with self._load_locks.setdefault(key, asyncio.Lock()):
+            # 等待锁期间其他请求可能已加载完成
+            predictor = self.model_cache.peek(key) or self._peek_uncached(key)
+            if predictor is None:
+                logger.info(f"加载推理模型: {model_info['model_name']}")
+                predictor = await asyncio.to_thread(
+                    load_predictor, model_info['model_path'], model_info['artifact_type'], model_info['max_seq_length']
+                )
+                if not self.model_cache.put(key, predictor, predictor.size_bytes):
+                    logger.warning(f"推理模型{model_info['model_name']}超出缓存剩余容量，不放入缓存，替换之前未缓存的模型")
+                    self._uncached = (key, predictor)
+        return predictor
+    
+    def _peek_uncached(self, key: str) -> Optional[Predictor]:
+        """取出未缓存的模型，键不同时为None"""
+        uncached = self._uncached
+        return uncached[1] if uncached and uncached[0] == key else None
+    
+    def invalidate_model(self, cache_key: str):
+        """
+        丢弃已加载的模型，下次请求时从磁盘重新加载
+        
+        重新导出覆盖同一变体的文件后调用，固定状态保留。
+        
+        Args:
+            cache_key: 模型缓存键
+        """
+        self.model_cache.invalidate(cache_key)
+        if self._peek_uncached(cache_key) is not None:
+            self._uncached = None
+    
+    def _get_batcher(self, model_info: Dict[str, Any]) -> MicroBatcher:
+        """获取模型的组批队列，不存在时创建"""
+        key = model_info['cache_key']
+        if key not in self._batchers:
+            self._batchers[key] = MicroBatcher(
+                functools.partial(self._predict_batch, model_info),
+                settings.PREDICTION_MAX_BATCH_SIZE,
+                settings.PREDICTION_MAX_WAIT_MS
+            )
+        return self._batchers[key]
+    
+    async def _predict_batch(self, model_info: Dict[str, Any], texts: List[str]) -> List[Tuple[str, float]]:
+        """
+        对一批文本执行一次批量推理，文本按批次中最长的填充
+        
+        Args:
+            model_info: 模型信息
+            texts: 同一批次的文本
+            
+        Returns:
+            List[Tuple]: 每条文本的(predicted_class, confidence)
+        """
+        if not engine_available():
+            # 未安装torch/transformers时使用模拟预测
+            return list(await asyncio.gather(*(self._simulate_prediction(text) for text in texts)))
+        predictor = await self._get_predictor(model_info)
+        return await asyncio.to_thread(predictor.predict, texts)
+    
+    def get_batching_stats(self) -> Dict[str, Any]:
+        """
+        各模型的动态组批统计
+        
+        Returns:
+            Dict: 组批配置，以及每个模型的请求数、批次数、平均批次大小和p50/p99延迟（毫秒）
+        """
+        return {
+            "max_batch_size": settings.PREDICTION_MAX_BATCH_SIZE,
+            "max_wait_ms": settings.PREDICTION_MAX_WAIT_MS,
+            "models": {key: batcher.stats() for key, batcher in self._batchers.items()},
+        }
+    
+    async def pin_model(self, model_id: Optional[int] = None, variant: Optional[str] = None) -> Dict[str, Any]:
+        """
+        固定常用模型，加载到缓存并且不被淘汰
+        
+        Args:
+            model_id: 训练任务ID，为空时固定默认预训练模型
+            variant: 模型产物变体
+            
+        Returns:
+            Dict: 缓存统计
+            
+        Raises:
+            InvalidParamsException: 未安装推理依赖，或指定变体但未指定训练任务
+        """
+        if not engine_available():
+            raise InvalidParamsException("加载推理模型需要安装torch和transformers")
+        model_info = await self._resolve_model_info(model_id, variant)
+        self.model_cache.pin(model_info['cache_key'])
+        try:
+            await self._get_predictor(model_info)
+        except Exception as e:
+            self.model_cache.unpin(model_info['cache_key'])
+            raise PredictionException(f"加载推理模型失败: {str(e)}", model_id)
+        return self.get_cache_stats()
+    
+    async def unpin_model(self, model_id: Optional[int] = None, variant: Optional[str] = None) -> Dict[str, Any]:
+        """
+        取消固定模型，之后按最近使用顺序参与淘汰
+        
+        Returns:
+            Dict: 缓存统计
+        """
+        model_info = await self._resolve_model_info(model_id, variant)
+        self.model_cache.unpin(model_info['cache_key'])
+        return self.get_cache_stats()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """推理模型缓存的命中、未命中、淘汰次数、当前缓存的模型，以及超出容量未缓存的模型"""
+        stats = self.model_cache.stats()
+        stats["uncached_model"] = self._uncached[0] if self._uncached else None
+        return stats
+    
+    async def _resolve_model_info(self, model_id: Optional[int], variant: Optional[str]) -> Dict[str, Any]:
+        """解析训练任务和变体对应的模型信息"""
+        if variant is not None and model_id is None:
+            raise InvalidParamsException("指定变体时需要指定model_id")
+        model_info = await self._get_model_info(model_id)
+        if variant is not None:
+            try:
+                model_info.update(self._get_variant_info(model_id, variant))
+            except ValueError as e:
+                raise InvalidParamsException(str(e))
+        return model_info
+    
     async def _simulate_prediction(self, text: str) -> tuple[str, float]:
         """
         模拟模型预测（实际实现中应替换为真实的模型推理）
@@ -139,6 +337,7 @@ class PredictionService:
     def clear_cache(self):
         """清理模型缓存"""
         self.model_cache.clear()
+        self._uncached = None
         logger.info("模型缓存已清理")
 
 
@@ -0,0 +1,115 @@
+# 训练进度发布/订阅服务
+# 训练执行器作为唯一的生产者发布事件，多个订阅者（SSE连接）共享同一份事件流
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Set, Any, Optional, AsyncGenerator
+
+logger = logging.getLogger(__name__)
+
+# 任务结束状态，收到这些状态后关闭订阅
+TERMINAL_STATUSES = ("completed", "failed", "stopped")
+
+
+class ProgressBroker:
+    """训练进度发布/订阅中心
+
+    进程内实现：训练执行器每个事件只发布一次，由broker扇出到所有订阅队列，
+    订阅者不再各自查询数据库或读取日志文件。多worker部署时每个进程各自维护订阅关系。
+    """
+
+    def __init__(self, max_queue_size: int = 256):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, job_id: int) -> asyncio.Queue:
+        """
+        订阅训练任务事件
+
+        Args:
+            job_id: 训练任务ID
+
+        Returns:
+            asyncio.Queue: 接收事件的队列
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        logger.debug(f"新增训练进度订阅: job_id={job_id}, 订阅数={len(self._subscribers[job_id])}")
+        return queue
+
+    def unsubscribe(self, job_id: int, queue: asyncio.Queue) -> None:
+        """取消订阅"""
+        queues = self._subscribers.get(job_id)
+        if not queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[job_id]
+
+    def subscriber_count(self, job_id: int) -> int:
+        """获取任务当前订阅数"""
+        return len(self._subscribers.get(job_id, ()))
+
+    def publish(self, job_id: int, event: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        发布训练事件
+
+        Args:
+            job_id: 训练任务ID
+            event: 事件类型，如 status/progress/metrics/log
+            data: 事件数据
+        """
+        queues = self._subscribers.get(job_id)
+        if not queues:
+            return
+
+        message = {
+            "event": event,
+            "job_id": job_id,
+            "data": data or {},
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        for queue in list(queues):
+            if queue.full():
+                # 慢订阅者丢弃最旧的事件，避免阻塞训练执行器
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(message)
+
+    async def listen(
+        self, job_id: int, heartbeat: float, queue: Optional[asyncio.Queue] = None
+    ) -> AsyncGenerator[Optional[Dict[str, Any]], None]:
+        """
+        监听训练任务事件，直到任务进入结束状态
+
+        Args:
+            job_id: 训练任务ID
+            heartbeat: 心跳间隔（秒），超时未收到事件时产出None
+            queue: 已通过subscribe订阅的队列；在读取快照之前订阅，快照之后发布的事件不会丢失。
+                为空时在首次迭代时订阅
+
+        Yields:
+            Dict: 事件消息；None表示心跳
+        """
+        if queue is None:
+            queue = self.subscribe(job_id)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+
+                yield message
+                if message["event"] == "status" and message["data"].get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            self.unsubscribe(job_id, queue)
+
+
+# 全局进度发布中心实例
+progress_broker = ProgressBroker()
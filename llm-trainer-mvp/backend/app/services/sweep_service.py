@@ -0,0 +1,415 @@
+# 超参搜索服务层
+# 将搜索空间展开为子训练任务，并用异步逐次减半（ASHA）提前停止较差的试验
+
+import json
+import math
+import random
+import itertools
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from pydantic import ValidationError
+from sqlmodel import select
+
+from ..models import TrainingJob, TrainingSweep
+from ..db import get_db_context
+from ..schemas import TrainingRequest, SweepRequest, SearchRange
+from ..core.errors import (
+    ResourceNotFoundException, InvalidParamsException, DatasetNotFoundException, InternalServerException
+)
+from .training_service import training_service
+
+logger = logging.getLogger(__name__)
+
+# 可搜索的超参数及其类型
+SWEEP_PARAMS = {
+    "learning_rate": float,
+    "batch_size": int,
+    "epochs": int,
+}
+# 试验每轮结束时上报的指标，验证集指标只在划分验证集时产生
+EPOCH_METRICS = ("train_loss",)
+EVAL_METRICS = ("eval_loss", "eval_accuracy")
+
+
+def check_sweep_metric(metric: str, validation_split: float):
+    """
+    检查试验每轮结束时能否产生用于比较的指标
+
+    Raises:
+        InvalidParamsException: 指标不会被上报
+    """
+    if metric in EVAL_METRICS and not validation_split:
+        raise InvalidParamsException(f"指标{metric}需要划分验证集（validation_split大于0）")
+    if metric not in EPOCH_METRICS + EVAL_METRICS:
+        raise InvalidParamsException(
+            f"不支持的比较指标: {metric}，可选{', '.join(EPOCH_METRICS + EVAL_METRICS)}"
+        )
+
+
+def expand_search_space(
+    strategy: str,
+    search_space: Dict[str, Any],
+    max_trials: int,
+    seed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    将搜索空间展开为超参数组合列表
+
+    Args:
+        strategy: grid（笛卡尔积，只支持离散取值）或random（随机采样）
+        search_space: 参数名到离散取值列表或SearchRange的映射
+        max_trials: 最大试验数
+        seed: 随机种子
+
+    Returns:
+        List[Dict]: 超参数组合列表
+
+    Raises:
+        InvalidParamsException: 搜索空间无效
+    """
+    names = sorted(search_space)
+    for name in names:
+        if name not in SWEEP_PARAMS:
+            raise InvalidParamsException(f"不支持搜索的参数: {name}")
+
+    if strategy == "grid":
+        value_lists = []
+        for name in names:
+            values = search_space[name]
+            if isinstance(values, SearchRange):
+                raise InvalidParamsException(f"网格搜索只支持离散取值: {name}")
+            value_lists.append([SWEEP_PARAMS[name](v) for v in values])
+        configs = [dict(zip(names, combo)) for combo in itertools.product(*value_lists)]
+        if len(configs) > max_trials:
+            raise InvalidParamsException(f"网格共{len(configs)}种组合，超过max_trials={max_trials}")
+        return configs
+
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(max_trials):
+        config = {}
+        for name in names:
+            space = search_space[name]
+            if isinstance(space, SearchRange):
+                if space.log:
+                    value = math.exp(rng.uniform(math.log(space.min), math.log(space.max)))
+                else:
+                    value = rng.uniform(space.min, space.max)
+            else:
+                value = rng.choice(space)
+            config[name] = round(value) if SWEEP_PARAMS[name] is int else float(value)
+        configs.append(config)
+    return configs
+
+
+class AshaScheduler:
+    """异步逐次减半（ASHA）淘汰器
+
+    在第 grace_epochs * reduction_factor^k 轮结束时设置检查点（rung）。试验到达检查点时，
+    只有指标位于该检查点已记录结果前 1/reduction_factor 的试验才继续训练，其余立即停止，
+    把CPU让给排队中的试验。判断不需要等待同批试验全部到达，因此不会出现空闲等待。
+    """
+
+    def __init__(self, reduction_factor: int = 3, grace_epochs: int = 1, mode: str = "min"):
+        self.reduction_factor = reduction_factor
+        self.grace_epochs = grace_epochs
+        self.mode = mode
+        self._rungs: Dict[int, Dict[int, float]] = {}
+        self.last_values: Dict[int, float] = {}
+        self._last_epochs: Dict[int, int] = {}
+
+    def is_rung(self, epoch: int) -> bool:
+        """判断该轮是否为检查点"""
+        milestone = self.grace_epochs
+        while milestone < epoch:
+            milestone *= self.reduction_factor
+        return milestone == epoch
+
+    def report(self, trial_id: int, epoch: int, value: float) -> bool:
+        """
+        上报试验在某一轮结束时的指标
+
+        Args:
+            trial_id: 试验（训练任务）ID
+            epoch: 已完成的轮数
+            value: 指标值
+
+        Returns:
+            bool: 是否继续训练
+        """
+        self.last_values[trial_id] = value
+        self._last_epochs[trial_id] = epoch
+        if not self.is_rung(epoch):
+            return True
+
+        recorded = self._rungs.setdefault(epoch, {})
+        recorded[trial_id] = value
+        ranked = sorted(recorded.values(), reverse=self.mode == "max")
+        keep = max(1, len(ranked) // self.reduction_factor)
+        cutoff = ranked[keep - 1]
+        if self.mode == "max":
+            return value >= cutoff
+        return value <= cutoff
+
+    def best_trial(self) -> Optional[int]:
+        """返回训练轮数最多的试验中，最后一次上报指标最优的试验ID"""
+        if not self.last_values:
+            return None
+        deepest = max(self._last_epochs.values())
+        candidates = [t for t, e in self._last_epochs.items() if e == deepest]
+        pick = max if self.mode == "max" else min
+        return pick(candidates, key=self.last_values.get)
+
+
+class SweepService:
+    """超参搜索服务类"""
+
+    def __init__(self):
+        # 每个运行中搜索的ASHA状态，仅保存在当前进程内
+        self._schedulers: Dict[int, AshaScheduler] = {}
+        # 真实训练的指标由监控工作进程的后台线程上报，ASHA状态的读写需要加锁
+        self._lock = threading.Lock()
+
+    async def start_sweep(self, request: SweepRequest, user_id: int = None) -> Dict[str, Any]:
+        """
+        创建超参搜索并提交全部子训练任务
+
+        Args:
+            request: 超参搜索请求
+            user_id: 用户ID，用于验证权限
+
+        Returns:
+            Dict: 搜索ID和子任务ID列表
+
+        Raises:
+            InvalidParamsException: 搜索空间或展开后的参数无效
+            DatasetNotFoundException: 数据集不存在或无权访问
+            InternalServerException: 创建失败
+        """
+        check_sweep_metric(request.metric, request.validation_split)
+        configs = expand_search_space(request.strategy, request.search_space, request.max_trials, request.seed)
+
+        # 复用TrainingRequest的取值约束校验每个组合
+        try:
+            trial_requests = [
+                TrainingRequest(
+                    dataset_id=request.dataset_id,
+                    description=request.description,
+                    validation_split=request.validation_split,
+                    **config
+                )
+                for config in configs
+            ]
+        except ValidationError as e:
+            raise InvalidParamsException(f"超参数组合无效: {e.errors()[0]['msg']}")
+
+        sweep_id = None
+        job_ids: List[int] = []
+        try:
+            with get_db_context() as session:
+                dataset = training_service.get_usable_dataset(session, request.dataset_id, user_id)
+                owner_id = dataset.user_id if user_id is None else user_id
+
+                sweep = TrainingSweep(
+                    dataset_id=request.dataset_id,
+                    user_id=owner_id,
+                    strategy=request.strategy,
+                    search_space=json.dumps(
+                        {k: v.dict() if isinstance(v, SearchRange) else v for k, v in request.search_space.items()}
+                    ),
+                    metric=request.metric,
+                    mode=request.mode,
+                    reduction_factor=request.reduction_factor,
+                    grace_epochs=request.grace_epochs,
+                    description=request.description
+                )
+                session.add(sweep)
+                session.commit()
+                session.refresh(sweep)
+                sweep_id = sweep.id
+
+                # 每个试验创建时单独提交，某个组合校验失败（如超出内存预算）时需要撤销已创建的部分
+                for trial in trial_requests:
+                    job_ids.append(training_service.create_job(session, trial, owner_id, sweep_id=sweep_id).id)
+
+        except Exception as e:
+            logger.error(f"启动超参搜索失败: {str(e)}")
+            if sweep_id is not None:
+                self._abort_sweep(sweep_id, job_ids)
+            if isinstance(e, (InvalidParamsException, DatasetNotFoundException)):
+                raise
+            raise InternalServerException(f"启动超参搜索失败: {str(e)}")
+
+        self._schedulers[sweep_id] = AshaScheduler(request.reduction_factor, request.grace_epochs, request.mode)
+        for job_id in job_ids:
+            training_service.submit_job(job_id)
+
+        logger.info(f"超参搜索启动成功: ID={sweep_id}, 共{len(job_ids)}个试验")
+        return {"sweep_id": sweep_id, "job_ids": job_ids, "status": "running"}
+
+    def _abort_sweep(self, sweep_id: int, job_ids: List[int]):
+        """
+        撤销未能全部创建试验的搜索：删除已创建但尚未提交调度的试验，搜索标记为失败
+
+        Args:
+            sweep_id: 超参搜索ID
+            job_ids: 已创建的试验任务ID
+        """
+        self._schedulers.pop(sweep_id, None)
+        with get_db_context() as session:
+            for job_id in job_ids:
+                job = session.get(TrainingJob, job_id)
+                if job:
+                    session.delete(job)
+            sweep = session.get(TrainingSweep, sweep_id)
+            if sweep:
+                sweep.status = "failed"
+                sweep.completed_at = datetime.utcnow()
+                session.add(sweep)
+            session.commit()
+
+    async def get_sweep(self, sweep_id: int, user_id: int = None) -> Dict[str, Any]:
+        """
+        获取超参搜索详情和各试验状态
+
+        Args:
+            sweep_id: 超参搜索ID
+            user_id: 用户ID，用于验证权限
+
+        Returns:
+            Dict: 搜索详情
+
+        Raises:
+            ResourceNotFoundException: 搜索不存在或无权访问
+        """
+        with get_db_context() as session:
+            sweep = self._get_sweep(session, sweep_id, user_id)
+            jobs = session.exec(
+                select(TrainingJob).where(TrainingJob.sweep_id == sweep_id).order_by(TrainingJob.id)
+            ).all()
+            scheduler = self._schedulers.get(sweep_id)
+            last_values = scheduler.last_values if scheduler else {}
+
+            return {
+                "sweep_id": sweep.id,
+                "dataset_id": sweep.dataset_id,
+                "strategy": sweep.strategy,
+                "search_space": json.loads(sweep.search_space),
+                "metric": sweep.metric,
+                "mode": sweep.mode,
+                "status": sweep.status,
+                "best_job_id": sweep.best_job_id,
+                "created_at": sweep.created_at.isoformat() if sweep.created_at else None,
+                "completed_at": sweep.completed_at.isoformat() if sweep.completed_at else None,
+                "trials": [
+                    {
+                        "job_id": job.id,
+                        "status": job.status,
+                        "progress": job.progress,
+                        "epochs": job.epochs,
+                        "learning_rate": job.learning_rate,
+                        "batch_size": job.batch_size,
+                        "metric_value": last_values.get(job.id)
+                    }
+                    for job in jobs
+                ]
+            }
+
+    async def stop_sweep(self, sweep_id: int, user_id: int = None) -> bool:
+        """
+        停止超参搜索及其所有未结束的试验
+
+        Args:
+            sweep_id: 超参搜索ID
+            user_id: 用户ID，用于验证权限
+
+        Returns:
+            bool: 是否成功停止
+        """
+        with get_db_context() as session:
+            sweep = self._get_sweep(session, sweep_id, user_id)
+            if sweep.status != "running":
+                raise InvalidParamsException(f"搜索状态为{sweep.status}，无法停止")
+            job_ids = session.exec(
+                select(TrainingJob.id).where(
+                    TrainingJob.sweep_id == sweep_id,
+                    TrainingJob.status.in_(["pending", "running"])
+                )
+            ).all()
+            sweep.status = "stopped"
+            sweep.completed_at = datetime.utcnow()
+            session.add(sweep)
+            session.commit()
+
+        for job_id in job_ids:
+            await training_service.stop_training(job_id)
+        logger.info(f"超参搜索已停止: ID={sweep_id}")
+        return True
+
+    def report_epoch(self, job_id: int, sweep_id: int, epoch: int, metrics: Dict[str, float]) -> bool:
+        """
+        训练执行器在每轮结束时上报指标，由ASHA决定试验是否继续
+
+        Args:
+            job_id: 训练任务ID
+            sweep_id: 所属超参搜索ID
+            epoch: 已完成的轮数
+            metrics: 本轮结束时的指标
+
+        Returns:
+            bool: 是否继续训练，没有上报比较指标时停止该试验
+        """
+        scheduler = self._schedulers.get(sweep_id)
+        if scheduler is None:
+            return True
+        with get_db_context() as session:
+            sweep = session.get(TrainingSweep, sweep_id)
+            metric = sweep.metric if sweep else None
+        value = metrics.get(metric)
+        if value is None:
+            # 启动时已校验指标能够产生，缺失说明试验无法参与比较，继续训练只会浪费资源
+            logger.error(f"试验{job_id}第{epoch}轮没有上报指标{metric}，停止该试验")
+            return False
+        with self._lock:
+            return scheduler.report(job_id, epoch, float(value))
+
+    def on_trial_finished(self, sweep_id: int):
+        """
+        试验结束时检查搜索是否全部完成，并记录最优试验
+
+        Args:
+            sweep_id: 超参搜索ID
+        """
+        with get_db_context() as session:
+            sweep = session.get(TrainingSweep, sweep_id)
+            if not sweep or sweep.status != "running":
+                return
+            unfinished = session.exec(
+                select(TrainingJob.id).where(
+                    TrainingJob.sweep_id == sweep_id,
+                    TrainingJob.status.in_(["pending", "running"])
+                )
+            ).first()
+            if unfinished is not None:
+                return
+
+            scheduler = self._schedulers.get(sweep_id)
+            sweep.best_job_id = scheduler.best_trial() if scheduler else None
+            sweep.status = "completed"
+            sweep.completed_at = datetime.utcnow()
+            session.add(sweep)
+            session.commit()
+            logger.info(f"超参搜索完成: ID={sweep_id}, 最优试验={sweep.best_job_id}")
+
+    def _get_sweep(self, session, sweep_id: int, user_id: int = None) -> TrainingSweep:
+        sweep = session.get(TrainingSweep, sweep_id)
+        if not sweep or (user_id is not None and sweep.user_id != user_id):
+            raise ResourceNotFoundException(f"超参搜索不存在: {sweep_id}")
+        return sweep
+
+
+# 全局超参搜索服务实例
+sweep_service = SweepService()
@@ -2,20 +2,67 @@
 # 处理模型训练相关的业务逻辑
 
 import os
+import json
+import hashlib
 import logging
 import asyncio
+import time
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncGenerator, Set, Tuple
 
-from sqlmodel import Session, select
-from ..models import TrainingJob, Dataset
-from ..db import get_session
+from sqlmodel import Session, select, func
+from ..models import TrainingJob, Dataset, ModelArtifact, User
+from ..db import get_db_context
 from ..core.config import settings
 from ..schemas import TrainingRequest
-from ..core.errors import TrainingNotFoundException, DatasetNotFoundException, InternalServerException, InvalidParamsException
+from ..core.errors import (
+    TrainingNotFoundException, DatasetNotFoundException, InternalServerException, InvalidParamsException,
+    ResourceNotFoundException
+)
+from ..utils.job_log import JobLog, make_record, format_record
+from ..utils.file_hash import file_sha256
+from ..training import engine_available, peft_available, code_version
+from ..training.base import TrainingConfig, TrainingCallbacks
+from ..training.memory import load_model_profile, estimate_peak_memory
+from ..training.profiling import PROFILE_SUMMARY_NAME, PROFILE_TRACE_NAME
+from .progress_broker import progress_broker, TERMINAL_STATUSES
+from .metrics_service import metrics_service
+from .job_scheduler import training_scheduler
+from .export_service import export_service, latest_trained_artifact, TRAINABLE_ARTIFACT_TYPES
 
 logger = logging.getLogger(__name__)
 
+# 真实训练时进度写库和停止检查的最小间隔（秒）
+PROGRESS_SYNC_INTERVAL = 1.0
+# 训练任务列表返回的列
+JOB_LIST_COLUMNS = (
+    TrainingJob.id,
+    TrainingJob.dataset_id,
+    TrainingJob.status,
+    TrainingJob.progress,
+    TrainingJob.model_name,
+    TrainingJob.epochs,
+    TrainingJob.learning_rate,
+    TrainingJob.batch_size,
+    TrainingJob.method,
+    TrainingJob.sweep_id,
+    TrainingJob.started_at,
+    TrainingJob.completed_at,
+)
+# 参与训练结果指纹的请求字段，只包含影响训练出的模型的超参数；
+# 数据集以内容哈希参与，基座模型、初始化和教师模型以解析后的名称和产物ID参与
+FINGERPRINT_FIELDS = {
+    "epochs", "learning_rate", "batch_size", "max_seq_length", "bucket_by_length", "shuffle_within_buckets",
+    "gradient_accumulation_steps", "precision", "method", "lora_rank", "lora_alpha", "lora_dropout",
+    "validation_split", "eval_steps", "early_stopping_patience", "early_stopping_min_delta", "keep_best_checkpoint",
+    "autotune_batch_size", "autotune_max_batch_size", "init_optimizer_state",
+    "mode", "distill_temperature", "distill_alpha", "seed",
+}
+# 内存估算校准使用的最近任务数，以及校准系数的取值范围
+MEMORY_CALIBRATION_WINDOW = 20
+MEMORY_CALIBRATION_RANGE = (0.5, 4.0)
+
 
 class TrainingService:
     """训练服务类"""
@@ -25,85 +72,421 @@ class TrainingService:
         self.model_path = settings.MODEL_PATH
         os.makedirs(self.log_path, exist_ok=True)
         os.makedirs(self.model_path, exist_ok=True)
+        # 运行中任务的取消标志，停止请求在同一进程内立即送达训练回调
+        self._cancel_events: Dict[int, threading.Event] = {}
+        # 复用已完成任务时在后台补充导出的任务，持有引用避免被垃圾回收
+        self._export_tasks: Set[asyncio.Task] = set()
     
     async def start_training(self, request: TrainingRequest, user_id: int = None) -> TrainingJob:
         """
         启动训练任务
         
+        未指定force且未开启性能分析时先按训练结果指纹查找相同配置的已完成任务，找到时直接返回该任务，不重新训练；
+        该任务缺少请求的导出格式时在后台补充导出。
+        
         Args:
             request: 训练请求对象
             user_id: 用户ID，用于验证权限
             
         Returns:
-            TrainingJob: 创建的训练任务
+            TrainingJob: 创建的训练任务，命中缓存时为已完成的任务
             
         Raises:
-            ValidationException: 参数验证失败
-            TrainingNotFoundException: 数据集不存在或无权访问
+            InvalidParamsException: 参数验证失败
+            DatasetNotFoundException: 数据集不存在或无权访问
             InternalServerException: 训练启动失败
         """
         try:
-            with get_session() as session:
-                # 验证数据集是否存在
-                dataset = session.get(Dataset, request.dataset_id)
-                if not dataset:
-                    raise DatasetNotFoundException()
-                
-                # 验证用户权限
-                if user_id is not None and dataset.user_id != user_id:
-                    raise DatasetNotFoundException("您没有权限使用此数据集")
-                
-                # 检查数据集文件是否存在
-                if not os.path.exists(dataset.file_path):
-                    raise ValidationException(f"数据集文件不存在: {dataset.file_path}")
-                
-                # 创建训练任务记录
-                job = TrainingJob(
-                    dataset_id=request.dataset_id,
-                    status="pending",
-                    started_at=datetime.utcnow(),
-                    epochs=request.epochs,
-                    learning_rate=request.learning_rate,
-                    batch_size=request.batch_size,
-                    progress=0.0,
-                    description=request.description
-                )
-                
-                session.add(job)
-                session.commit()
-                session.refresh(job)
-                
-                # 创建日志文件
-                log_file = os.path.join(self.log_path, f"training_job_{job.id}.log")
-                job.log_file = log_file
-                session.add(job)
-                session.commit()
-                
-                # 启动后台训练任务
-                asyncio.create_task(self._run_training_task(job.id))
-                
+            # 首次计算数据集哈希需要读取整个文件，查找缓存和创建任务都放到线程中，不阻塞事件循环
+            job, reused, missing_formats = await asyncio.to_thread(self._reuse_or_create_job, request, user_id)
+            if not reused:
+                # 提交到调度器，超出并发上限时排队
+                self.submit_job(job.id)
                 logger.info(f"训练任务启动成功: ID={job.id}, dataset_id={request.dataset_id}")
-                # 返回一个新的TrainingJob对象，避免会话绑定问题
-                return TrainingJob(
-                    id=job.id,
-                    dataset_id=job.dataset_id,
-                    status=job.status,
-                    model_name=job.model_name,
-                    epochs=job.epochs,
-                    learning_rate=job.learning_rate,
-                    batch_size=job.batch_size,
-                    progress=job.progress,
-                    log_file=job.log_file,
-                    started_at=job.started_at,
-                    completed_at=job.completed_at
-                )
+            elif missing_formats:
+                task = asyncio.create_task(self._export_after_training(job.id, missing_formats))
+                self._export_tasks.add(task)
+                task.add_done_callback(self._export_tasks.discard)
+            return job
             
         except Exception as e:
             logger.error(f"启动训练任务失败: {str(e)}")
-            if isinstance(e, (ValidationException, TrainingNotFoundException, InternalServerException)):
+            if isinstance(e, (InvalidParamsException, DatasetNotFoundException, ResourceNotFoundException, InternalServerException)):
                 raise
             raise InternalServerException(f"启动训练任务失败: {str(e)}")
     
+    def _reuse_or_create_job(self, request: TrainingRequest, user_id: int = None) -> Tuple[TrainingJob, bool, List[str]]:
+        """
+        查找可复用的已完成任务，没有时创建新任务
+        
+        性能分析报告只属于产生它的那次运行，开启性能分析时总是创建新任务。
+        
+        Args:
+            request: 训练请求对象
+            user_id: 用户ID，用于验证权限
+            
+        Returns:
+            Tuple: 与会话分离的任务、是否复用了已完成的任务、复用的任务还缺少的导出格式
+        """
+        with get_db_context() as session:
+            dataset = self.get_usable_dataset(session, request.dataset_id, user_id)
+            owner_id = dataset.user_id if user_id is None else user_id
+            job = None if request.force or request.profile else self._find_completed_job(session, request, owner_id)
+            reused = job is not None
+            missing_formats = []
+            if reused:
+                logger.info(f"训练配置与已完成的任务{job.id}相同，直接返回其结果")
+                missing_formats = self._missing_export_formats(session, job.id, request.export_formats)
+                if missing_formats:
+                    export_service.check_formats(missing_formats)
+            else:
+                job = self.create_job(session, request, owner_id)
+            # 返回一个新的TrainingJob对象，避免会话绑定问题
+            detached = TrainingJob(
+                id=job.id,
+                dataset_id=job.dataset_id,
+                user_id=job.user_id,
+                status=job.status,
+                model_name=job.model_name,
+                epochs=job.epochs,
+                learning_rate=job.learning_rate,
+                batch_size=job.batch_size,
+                progress=job.progress,
+                log_file=job.log_file,
+                started_at=job.started_at,
+                completed_at=job.completed_at
+            )
+            return detached, reused, missing_formats
+    
+    def get_usable_dataset(self, session, dataset_id: int, user_id: int = None) -> Dataset:
+        """
+        获取可用于训练的数据集，并校验权限和文件
+        
+        Args:
+            session: 数据库会话
+            dataset_id: 数据集ID
+            user_id: 用户ID，用于验证权限
+            
+        Returns:
+            Dataset: 数据集
+            
+        Raises:
+            DatasetNotFoundException: 数据集不存在或无权访问
+            InvalidParamsException: 数据集文件不存在
+        """
+        # 验证数据集是否存在
+        dataset = session.get(Dataset, dataset_id)
+        if not dataset:
+            raise DatasetNotFoundException()
+        
+        # 验证用户权限
+        if user_id is not None and dataset.user_id != user_id:
+            raise DatasetNotFoundException("您没有权限使用此数据集")
+        
+        # 检查数据集文件是否存在
+        if not os.path.exists(dataset.file_path):
+            raise InvalidParamsException(f"数据集文件不存在: {dataset.file_path}")
+        
+        return dataset
+    
+    def create_job(self, session, request: TrainingRequest, user_id: int, sweep_id: Optional[int] = None) -> TrainingJob:
+        """
+        创建训练任务记录和日志文件路径
+        
+        Args:
+            session: 数据库会话
+            request: 训练请求对象
+            user_id: 任务所属用户ID
+            sweep_id: 所属超参搜索ID
+            
+        Returns:
+            TrainingJob: 已提交的训练任务
+            
+        Raises:
+            InvalidParamsException: 请求LoRA微调但未安装peft，导出格式缺少依赖，数据并行进程数超过上限，
+                预计峰值内存超过训练内存预算，或蒸馏的教师任务未完成
+            ResourceNotFoundException: 初始化权重的父任务、模型产物或蒸馏的教师任务不存在
+        """
+        init_artifact = self._resolve_init_artifact(session, request, user_id)
+        teacher_artifact = self._resolve_teacher_artifact(session, request, user_id)
+        student_model = (request.student_model or settings.DEFAULT_STUDENT_MODEL) if request.mode == "distill" else None
+        if request.method == "lora" and engine_available() and not peft_available():
+            raise InvalidParamsException("LoRA微调需要安装peft")
+        if request.export_formats and engine_available():
+            export_service.check_formats(request.export_formats)
+        if request.data_parallel_workers > settings.MAX_DATA_PARALLEL_WORKERS:
+            raise InvalidParamsException(
+                f"数据并行进程数不能超过{settings.MAX_DATA_PARALLEL_WORKERS}"
+            )
+        
+        estimated_memory = estimate_peak_memory(
+            load_model_profile(student_model or settings.DEFAULT_MODEL),
+            batch_size=request.batch_size,
+            max_seq_length=request.max_seq_length,
+            precision=request.precision,
+            method=request.method,
+            gradient_checkpointing=request.gradient_checkpointing,
+            data_parallel_workers=request.data_parallel_workers
+        )
+        required_memory = int(estimated_memory * self._memory_calibration(session))
+        if engine_available() and not training_scheduler.fits_budget(required_memory):
+            raise InvalidParamsException(
+                f"预计峰值内存{required_memory / 1024 ** 3:.1f}GB，超过训练内存预算"
+                f"{training_scheduler.memory_budget / 1024 ** 3:.1f}GB，"
+                f"请减小batch_size或max_seq_length，或启用gradient_checkpointing、bf16、LoRA"
+            )
+        
+        job = TrainingJob(
+            dataset_id=request.dataset_id,
+            user_id=user_id,
+            status="pending",
+            started_at=datetime.utcnow(),
+            epochs=request.epochs,
+            learning_rate=request.learning_rate,
+            batch_size=request.batch_size,
+            max_seq_length=request.max_seq_length,
+            bucket_by_length=request.bucket_by_length,
+            shuffle_within_buckets=request.shuffle_within_buckets,
+            gradient_accumulation_steps=request.gradient_accumulation_steps,
+            precision=request.precision,
+            gradient_checkpointing=request.gradient_checkpointing,
+            method=request.method,
+            lora_rank=request.lora_rank,
+            lora_alpha=request.lora_alpha,
+            lora_dropout=request.lora_dropout,
+            data_parallel_workers=request.data_parallel_workers,
+            save_checkpoint_on_stop=request.save_checkpoint_on_stop,
+            validation_split=request.validation_split,
+            eval_steps=request.eval_steps,
+            early_stopping_patience=request.early_stopping_patience,
+            early_stopping_min_delta=request.early_stopping_min_delta,
+            keep_best_checkpoint=request.keep_best_checkpoint,
+            autotune_batch_size=request.autotune_batch_size,
+            autotune_max_batch_size=request.autotune_max_batch_size,
+            parent_job_id=init_artifact.training_job_id if init_artifact else None,
+            init_artifact_id=init_artifact.id if init_artifact else None,
+            init_optimizer_state=request.init_optimizer_state,
+            save_optimizer_state=request.save_optimizer_state,
+            profile=request.profile,
+            profile_start_step=request.profile_start_step,
+            profile_steps=request.profile_steps,
+            mode=request.mode,
+            teacher_job_id=request.teacher_job_id,
+            teacher_artifact_id=teacher_artifact.id if teacher_artifact else None,
+            student_model=student_model,
+            distill_temperature=request.distill_temperature,
+            distill_alpha=request.distill_alpha,
+            cache_teacher_logits=request.cache_teacher_logits,
+            seed=request.seed,
+            fingerprint=self._training_fingerprint(session, request, init_artifact, teacher_artifact),
+            export_formats=json.dumps(request.export_formats) if request.export_formats else None,
+            estimated_memory_bytes=estimated_memory,
+            progress=0.0,
+            description=request.description,
+            sweep_id=sweep_id
+        )
+        
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        
+        # 创建日志文件
+        job.log_file = os.path.join(self.log_path, f"training_job_{job.id}.jsonl")
+        if request.profile:
+            job.profile_path = os.path.join(self.log_path, "profiles", f"training_job_{job.id}")
+        session.add(job)
+        session.commit()
+        return job
+    
+    def _training_fingerprint(
+        self,
+        session,
+        request: TrainingRequest,
+        init_artifact: Optional[ModelArtifact],
+        teacher_artifact: Optional[ModelArtifact]
+    ) -> str:
+        """
+        计算训练结果指纹
+        
+        由数据集内容哈希、基座模型、影响训练结果的超参数、随机种子和训练代码版本组成，
+        初始化权重和教师模型以产物ID参与。
+        
+        Returns:
+            str: sha256十六进制字符串
+        """
+        base_model = (request.student_model or settings.DEFAULT_STUDENT_MODEL) if request.mode == "distill" else settings.DEFAULT_MODEL
+        payload = json.dumps({
+            "dataset": file_sha256(session.get(Dataset, request.dataset_id).file_path),
+            "base_model": base_model,
+            "init_artifact_id": init_artifact.id if init_artifact else None,
+            "teacher_artifact_id": teacher_artifact.id if teacher_artifact else None,
+            "hyperparameters": request.dict(include=FINGERPRINT_FIELDS),
+            "code_version": code_version(),
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _find_completed_job(self, session, request: TrainingRequest, user_id: int) -> Optional[TrainingJob]:
+        """
+        查找训练结果指纹相同、模型产物仍然可用的已完成任务
+        
+        Args:
+            session: 数据库会话
+            request: 训练请求对象
+            user_id: 任务所属用户ID，只复用该用户自己的任务
+            
+        Returns:
+            Optional[TrainingJob]: 最近完成的相同任务，没有时为None
+        """
+        fingerprint = self._training_fingerprint(
+            session, request,
+            self._resolve_init_artifact(session, request, user_id),
+            self._resolve_teacher_artifact(session, request, user_id)
+        )
+        jobs = session.exec(
+            select(TrainingJob).where(
+                TrainingJob.fingerprint == fingerprint,
+                TrainingJob.user_id == user_id,
+                TrainingJob.status == "completed"
+            ).order_by(TrainingJob.id.desc())
+        ).all()
+        for job in jobs:
+            # 模拟训练不产生模型文件；真实训练的产物可能已被删除
+            if not engine_available():
+                return job
+            artifact = latest_trained_artifact(session, job.id)
+            if artifact and os.path.isdir(artifact.file_path):
+                return job
+        return None
+    
+    def _missing_export_formats(self, session, job_id: int, formats: List[str]) -> List[str]:
+        """
+        已完成任务的模型产物还没有导出的格式
+        
+        Args:
+            session: 数据库会话
+            job_id: 训练任务ID
+            formats: 请求的导出格式
+            
+        Returns:
+            List[str]: 尚未导出的格式，模拟训练没有模型产物时为空
+        """
+        if not formats or not engine_available():
+            return []
+        source = latest_trained_artifact(session, job_id)
+        exported = set(session.exec(
+            select(ModelArtifact.artifact_type).where(ModelArtifact.source_artifact_id == source.id)
+        ).all())
+        return [fmt for fmt in formats if fmt not in exported]
+    
+    def _resolve_init_artifact(self, session, request: TrainingRequest, user_id: int) -> Optional[ModelArtifact]:
+        """
+        解析增量训练用于初始化权重的模型产物
+        
+        指定parent_job_id时取该任务最新登记的产物（完成时的最终模型或停止前的检查点）。
+        
+        Args:
+            session: 数据库会话
+            request: 训练请求对象
+            user_id: 任务所属用户ID
+            
+        Returns:
+            Optional[ModelArtifact]: 模型产物，未请求增量训练时为None
+            
+        Raises:
+            ResourceNotFoundException: 父任务没有模型产物，或产物不存在或无权访问
+            InvalidParamsException: 产物是导出变体，产物文件不存在，或LoRA适配器产物需要peft但未安装
+        """
+        if request.parent_job_id is not None:
+            artifact = latest_trained_artifact(session, request.parent_job_id)
+            if not artifact or artifact.user_id != user_id:
+                raise ResourceNotFoundException(f"父训练任务没有可用的模型产物: {request.parent_job_id}")
+        elif request.init_from_artifact is not None:
+            artifact = session.get(ModelArtifact, request.init_from_artifact)
+            if not artifact or artifact.user_id != user_id:
+                raise ResourceNotFoundException(f"模型产物不存在: {request.init_from_artifact}")
+            if artifact.artifact_type not in TRAINABLE_ARTIFACT_TYPES:
+                raise InvalidParamsException(f"{artifact.artifact_type}导出变体只能用于推理，不能初始化训练")
+        else:
+            return None
+        
+        self._check_artifact_loadable(artifact)
+        return artifact
+    
+    def _resolve_teacher_artifact(self, session, request: TrainingRequest, user_id: int) -> Optional[ModelArtifact]:
+        """
+        解析知识蒸馏的教师模型产物
+        
+        Args:
+            session: 数据库会话
+            request: 训练请求对象
+            user_id: 任务所属用户ID
+            
+        Returns:
+            Optional[ModelArtifact]: 教师任务最新的模型产物，非蒸馏模式时为None
+            
+        Raises:
+            ResourceNotFoundException: 教师任务不存在或无权访问
+            InvalidParamsException: 教师任务未完成或没有模型产物
+        """
+        if request.mode != "distill":
+            return None
+        teacher = session.get(TrainingJob, request.teacher_job_id)
+        if not teacher or teacher.user_id != user_id:
+            raise ResourceNotFoundException(f"教师训练任务不存在: {request.teacher_job_id}")
+        if teacher.status != "completed":
+            raise InvalidParamsException(f"教师训练任务未完成，当前状态为{teacher.status}")
+        artifact = latest_trained_artifact(session, teacher.id)
+        if not artifact:
+            raise InvalidParamsException(f"教师训练任务没有模型产物: {teacher.id}")
+        self._check_artifact_loadable(artifact)
+        return artifact
+    
+    def _check_artifact_loadable(self, artifact: ModelArtifact):
+        """检查模型产物文件存在，LoRA适配器产物需要peft；模拟训练不读取模型文件，不检查"""
+        if not engine_available():
+            return
+        if not os.path.isdir(artifact.file_path):
+            raise InvalidParamsException(f"模型产物文件不存在: {artifact.file_path}")
+        if artifact.artifact_type == "lora_adapter" and not peft_available():
+            raise InvalidParamsException("加载LoRA适配器产物需要安装peft")
+    
+    def submit_job(self, job_id: int):
+        """将训练任务提交到调度器，真实训练按校准后的预计内存排队"""
+        memory_bytes = 0
+        if engine_available():
+            with get_db_context() as session:
+                job = session.get(TrainingJob, job_id)
+                memory_bytes = int((job.estimated_memory_bytes or 0) * self._memory_calibration(session))
+        training_scheduler.submit(job_id, self._run_training_task, memory_bytes)
+    
+    def _memory_calibration(self, session) -> float:
+        """
+        内存估算的校准系数
+        
+        取最近完成的真实训练任务中采样得到的峰值常驻内存与估算值之比的中位数，没有历史数据时为1。
+        
+        Args:
+            session: 数据库会话
+            
+        Returns:
+            float: 校准系数
+        """
+        rows = session.exec(
+            select(TrainingJob.peak_rss_bytes, TrainingJob.estimated_memory_bytes)
+            .where(
+                TrainingJob.status == "completed",
+                TrainingJob.peak_rss_bytes.is_not(None),
+                TrainingJob.estimated_memory_bytes.is_not(None)
+            )
+            .order_by(TrainingJob.id.desc())
+            .limit(MEMORY_CALIBRATION_WINDOW)
+        ).all()
+        ratios = sorted(peak / estimated for peak, estimated in rows if estimated)
+        if not ratios:
+            return 1.0
+        low, high = MEMORY_CALIBRATION_RANGE
+        return min(max(ratios[len(ratios) // 2], low), high)
+    
     async def get_training_status(self, job_id: int, user_id: int = None) -> Dict[str, Any]:
         """
         获取训练状态
@@ -119,25 +502,22 @@ class TrainingService:
             TrainingNotFoundException: 训练任务不存在或无权访问
         """
         try:
-            with get_session() as session:
+            with get_db_context() as session:
                 job = session.get(TrainingJob, job_id)
                 if not job:
                     raise TrainingNotFoundException("训练任务", job_id)
                 
                 # 验证用户权限
-                if user_id is not None:
-                    # 获取关联的数据集
-                    dataset = session.get(Dataset, job.dataset_id)
-                    if dataset and dataset.user_id != user_id:
-                        raise TrainingNotFoundException("您没有权限访问此训练任务")
+                if user_id is not None and job.user_id != user_id:
+                    raise TrainingNotFoundException("您没有权限访问此训练任务")
                 
                 # 读取最新日志
                 logs = []
+                log_offset = 0
                 if job.log_file and os.path.exists(job.log_file):
                     try:
-                        with open(job.log_file, 'r', encoding='utf-8') as f:
-                            lines = f.readlines()
-                            logs = [line.strip() for line in lines[-10:]]  # 最后10行
+                        records, log_offset = self._job_log(job.log_file).tail(10)  # 最后10条
+                        logs = [format_record(record) for record in records]
                     except Exception as e:
                         logger.warning(f"读取日志文件失败: {str(e)}")
                 
@@ -152,7 +532,28 @@ class TrainingService:
                     "epochs": job.epochs,
                     "learning_rate": job.learning_rate,
                     "batch_size": job.batch_size,
-                    "logs": logs
+                    "max_seq_length": job.max_seq_length,
+                    "bucket_by_length": job.bucket_by_length,
+                    "gradient_accumulation_steps": job.gradient_accumulation_steps,
+                    "precision": job.precision,
+                    "gradient_checkpointing": job.gradient_checkpointing,
+                    "method": job.method,
+                    "data_parallel_workers": job.data_parallel_workers,
+                    "save_checkpoint_on_stop": job.save_checkpoint_on_stop,
+                    "mode": job.mode,
+                    "teacher_job_id": job.teacher_job_id,
+                    "student_model": job.student_model,
+                    "seed": job.seed,
+                    "parent_job_id": job.parent_job_id,
+                    "init_artifact_id": job.init_artifact_id,
+                    "estimated_memory_bytes": job.estimated_memory_bytes,
+                    "resources": self._resource_usage(job),
+                    "autotune_results": json.loads(job.autotune_results) if job.autotune_results else None,
+                    "best_step": job.best_step,
+                    "stopped_step": job.stopped_step,
+                    "metrics": json.loads(job.metrics) if job.metrics else None,
+                    "logs": logs,
+                    "log_offset": log_offset
                 }
                 
                 return result
@@ -179,7 +580,7 @@ class TrainingService:
             InternalServerException: 停止失败
         """
         try:
-            with get_session() as session:
+            with get_db_context() as session:
                 job = session.get(TrainingJob, job_id)
                 if not job:
                     raise TrainingNotFoundException("训练任务", job_id)
@@ -195,12 +596,16 @@ class TrainingService:
                 session.commit()
                 
                 # 写入停止日志
-                if job.log_file:
-                    try:
-                        with open(job.log_file, "a", encoding="utf-8") as f:
-                            f.write(f"\n[{datetime.now()}] 训练任务被用户停止\n")
-                    except Exception as e:
-                        logger.warning(f"写入停止日志失败: {str(e)}")
+                try:
+                    self._write_log(job_id, job.log_file, "训练任务被用户停止")
+                except Exception as e:
+                    logger.warning(f"写入停止日志失败: {str(e)}")
+                progress_broker.publish(job_id, "status", {"status": "stopped"})
+                
+                # 通知训练进程在当前步结束后退出，超过宽限期未退出的会被终止
+                cancel_event = self._cancel_events.get(job_id)
+                if cancel_event is not None:
+                    cancel_event.set()
                 
                 logger.info(f"训练任务停止成功: ID={job_id}")
                 return True
@@ -211,40 +616,130 @@ class TrainingService:
                 raise
             raise InternalServerException(f"停止训练任务失败: {str(e)}")
     
-    async def get_training_logs(self, job_id: int, lines: int, user_id: int = None) -> List[str]:
+    def _resource_usage(self, job: TrainingJob) -> Optional[Dict[str, Any]]:
+        """训练任务的资源用量，模拟训练和尚未采样的任务为None"""
+        if job.cpu_seconds is None:
+            return None
+        return {
+            "cpu_seconds": job.cpu_seconds,
+            "peak_rss_bytes": job.peak_rss_bytes,
+            "avg_rss_bytes": job.avg_rss_bytes,
+            "io_read_bytes": job.io_read_bytes,
+            "io_write_bytes": job.io_write_bytes,
+            "examples_per_sec": job.examples_per_sec,
+        }
+    
+    async def get_usage_by_user(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        按用户汇总训练任务的资源用量，用于成本分摊和容量规划
+        
+        Args:
+            since: 只统计该时间之后开始的任务，为空时统计全部
+            
+        Returns:
+            List[Dict]: 每个用户的任务数、CPU时间、读写字节数、最大峰值内存和平均每秒训练样本数，按CPU时间降序
+        """
+        try:
+            with get_db_context() as session:
+                query = select(
+                    TrainingJob.user_id,
+                    User.username,
+                    func.count(TrainingJob.id),
+                    func.sum(TrainingJob.cpu_seconds),
+                    func.sum(TrainingJob.io_read_bytes),
+                    func.sum(TrainingJob.io_write_bytes),
+                    func.max(TrainingJob.peak_rss_bytes),
+                    func.avg(TrainingJob.examples_per_sec),
+                ).join(User, User.id == TrainingJob.user_id).group_by(TrainingJob.user_id, User.username)
+                if since is not None:
+                    query = query.where(TrainingJob.started_at >= since)
+                rows = session.exec(query).all()
+            
+            usage = [
+                {
+                    "user_id": user_id,
+                    "username": username,
+                    "jobs": jobs,
+                    "cpu_seconds": round(cpu_seconds or 0.0, 3),
+                    "io_read_bytes": int(read_bytes or 0),
+                    "io_write_bytes": int(write_bytes or 0),
+                    "max_peak_rss_bytes": peak_rss,
+                    "avg_examples_per_sec": round(examples_per_sec, 3) if examples_per_sec is not None else None,
+                }
+                for user_id, username, jobs, cpu_seconds, read_bytes, write_bytes, peak_rss, examples_per_sec in rows
+            ]
+            return sorted(usage, key=lambda row: row["cpu_seconds"], reverse=True)
+            
+        except Exception as e:
+            logger.error(f"汇总资源用量失败: {str(e)}")
+            raise InternalServerException(f"汇总资源用量失败: {str(e)}")
+    
+    async def get_training_logs(
+        self,
+        job_id: int,
+        lines: int,
+        user_id: int = None,
+        after_offset: Optional[int] = None,
+        level: Optional[str] = None,
+        start_step: Optional[int] = None,
+        end_step: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         获取训练日志
         
+        未指定after_offset时返回最后lines条；指定时只返回该偏移量之后新增的完整记录，
+        客户端用返回的offset作为下次请求的after_offset。指定level或步数范围时按分段索引
+        只读取可能命中的分段，返回最后lines条命中的记录。
+        
         Args:
             job_id: 训练任务ID
-            lines: 返回的日志行数
+            lines: 返回的日志条数
             user_id: 用户ID，用于验证权限
+            after_offset: 上次读取返回的逻辑偏移量
+            level: 最低日志级别
+            start_step: 起始步数（含）
+            end_step: 结束步数（含）
             
         Returns:
-            List[str]: 日志行列表
+            Dict: 包含logs（格式化的日志行）、records（结构化记录）、offset（新的偏移量）和has_more的字典
             
         Raises:
             TrainingNotFoundException: 训练任务不存在或无权访问
         """
         try:
-            with get_session() as session:
+            with get_db_context() as session:
                 job = session.get(TrainingJob, job_id)
                 if not job:
                     raise TrainingNotFoundException("训练任务", job_id)
                 
-                logs = []
-                if job.log_file and os.path.exists(job.log_file):
-                    try:
-                        with open(job.log_file, 'r', encoding='utf-8') as f:
-                            all_lines = f.readlines()
-                            logs = [line.strip() for line in all_lines[-lines:]]
-                    except Exception as e:
-                        logger.error(f"读取日志文件失败: {str(e)}")
-                        logs = [f"日志读取失败: {str(e)}"]
-                else:
-                    logs = ["暂无日志"]
+                # 验证用户权限
+                if user_id is not None and job.user_id != user_id:
+                    raise TrainingNotFoundException("您没有权限访问此训练任务")
                 
-                return logs
+                log_file = job.log_file
+            
+            records = []
+            logs = []
+            offset = after_offset or 0
+            has_more = False
+            if log_file and os.path.exists(log_file):
+                try:
+                    job_log = self._job_log(log_file)
+                    if after_offset is not None:
+                        records, offset, has_more = job_log.read_after(after_offset)
+                    elif level is not None or start_step is not None or end_step is not None:
+                        offset = job_log.size()
+                        records = job_log.query(lines, level, start_step, end_step)
+                    else:
+                        records, offset = job_log.tail(lines)
+                    logs = [format_record(record) for record in records]
+                except Exception as e:
+                    logger.error(f"读取日志文件失败: {str(e)}")
+                    logs = [f"日志读取失败: {str(e)}"]
+            elif after_offset is None:
+                logs = ["暂无日志"]
+            
+            return {"logs": logs, "records": records, "offset": offset, "has_more": has_more}
             
         except Exception as e:
             logger.error(f"获取训练日志失败: {str(e)}")
@@ -252,128 +747,265 @@ class TrainingService:
                 raise
             raise InternalServerException(f"获取训练日志失败: {str(e)}")
     
+    async def get_training_profile(self, job_id: int, user_id: int = None) -> Dict[str, Any]:
+        """
+        获取训练任务的性能分析报告
+        
+        Args:
+            job_id: 训练任务ID
+            user_id: 用户ID，用于验证权限
+            
+        Returns:
+            Dict: 分阶段耗时（phases、phase_table）、采样窗口内的算子汇总（operators、operator_table），
+                以及trace_available（是否可下载Chrome trace）
+            
+        Raises:
+            TrainingNotFoundException: 训练任务不存在或无权访问
+            ResourceNotFoundException: 任务未开启性能分析或尚未生成报告
+        """
+        profile_path = self._get_profile_path(job_id, user_id)
+        summary_file = os.path.join(profile_path, PROFILE_SUMMARY_NAME)
+        if not os.path.exists(summary_file):
+            raise ResourceNotFoundException("性能分析报告尚未生成，训练结束后可用")
+        with open(summary_file, encoding="utf-8") as f:
+            report = json.load(f)
+        report["job_id"] = job_id
+        report["trace_available"] = os.path.exists(os.path.join(profile_path, PROFILE_TRACE_NAME))
+        return report
+    
+    def get_profile_trace_file(self, job_id: int, user_id: int = None) -> str:
+        """
+        获取性能分析采样窗口的Chrome trace文件路径
+        
+        Args:
+            job_id: 训练任务ID
+            user_id: 用户ID，用于验证权限
+            
+        Returns:
+            str: trace文件路径，可在chrome://tracing或Perfetto中打开
+            
+        Raises:
+            TrainingNotFoundException: 训练任务不存在或无权访问
+            ResourceNotFoundException: 任务未开启性能分析或未采样到trace
+        """
+        trace_file = os.path.join(self._get_profile_path(job_id, user_id), PROFILE_TRACE_NAME)
+        if not os.path.exists(trace_file):
+            raise ResourceNotFoundException("没有可下载的trace，训练可能在采样窗口开始前结束")
+        return trace_file
+    
+    def _get_profile_path(self, job_id: int, user_id: int = None) -> str:
+        with get_db_context() as session:
+            job = session.get(TrainingJob, job_id)
+            if not job:
+                raise TrainingNotFoundException("训练任务", job_id)
+            if user_id is not None and job.user_id != user_id:
+                raise TrainingNotFoundException("您没有权限访问此训练任务")
+            if not job.profile_path:
+                raise ResourceNotFoundException("该训练任务未开启性能分析")
+            return job.profile_path
+    
     async def get_training_jobs(
         self, 
         status_filter: Optional[str] = None,
         limit: int = 50,
-        offset: int = 0,
-        user_id: int = None
-    ) -> List[TrainingJob]:
+        cursor: Optional[int] = None,
+        user_id: int = None,
+        dataset_id: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         获取训练任务列表
         
+        按id倒序使用游标分页（id < cursor），配合以过滤列开头、以id结尾的复合索引，
+        深页和首页一样只扫描limit+1行。
+        
         Args:
             status_filter: 状态过滤
-            limit: 限制数量
-            offset: 偏移量
+            limit: 每页数量
+            cursor: 上一页返回的next_cursor，为空时从最新的任务开始
             user_id: 用户ID，用于过滤特定用户的训练任务
+            dataset_id: 数据集ID过滤
             
         Returns:
-            List[TrainingJob]: 训练任务列表
+            Dict: items为训练任务列表，next_cursor为下一页游标（没有更多时为None）
         """
         try:
-            with get_session() as session:
-                statement = select(TrainingJob).order_by(TrainingJob.id.desc())
+            with get_db_context() as session:
+                # 只查询列表需要的列，直接投影为字典，不构造ORM对象
+                statement = select(*JOB_LIST_COLUMNS).order_by(TrainingJob.id.desc())
                 
+                if user_id is not None:
+                    statement = statement.where(TrainingJob.user_id == user_id)
                 if status_filter:
                     statement = statement.where(TrainingJob.status == status_filter)
+                if dataset_id is not None:
+                    statement = statement.where(TrainingJob.dataset_id == dataset_id)
+                if cursor is not None:
+                    statement = statement.where(TrainingJob.id < cursor)
                 
-                # 如果提供了用户ID，则过滤该用户的训练任务
-                if user_id is not None:
-                    # 通过数据集关联过滤用户的训练任务
-                    statement = statement.join(Dataset, TrainingJob.dataset_id == Dataset.id)
-                    statement = statement.where(Dataset.user_id == user_id)
-                
-                statement = statement.offset(offset).limit(limit)
-                
-                results = session.exec(statement).all()
+                # 多取一行判断是否还有下一页
+                rows = session.exec(statement.limit(limit + 1)).all()
                 
-                # 创建新的对象列表，避免会话关闭后的DetachedInstanceError
-                jobs = []
-                for job in results:
-                    jobs.append(TrainingJob(
-                        id=job.id,
-                        dataset_id=job.dataset_id,
-                        status=job.status,
-                        model_name=job.model_name,
-                        epochs=job.epochs,
-                        learning_rate=job.learning_rate,
-                        batch_size=job.batch_size,
-                        progress=job.progress,
-                        log_file=job.log_file,
-                        started_at=job.started_at,
-                        completed_at=job.completed_at
-                    ))
+                items = [dict(row._mapping) for row in rows[:limit]]
+                next_cursor = items[-1]["id"] if len(rows) > limit else None
                 
-                logger.info(f"获取训练任务列表成功: 共{len(jobs)}个任务")
-                return jobs
+                logger.info(f"获取训练任务列表成功: 共{len(items)}个任务")
+                return {"items": items, "next_cursor": next_cursor}
             
         except Exception as e:
             logger.error(f"获取训练任务列表失败: {str(e)}")
             raise InternalServerException(f"获取训练任务列表失败: {str(e)}")
     
-    async def _run_training_task(self, job_id: int):
+    async def get_training_snapshot(self, job_id: int, user_id: int = None) -> Dict[str, Any]:
         """
-        后台训练任务（模拟实现）
+        获取训练任务当前快照（不读取日志），用作推送流的首个事件
         
         Args:
             job_id: 训练任务ID
+            user_id: 用户ID，用于验证权限
+            
+        Returns:
+            Dict: 训练任务快照
+            
+        Raises:
+            TrainingNotFoundException: 训练任务不存在或无权访问
         """
         try:
-            # 模拟训练过程
-            await asyncio.sleep(1)  # 等待1秒
-            
-            # 更新状态为运行中
-            with get_session() as session:
+            with get_db_context() as session:
                 job = session.get(TrainingJob, job_id)
-                if job and job.status == "pending":
-                    job.status = "running"
-                    session.add(job)
-                    session.commit()
-            
-            # 模拟训练进度更新
-            for progress in range(10, 101, 10):
-                await asyncio.sleep(2)  # 每2秒更新一次进度
+                if not job:
+                    raise TrainingNotFoundException("训练任务", job_id)
                 
-                with get_session() as session:
-                    job = session.get(TrainingJob, job_id)
-                    if job and job.status == "running":
-                        job.progress = float(progress)
-                        session.add(job)
-                        session.commit()
-                        
-                        # 写入日志
-                        if job.log_file:
-                            with open(job.log_file, "a", encoding="utf-8") as f:
-                                f.write(f"[{datetime.now()}] 训练进度: {progress}%\n")
-                    elif job and job.status == "stopped":
-                        logger.info(f"训练任务{job_id}被停止")
-                        return
-            
-            # 训练完成
-            with get_session() as session:
-                job = session.get(TrainingJob, job_id)
-                if job and job.status == "running":
-                    job.status = "completed"
-                    job.progress = 100.0
-                    job.completed_at = datetime.utcnow()
-                    job.model_name = f"model_{job.dataset_id}_{job_id}_{int(datetime.now().timestamp())}"
-                    session.add(job)
-                    session.commit()
-                    
-                    # 写入完成日志
-                    if job.log_file:
-                        with open(job.log_file, "a", encoding="utf-8") as f:
-                            f.write(f"[{datetime.now()}] 训练完成，模型已保存: {job.model_name}\n")
+                # 验证用户权限
+                if user_id is not None and job.user_id != user_id:
+                    raise TrainingNotFoundException("您没有权限访问此训练任务")
+                
+                return {
+                    "job_id": job.id,
+                    "status": job.status,
+                    "progress": job.progress,
+                    "model_name": job.model_name,
+                    "started_at": job.started_at.isoformat() if job.started_at else None,
+                    "completed_at": job.completed_at.isoformat() if job.completed_at else None
+                }
+            
+        except Exception as e:
+            logger.error(f"获取训练快照失败: {str(e)}")
+            if isinstance(e, TrainingNotFoundException):
+                raise
+            raise InternalServerException(f"获取训练快照失败: {str(e)}")
+    
+    async def stream_training_events(
+        self, job_id: int, snapshot: Dict[str, Any], queue: asyncio.Queue
+    ) -> AsyncGenerator[str, None]:
+        """
+        以SSE格式推送训练事件
+        
+        先推送快照，任务未结束时继续推送订阅队列中的事件，直到任务进入结束状态。
+        
+        Args:
+            job_id: 训练任务ID
+            snapshot: get_training_snapshot返回的快照
+            queue: 读取快照之前通过progress_broker.subscribe订阅的队列，快照之后的事件都在队列中
+            
+        Yields:
+            str: SSE格式的事件文本
+        """
+        try:
+            yield self._format_sse("snapshot", snapshot)
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+            
+            async for message in progress_broker.listen(job_id, settings.TRAINING_STREAM_HEARTBEAT, queue=queue):
+                if message is None:
+                    # 心跳注释行，保持连接并及时发现断开的客户端
+                    yield ": heartbeat\n\n"
+                    continue
+                yield self._format_sse(message["event"], message)
+        finally:
+            progress_broker.unsubscribe(job_id, queue)
+    
+    @staticmethod
+    def _format_sse(event: str, data: Dict[str, Any]) -> str:
+        """格式化SSE事件"""
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    
+    def _record_metrics(self, job_id: int, step: int, metrics: Dict[str, float]):
+        """
+        记录训练指标并推送给订阅者
+        
+        Args:
+            job_id: 训练任务ID
+            step: 训练步数
+            metrics: 指标名到指标值的映射
+        """
+        metrics_service.record(job_id, step, metrics)
+        progress_broker.publish(job_id, "metrics", {"step": step, **metrics})
+    
+    def _job_log(self, log_file: str) -> JobLog:
+        return JobLog(log_file, settings.LOG_ROTATE_MB * 1024 * 1024, settings.LOG_COMPRESSION)
+    
+    def _write_log(
+        self,
+        job_id: int,
+        log_file: Optional[str],
+        message: str,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        level: str = "INFO",
+        step: Optional[int] = None
+    ):
+        """
+        追加一条结构化训练日志并推送给订阅者
+        
+        Args:
+            job_id: 训练任务ID
+            log_file: 日志文件路径
+            message: 日志内容
+            loop: 从训练线程调用时传入事件循环，推送会切回事件循环线程执行
+            level: 日志级别
+            step: 当前优化步，未知时为None
+        """
+        record = make_record(message, level, step)
+        if log_file:
+            self._job_log(log_file).append(record)
+        payload = {"line": format_record(record), "record": record}
+        if loop is None:
+            progress_broker.publish(job_id, "log", payload)
+        else:
+            loop.call_soon_threadsafe(progress_broker.publish, job_id, "log", payload)
+    
+    async def _run_training_task(self, job_id: int):
+        """
+        后台训练任务
+        
+        已安装torch/transformers时在spawn启动的工作进程中执行真实训练，由后台线程等待工作进程并转发回调；
+        否则使用模拟训练。
+        
+        Args:
+            job_id: 训练任务ID
+        """
+        try:
+            job = self._mark_running(job_id)
+            if job is None:
+                return
+            
+            if engine_available():
+                result = await self._run_engine_training(job)
+            else:
+                result = await self._run_simulated_training(job)
             
-            logger.info(f"训练任务{job_id}完成")
+            # 被停止的任务返回None，状态已在停止时更新
+            if result is not None:
+                self._complete_job(job_id, result)
+                logger.info(f"训练任务{job_id}完成")
+                if result.get("output_dir"):
+                    await self._export_after_training(job_id)
             
         except Exception as e:
             logger.error(f"训练任务{job_id}执行失败: {str(e)}")
             
             # 更新状态为失败
             try:
-                with get_session() as session:
+                with get_db_context() as session:
                     job = session.get(TrainingJob, job_id)
                     if job:
                         job.status = "failed"
@@ -382,11 +1014,456 @@ class TrainingService:
                         session.commit()
                         
                         # 写入错误日志
-                        if job.log_file:
-                            with open(job.log_file, "a", encoding="utf-8") as f:
-                                f.write(f"[{datetime.now()}] 训练失败: {str(e)}\n")
+                        self._write_log(job_id, job.log_file, f"训练失败: {str(e)}", level="ERROR")
             except Exception as log_error:
                 logger.error(f"写入失败日志时出错: {str(log_error)}")
+            finally:
+                progress_broker.publish(job_id, "status", {"status": "failed", "error": str(e)})
+        finally:
+            metrics_service.flush(job_id)
+            self._on_job_finished(job_id)
+    
+    def _mark_running(self, job_id: int) -> Optional[TrainingJob]:
+        """
+        将等待中的任务标记为运行中
+        
+        Args:
+            job_id: 训练任务ID
+            
+        Returns:
+            Optional[TrainingJob]: 脱离会话的任务对象；任务不存在或已不是pending状态时返回None
+        """
+        with get_db_context() as session:
+            job = session.get(TrainingJob, job_id)
+            if not job or job.status != "pending":
+                return None
+            job.status = "running"
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            session.expunge(job)
+        
+        progress_broker.publish(job_id, "status", {"status": "running"})
+        return job
+    
+    async def _run_engine_training(self, job: TrainingJob) -> Optional[Dict[str, Any]]:
+        """
+        在训练子进程中执行真实训练，调用线程只负责转发进度和停止请求
+        
+        Args:
+            job: 训练任务
+            
+        Returns:
+            Optional[Dict]: 训练结果，任务被停止时返回None
+        """
+        from ..training.engine import run_training
+        
+        init_from = None
+        teacher_dir = None
+        base_model = job.student_model if job.mode == "distill" else settings.DEFAULT_MODEL
+        with get_db_context() as session:
+            dataset = session.get(Dataset, job.dataset_id)
+            dataset_path = dataset.file_path
+            if job.teacher_artifact_id:
+                teacher_dir = session.get(ModelArtifact, job.teacher_artifact_id).file_path
+            if job.init_artifact_id:
+                artifact = session.get(ModelArtifact, job.init_artifact_id)
+                init_from = artifact.file_path
+                # 适配器产物叠加在其基座模型上；完整模型产物本身即为新任务的基座
+                if artifact.artifact_type == "lora_adapter":
+                    base_model = artifact.base_model or settings.DEFAULT_MODEL
+                else:
+                    base_model = artifact.file_path
+        
+        model_name = f"model_{job.dataset_id}_{job.id}_{int(datetime.now().timestamp())}"
+        config = TrainingConfig(
+            job_id=job.id,
+            dataset_path=dataset_path,
+            output_dir=os.path.join(self.model_path, model_name),
+            base_model=base_model,
+            epochs=job.epochs,
+            learning_rate=job.learning_rate,
+            batch_size=job.batch_size,
+            max_seq_length=job.max_seq_length,
+            bucket_by_length=job.bucket_by_length,
+            shuffle_within_buckets=job.shuffle_within_buckets,
+            gradient_accumulation_steps=job.gradient_accumulation_steps,
+            precision=job.precision,
+            gradient_checkpointing=job.gradient_checkpointing,
+            method=job.method,
+            lora_rank=job.lora_rank,
+            lora_alpha=job.lora_alpha,
+            lora_dropout=job.lora_dropout,
+            data_parallel_workers=job.data_parallel_workers,
+            save_checkpoint_on_stop=job.save_checkpoint_on_stop,
+            validation_split=job.validation_split,
+            eval_steps=job.eval_steps,
+            early_stopping_patience=job.early_stopping_patience,
+            early_stopping_min_delta=job.early_stopping_min_delta,
+            keep_best_checkpoint=job.keep_best_checkpoint,
+            autotune_batch_size=job.autotune_batch_size,
+            autotune_max_batch_size=job.autotune_max_batch_size,
+            memory_budget_bytes=training_scheduler.memory_budget,
+            init_from=init_from,
+            init_optimizer_state=job.init_optimizer_state,
+            save_optimizer_state=job.save_optimizer_state,
+            token_cache_dir=settings.TOKEN_CACHE_PATH,
+            data_loader_workers=settings.TRAINING_DATA_WORKERS,
+            prefetch_batches=settings.TRAINING_PREFETCH_BATCHES,
+            profile=job.profile,
+            profile_start_step=job.profile_start_step,
+            profile_steps=job.profile_steps,
+            profile_dir=job.profile_path,
+            mode=job.mode,
+            teacher_dir=teacher_dir,
+            distill_temperature=job.distill_temperature,
+            distill_alpha=job.distill_alpha,
+            cache_teacher_logits=job.cache_teacher_logits,
+            seed=job.seed,
+            cancel_grace_seconds=settings.TRAINING_CANCEL_GRACE_SECONDS
+        )
+        cancel_event = self._cancel_events.setdefault(job.id, threading.Event())
+        callbacks = JobTrainingCallbacks(self, job, asyncio.get_running_loop(), cancel_event)
+        
+        try:
+            result = await asyncio.to_thread(run_training, config, callbacks)
+        finally:
+            self._cancel_events.pop(job.id, None)
+        
+        if result["stopped"]:
+            self._save_job_metrics(job.id, result["metrics"])
+            if callbacks.early_stop_reason:
+                self._early_stop(job.id, callbacks.early_stop_reason)
+            if result.get("output_dir"):
+                self._register_checkpoint(job.id, model_name, result, config.base_model)
+            return None
+        
+        return {
+            "model_name": model_name,
+            "output_dir": result["output_dir"],
+            "artifact_type": result["artifact_type"],
+            "base_model": config.base_model,
+            "metrics": result["metrics"]
+        }
+    
+    async def _run_simulated_training(self, job: TrainingJob) -> Optional[Dict[str, Any]]:
+        """
+        模拟训练（未安装torch/transformers时使用）
+        
+        Args:
+            job: 训练任务
+            
+        Returns:
+            Optional[Dict]: 训练结果，任务被停止时返回None
+        """
+        job_id = job.id
+        dataset_id = job.dataset_id
+        await asyncio.sleep(1)  # 等待1秒
+        
+        # 模拟训练进度更新
+        epochs_done = 0
+        for progress in range(10, 101, 10):
+            await asyncio.sleep(2)  # 每2秒更新一次进度
+            
+            with get_db_context() as session:
+                job = session.get(TrainingJob, job_id)
+                if job and job.status == "running":
+                    job.progress = float(progress)
+                    session.add(job)
+                    session.commit()
+                    
+                    progress_broker.publish(job_id, "progress", {"progress": job.progress})
+                    self._record_metrics(job_id, progress // 10, {"progress": job.progress})
+                    self._write_log(job_id, job.log_file, f"训练进度: {progress}%", step=progress // 10)
+                    
+                    # 每轮结束时上报指标，超参搜索的试验可能被提前停止
+                    epoch = int(progress / 100 * job.epochs)
+                    if epoch > epochs_done:
+                        epochs_done = epoch
+                        # 与真实训练一致，每轮上报train_loss，划分验证集时同时上报验证指标
+                        loss = round(1.0 / (1 + epoch * job.learning_rate * 1e4), 4)
+                        epoch_metrics = {"train_loss": loss}
+                        if job.validation_split:
+                            epoch_metrics.update(eval_loss=loss, eval_accuracy=round(1 - loss / 2, 4))
+                        if not self._on_epoch_end(job_id, job.sweep_id, epoch, epoch_metrics):
+                            self._early_stop(job_id, f"第{epoch}轮指标落后，ASHA提前停止该试验")
+                            return None
+                elif job and job.status == "stopped":
+                    logger.info(f"训练任务{job_id}被停止")
+                    progress_broker.publish(job_id, "status", {"status": "stopped"})
+                    return None
+        
+        return {"model_name": f"model_{dataset_id}_{job_id}_{int(datetime.now().timestamp())}", "metrics": {}}
+    
+    def _complete_job(self, job_id: int, result: Dict[str, Any]):
+        """
+        标记任务完成，记录汇总指标并登记模型文件
+        
+        Args:
+            job_id: 训练任务ID
+            result: 训练结果，包含model_name、metrics，真实训练时还包含output_dir、artifact_type和base_model
+        """
+        with get_db_context() as session:
+            job = session.get(TrainingJob, job_id)
+            if not job or job.status != "running":
+                return
+            job.status = "completed"
+            job.progress = 100.0
+            job.completed_at = datetime.utcnow()
+            job.model_name = result["model_name"]
+            if result.get("metrics"):
+                job.metrics = json.dumps(result["metrics"])
+                job.best_step = result["metrics"].get("best_step")
+                job.stopped_step = result["metrics"].get("stopped_step")
+            session.add(job)
+            
+            if result.get("output_dir"):
+                session.add(ModelArtifact(
+                    training_job_id=job.id,
+                    user_id=job.user_id,
+                    name=job.model_name,
+                    file_path=result["output_dir"],
+                    artifact_type=result.get("artifact_type", "full"),
+                    base_model=result.get("base_model"),
+                    metrics=job.metrics
+                ))
+            session.commit()
+            
+            # 写入完成日志
+            self._write_log(job_id, job.log_file, f"训练完成，模型已保存: {job.model_name}")
+            progress_broker.publish(job_id, "status", {
+                "status": "completed",
+                "progress": 100.0,
+                "model_name": job.model_name,
+                "metrics": result.get("metrics")
+            })
+    
+    async def _export_after_training(self, job_id: int, formats: Optional[List[str]] = None):
+        """
+        按训练请求导出完成的模型
+        
+        任务已标记完成，导出失败只记录日志，不影响任务状态。
+        
+        Args:
+            job_id: 训练任务ID
+            formats: 导出格式，为空时使用任务创建时请求的格式
+        """
+        with get_db_context() as session:
+            job = session.get(TrainingJob, job_id)
+            if not formats:
+                if not job.export_formats:
+                    return
+                formats = json.loads(job.export_formats)
+            log_file = job.log_file
+            artifact_id = latest_trained_artifact(session, job_id).id
+        
+        self._write_log(job_id, log_file, f"开始导出模型: {', '.join(formats)}")
+        try:
+            variants = await export_service.export_artifact(artifact_id, formats)
+        except Exception as e:
+            self._write_log(job_id, log_file, f"导出模型失败: {str(e)}", level="ERROR")
+            return
+        for variant in variants:
+            if "error" in variant:
+                self._write_log(job_id, log_file, f"{variant['format']}导出失败: {variant['error']}", level="WARNING")
+                continue
+            latency = f"延迟{variant['latency']['exported_p50_ms']}ms（原模型{variant['latency']['reference_p50_ms']}ms）"
+            if "accuracy" in variant:
+                quality = f"验证集准确率变化{variant['accuracy']['accuracy_delta']}"
+            else:
+                quality = f"最大误差{variant['parity']['max_abs_diff']}"
+            self._write_log(job_id, log_file, f"{variant['format']}导出完成: {quality}，{latency}")
+    
+    def _register_checkpoint(self, job_id: int, model_name: str, result: Dict[str, Any], base_model: str):
+        """
+        登记任务停止前保存的检查点
+        
+        Args:
+            job_id: 训练任务ID
+            model_name: 模型名称
+            result: 训练结果，包含output_dir和artifact_type
+            base_model: 基座模型名称
+        """
+        with get_db_context() as session:
+            job = session.get(TrainingJob, job_id)
+            if not job:
+                return
+            job.model_name = model_name
+            session.add(job)
+            session.add(ModelArtifact(
+                training_job_id=job.id,
+                user_id=job.user_id,
+                name=model_name,
+                file_path=result["output_dir"],
+                artifact_type=result["artifact_type"],
+                base_model=base_model,
+                metrics=json.dumps(result["metrics"])
+            ))
+            session.commit()
+            self._write_log(job_id, job.log_file, f"停止前的检查点已保存: {model_name}")
+    
+    def _save_job_metrics(self, job_id: int, metrics: Dict[str, Any]):
+        """保存任务级汇总指标"""
+        with get_db_context() as session:
+            job = session.get(TrainingJob, job_id)
+            if job:
+                job.metrics = json.dumps(metrics)
+                job.best_step = metrics.get("best_step")
+                session.add(job)
+                session.commit()
+    
+    def _on_epoch_end(self, job_id: int, sweep_id: Optional[int], epoch: int, metrics: Dict[str, float]) -> bool:
+        """
+        每轮训练结束的回调
+        
+        Args:
+            job_id: 训练任务ID
+            sweep_id: 所属超参搜索ID
+            epoch: 已完成的轮数
+            metrics: 本轮结束时的指标
+            
+        Returns:
+            bool: 是否继续训练
+        """
+        if sweep_id is None:
+            return True
+        from .sweep_service import sweep_service
+        return sweep_service.report_epoch(job_id, sweep_id, epoch, metrics)
+    
+    def _early_stop(self, job_id: int, reason: str):
+        """
+        提前停止训练任务
+        
+        Args:
+            job_id: 训练任务ID
+            reason: 停止原因
+        """
+        with get_db_context() as session:
+            job = session.get(TrainingJob, job_id)
+            if not job or job.status != "running":
+                return
+            job.status = "stopped"
+            job.completed_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+            self._write_log(job_id, job.log_file, reason, level="WARNING")
+        progress_broker.publish(job_id, "status", {"status": "stopped", "reason": reason})
+        logger.info(f"训练任务{job_id}提前停止: {reason}")
+    
+    def _on_job_finished(self, job_id: int):
+        """训练任务结束（无论成功、失败或停止）后的回调"""
+        try:
+            with get_db_context() as session:
+                job = session.get(TrainingJob, job_id)
+                sweep_id = job.sweep_id if job else None
+            if sweep_id is not None:
+                from .sweep_service import sweep_service
+                sweep_service.on_trial_finished(sweep_id)
+        except Exception as e:
+            logger.error(f"训练任务{job_id}结束回调失败: {str(e)}")
+
+
+class JobTrainingCallbacks(TrainingCallbacks):
+    """训练引擎回调，将训练线程中的进度桥接到数据库、指标存储和进度推送"""
+    
+    def __init__(
+        self,
+        service: TrainingService,
+        job: TrainingJob,
+        loop: asyncio.AbstractEventLoop,
+        cancel_event: threading.Event
+    ):
+        self.service = service
+        self.job_id = job.id
+        self.sweep_id = job.sweep_id
+        self.log_file = job.log_file
+        self.loop = loop
+        self.cancel_event = cancel_event
+        self.early_stop_reason: Optional[str] = None
+        self._step = 0
+        self._last_sync = 0.0
+        self._last_status_check = 0.0
+    
+    def _publish(self, event: str, data: Dict[str, Any]):
+        # 进度发布中心不是线程安全的，切回事件循环线程执行
+        self.loop.call_soon_threadsafe(progress_broker.publish, self.job_id, event, data)
+    
+    def on_step(self, step: int, total_steps: int, metrics: Dict[str, float]):
+        self._step = step
+        metrics_service.record(self.job_id, step, metrics)
+        self._publish("metrics", {"step": step, **metrics})
+        
+        # 进度写库和停止检查合并，并限制频率，避免每一步都访问数据库
+        now = time.monotonic()
+        if now - self._last_sync >= PROGRESS_SYNC_INTERVAL or step == total_steps:
+            self._last_sync = now
+            self._sync_progress(round(step / total_steps * 100, 2))
+    
+    def _sync_progress(self, progress: float):
+        with get_db_context() as session:
+            job = session.get(TrainingJob, self.job_id)
+            if not job or job.status != "running":
+                self.cancel_event.set()
+                return
+            job.progress = progress
+            session.add(job)
+            session.commit()
+        self._publish("progress", {"progress": progress})
+    
+    def on_autotune(self, batch_size: int, results: List[Dict[str, Any]]):
+        with get_db_context() as session:
+            job = session.get(TrainingJob, self.job_id)
+            if job:
+                job.batch_size = batch_size
+                job.autotune_results = json.dumps(results)
+                session.add(job)
+                session.commit()
+        self._publish("autotune", {"batch_size": batch_size, "results": results})
+    
+    def on_evaluate(self, step: int, metrics: Dict[str, float]):
+        metrics_service.record(self.job_id, step, metrics)
+        self._publish("metrics", {"step": step, **metrics})
+    
+    def on_epoch_end(self, epoch: int, metrics: Dict[str, float]) -> bool:
+        # 验证指标已在on_evaluate中按步记录，这里只记录训练指标，但全部用于超参搜索的比较
+        train_metrics = {k: v for k, v in metrics.items() if not k.startswith("eval_")}
+        metrics_service.record(self.job_id, self._step, train_metrics)
+        self._publish("metrics", {"step": self._step, "epoch": epoch, **train_metrics})
+        if not self.service._on_epoch_end(self.job_id, self.sweep_id, epoch, metrics):
+            self.early_stop_reason = f"第{epoch}轮指标落后，ASHA提前停止该试验"
+            return False
+        return True
+    
+    def log(self, message: str):
+        self.service._write_log(self.job_id, self.log_file, message, loop=self.loop, step=self._step)
+    
+    def on_resources(self, usage: Dict[str, Any]):
+        with get_db_context() as session:
+            job = session.get(TrainingJob, self.job_id)
+            if not job:
+                return
+            job.cpu_seconds = usage["cpu_seconds"]
+            job.peak_rss_bytes = usage["peak_rss_bytes"]
+            job.avg_rss_bytes = usage["avg_rss_bytes"]
+            job.io_read_bytes = usage["read_bytes"]
+            job.io_write_bytes = usage["write_bytes"]
+            job.examples_per_sec = usage["examples_per_sec"]
+            session.add(job)
+            session.commit()
+        self._publish("resources", usage)
+    
+    def should_stop(self) -> bool:
+        if self.cancel_event.is_set():
+            return True
+        # 停止请求也可能来自其他服务进程，限频检查数据库中的任务状态
+        now = time.monotonic()
+        if now - self._last_status_check >= PROGRESS_SYNC_INTERVAL:
+            self._last_status_check = now
+            with get_db_context() as session:
+                job = session.get(TrainingJob, self.job_id)
+                if not job or job.status != "running":
+                    self.cancel_event.set()
+        return self.cancel_event.is_set()
 
 
 # 全局训练服务实例
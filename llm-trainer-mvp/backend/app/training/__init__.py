@@ -0,0 +1,46 @@
+# 训练引擎模块
+# 基于PyTorch和Transformers的文本分类训练实现，由训练服务层在后台线程中调用
+
+import os
+import hashlib
+import functools
+import importlib.util
+
+from ..core.config import settings
+
+
+def engine_available() -> bool:
+    """
+    判断是否使用真实训练引擎
+
+    TRAINING_BACKEND为simulated或未安装torch/transformers时，训练服务使用模拟训练。
+    """
+    if settings.TRAINING_BACKEND == "simulated":
+        return False
+    return importlib.util.find_spec("torch") is not None and importlib.util.find_spec("transformers") is not None
+
+
+def peft_available() -> bool:
+    """判断是否安装了peft，LoRA微调和加载适配器需要"""
+    return importlib.util.find_spec("peft") is not None
+
+
+def onnx_available() -> bool:
+    """判断是否安装了onnx和onnxruntime，导出ONNX并校验一致性需要"""
+    return importlib.util.find_spec("onnx") is not None and importlib.util.find_spec("onnxruntime") is not None
+
+
+@functools.lru_cache(maxsize=1)
+def code_version() -> str:
+    """
+    训练代码版本
+
+    应用版本号加训练引擎源文件内容的sha256，训练实现变化后之前的训练结果不再被复用。
+    """
+    digest = hashlib.sha256(settings.APP_VERSION.encode("utf-8"))
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith(".py"):
+            with open(os.path.join(package_dir, name), "rb") as f:
+                digest.update(name.encode("utf-8") + b"\0" + f.read())
+    return digest.hexdigest()
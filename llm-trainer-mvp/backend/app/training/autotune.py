@@ -0,0 +1,52 @@
+# 批次大小自动调优
+# 训练前在内存预算内以递增的批次大小试跑若干步，选择吞吐量（样本/秒）最高的批次大小；
+# 这里是不依赖torch的候选生成和选择逻辑，计时试跑在训练引擎中执行
+
+from typing import List, Dict, Any, Optional
+
+# 每个候选配置计时的步数（另有一步预热不计时）
+PROBE_STEPS = 3
+# 吞吐量连续多少个候选没有提升时停止继续增大批次
+PROBE_PATIENCE = 2
+
+
+def candidate_batch_sizes(max_batch_size: int) -> List[int]:
+    """
+    生成候选批次大小：1, 2, 4, ... 直到max_batch_size（包含max_batch_size本身）
+
+    Args:
+        max_batch_size: 批次大小上限
+
+    Returns:
+        List[int]: 递增的候选批次大小
+    """
+    sizes = []
+    size = 1
+    while size < max_batch_size:
+        sizes.append(size)
+        size *= 2
+    sizes.append(max_batch_size)
+    return sizes
+
+
+def choose_batch_size(results: List[Dict[str, Any]], seq_length: int) -> Optional[int]:
+    """
+    选择在代表性序列长度下吞吐量最高的批次大小
+
+    只考虑在最长序列下也成功试跑的批次大小，保证真实训练中最长的批次不会超出内存。
+
+    Args:
+        results: 试跑结果，每项包含batch_size、seq_length、examples_per_sec，失败的项ok为False
+        seq_length: 代表性序列长度
+
+    Returns:
+        Optional[int]: 选中的批次大小，没有成功的试跑时返回None
+    """
+    failed = {r["batch_size"] for r in results if not r.get("ok", True)}
+    candidates = [
+        r for r in results
+        if r["seq_length"] == seq_length and r.get("ok", True) and r["batch_size"] not in failed
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda r: r["examples_per_sec"])["batch_size"]
@@ -0,0 +1,83 @@
+# 训练引擎配置和回调接口
+# 不依赖torch，训练服务层可在未安装torch时导入
+
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+
+@dataclass
+class TrainingConfig:
+    """训练引擎配置，由训练服务根据TrainingJob构造"""
+    job_id: int
+    dataset_path: str
+    output_dir: str
+    base_model: str
+    epochs: int
+    learning_rate: float
+    batch_size: int
+    max_seq_length: int = 128
+    bucket_by_length: bool = True
+    shuffle_within_buckets: bool = True
+    gradient_accumulation_steps: int = 1
+    precision: str = "fp32"
+    gradient_checkpointing: bool = False
+    method: str = "full"
+    lora_rank: int = 8
+    lora_alpha: int = 16
+    lora_dropout: float = 0.05
+    data_parallel_workers: int = 1
+    save_checkpoint_on_stop: bool = False
+    validation_split: float = 0.0
+    eval_steps: Optional[int] = None
+    early_stopping_patience: Optional[int] = None
+    early_stopping_min_delta: float = 0.0
+    keep_best_checkpoint: bool = True
+    autotune_batch_size: bool = False
+    autotune_max_batch_size: int = 128
+    memory_budget_bytes: Optional[int] = None
+    init_from: Optional[str] = None
+    init_optimizer_state: bool = False
+    save_optimizer_state: bool = False
+    token_cache_dir: str = os.path.join(tempfile.gettempdir(), "llm-trainer-token-cache")
+    data_loader_workers: int = 2
+    prefetch_batches: int = 4
+    profile: bool = False
+    profile_start_step: int = 3
+    profile_steps: int = 5
+    profile_dir: Optional[str] = None
+    mode: str = "finetune"
+    teacher_dir: Optional[str] = None
+    distill_temperature: float = 2.0
+    distill_alpha: float = 0.5
+    cache_teacher_logits: bool = True
+    cancel_grace_seconds: float = 10.0
+    seed: int = 42
+
+
+class TrainingCallbacks:
+    """训练引擎回调接口，默认实现为空操作"""
+
+    def on_step(self, step: int, total_steps: int, metrics: Dict[str, float]):
+        """每个优化步结束后调用"""
+
+    def on_evaluate(self, step: int, metrics: Dict[str, float]):
+        """每次验证集评估后调用"""
+
+    def on_autotune(self, batch_size: int, results: List[Dict[str, Any]]):
+        """批次大小自动调优结束后调用"""
+
+    def on_epoch_end(self, epoch: int, metrics: Dict[str, float]) -> bool:
+        """每轮结束后调用，返回False时停止训练"""
+        return True
+
+    def log(self, message: str):
+        """写入训练日志"""
+
+    def on_resources(self, usage: Dict[str, Any]):
+        """定期调用，参数为训练工作进程截至目前的资源用量"""
+
+    def should_stop(self) -> bool:
+        """是否收到停止请求"""
+        return False
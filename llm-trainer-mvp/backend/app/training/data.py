@@ -0,0 +1,170 @@
+# 训练数据管道
+# 数据集读取、按长度分桶组批和动态填充，不依赖torch，便于单独测试
+
+import random
+from typing import List, Tuple, Iterator, Sequence
+
+import pandas as pd
+
+
+def load_text_classification_csv(file_path: str) -> Tuple[List[str], List[int], List[str]]:
+    """
+    读取文本分类数据集
+
+    Args:
+        file_path: CSV文件路径，必须包含text和label列
+
+    Returns:
+        Tuple: (文本列表, 标签索引列表, 标签名称列表)
+    """
+    df = pd.read_csv(file_path).dropna(subset=["text", "label"])
+    label_names = sorted(df["label"].astype(str).unique().tolist())
+    label_index = {name: i for i, name in enumerate(label_names)}
+    texts = df["text"].astype(str).tolist()
+    labels = [label_index[name] for name in df["label"].astype(str)]
+    return texts, labels, label_names
+
+
+class LengthBucketBatchSampler:
+    """按长度分桶的批次采样器
+
+    将样本按token长度排序后切分为若干桶（每桶 batch_size * bucket_multiplier 个样本），
+    桶内再切分为批次，使同一批次的样本长度接近，动态填充时浪费最少。
+    shuffle为True时每轮打乱桶内样本和批次顺序，保留训练的随机性。
+    """
+
+    def __init__(
+        self,
+        lengths: Sequence[int],
+        batch_size: int,
+        bucket_by_length: bool = True,
+        shuffle: bool = True,
+        bucket_multiplier: int = 8,
+        seed: int = 42
+    ):
+        self.lengths = list(lengths)
+        self.batch_size = batch_size
+        self.bucket_by_length = bucket_by_length
+        self.shuffle = shuffle
+        self.bucket_size = batch_size * bucket_multiplier
+        self.seed = seed
+
+    def __len__(self) -> int:
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+    def batches(self, epoch: int = 0) -> Iterator[List[int]]:
+        """
+        生成一轮的批次
+
+        Args:
+            epoch: 轮次，用于派生每轮不同的随机种子
+
+        Yields:
+            List[int]: 批次内的样本索引
+        """
+        rng = random.Random(self.seed + epoch)
+        indices = list(range(len(self.lengths)))
+
+        if not self.bucket_by_length:
+            if self.shuffle:
+                rng.shuffle(indices)
+            for start in range(0, len(indices), self.batch_size):
+                yield indices[start:start + self.batch_size]
+            return
+
+        # 随机打破长度相同样本的顺序，再按长度排序
+        if self.shuffle:
+            rng.shuffle(indices)
+        indices.sort(key=lambda i: self.lengths[i])
+
+        batches = []
+        for start in range(0, len(indices), self.bucket_size):
+            bucket = indices[start:start + self.bucket_size]
+            if self.shuffle:
+                # 桶内样本长度相近，打乱后每轮的批次组合不同，填充开销只略有增加
+                rng.shuffle(bucket)
+            for offset in range(0, len(bucket), self.batch_size):
+                batches.append(bucket[offset:offset + self.batch_size])
+
+        if self.shuffle:
+            rng.shuffle(batches)
+        yield from batches
+
+
+def train_validation_split(count: int, fraction: float, seed: int = 42) -> Tuple[List[int], List[int]]:
+    """
+    按比例随机划分训练集和验证集
+
+    Args:
+        count: 样本总数
+        fraction: 验证集比例，为0时不划分验证集
+        seed: 随机种子
+
+    Returns:
+        Tuple: (训练集样本索引, 验证集样本索引)
+    """
+    indices = list(range(count))
+    validation_count = int(count * fraction)
+    if validation_count == 0:
+        return indices, []
+    random.Random(seed).shuffle(indices)
+    return sorted(indices[validation_count:]), sorted(indices[:validation_count])
+
+
+def shard_batches(batches: List[List[int]], rank: int, world_size: int) -> List[List[int]]:
+    """
+    将一轮的批次分给数据并行的各个进程
+
+    批次数不能整除进程数时循环补齐开头的批次，保证每个进程的步数相同，
+    否则步数少的进程提前结束会使其余进程在梯度all-reduce时挂起。
+
+    Args:
+        batches: 所有进程按相同种子生成的同一份批次列表
+        rank: 当前进程序号
+        world_size: 进程总数
+
+    Returns:
+        List[List[int]]: 当前进程负责的批次
+    """
+    if world_size <= 1:
+        return batches
+    remainder = len(batches) % world_size
+    if remainder:
+        batches = batches + batches[:world_size - remainder]
+    return batches[rank::world_size]
+
+
+def pad_batch(sequences: Sequence[Sequence[int]], pad_id: int) -> Tuple[List[List[int]], List[List[int]]]:
+    """
+    将批次动态填充到批次内最长序列的长度
+
+    Args:
+        sequences: token id序列列表
+        pad_id: 填充token id
+
+    Returns:
+        Tuple: (填充后的input_ids, attention_mask)
+    """
+    max_length = max(len(seq) for seq in sequences)
+    input_ids = [list(seq) + [pad_id] * (max_length - len(seq)) for seq in sequences]
+    attention_mask = [[1] * len(seq) + [0] * (max_length - len(seq)) for seq in sequences]
+    return input_ids, attention_mask
+
+
+class PaddingStats:
+    """填充效率统计：有效token数 / 填充后token总数"""
+
+    def __init__(self):
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    def update(self, lengths: Sequence[int]):
+        """记录一个批次的序列长度"""
+        self.real_tokens += sum(lengths)
+        self.padded_tokens += max(lengths) * len(lengths)
+
+    @property
+    def efficiency(self) -> float:
+        if self.padded_tokens == 0:
+            return 1.0
+        return self.real_tokens / self.padded_tokens
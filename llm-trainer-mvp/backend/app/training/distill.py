@@ -0,0 +1,195 @@
+# 知识蒸馏
+# 用已训练的教师模型为数据集生成软标签（logits），训练较小的学生模型拟合软标签和真实标签
+
+import os
+import json
+import time
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.nn.functional as F
+
+from .base import TrainingConfig, TrainingCallbacks
+from .inference import OPTIMIZER_STATE_NAME, load_for_inference
+from .loader import token_cache_key
+
+# 生成软标签时教师模型的推理批次大小
+TEACHER_BATCH_SIZE = 32
+# 测量单条推理延迟的预热和计时次数
+LATENCY_WARMUP_RUNS = 3
+LATENCY_RUNS = 20
+
+
+def distillation_loss(
+    student_logits: torch.Tensor,
+    teacher_logits: torch.Tensor,
+    labels: torch.Tensor,
+    temperature: float,
+    alpha: float
+) -> torch.Tensor:
+    """
+    蒸馏损失：alpha * 软标签KL散度 + (1 - alpha) * 真实标签交叉熵
+
+    软标签项按temperature平方缩放，使其梯度量级不随温度变化（Hinton等，2015）。
+
+    Args:
+        student_logits: 学生模型logits
+        teacher_logits: 教师模型logits
+        labels: 真实标签
+        temperature: 软化温度
+        alpha: 软标签项权重
+
+    Returns:
+        torch.Tensor: 批次平均损失
+    """
+    soft = F.kl_div(
+        F.log_softmax(student_logits / temperature, dim=-1),
+        F.log_softmax(teacher_logits / temperature, dim=-1),
+        reduction="batchmean",
+        log_target=True,
+    ) * temperature ** 2
+    hard = F.cross_entropy(student_logits, labels)
+    return alpha * soft + (1 - alpha) * hard
+
+
+def load_teacher_logits(
+    config: TrainingConfig,
+    texts: List[str],
+    label_names: List[str],
+    callbacks: TrainingCallbacks,
+    is_main: bool,
+    distributed: bool
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    生成或读取教师模型在整个数据集上的logits
+
+    由rank 0用教师自己的分词器按长度排序分批推理，写入文件后各进程读取。
+    cache_teacher_logits为True时文件按数据集内容、教师产物和截断长度缓存，同一教师的
+    后续蒸馏任务直接复用；否则所有进程读取后删除。
+
+    Args:
+        config: 训练配置，teacher_dir为教师产物目录
+        texts: 数据集文本
+        label_names: 数据集标签名称
+        callbacks: 训练回调
+        is_main: 是否为rank 0
+        distributed: 是否数据并行
+
+    Returns:
+        Tuple: (形状为(样本数, 类别数)的logits, 教师模型的延迟和大小，只在rank 0上返回)
+
+    Raises:
+        ValueError: 教师模型的标签与数据集不一致
+    """
+    key = token_cache_key(config.dataset_path, config.teacher_dir, config.max_seq_length)
+    directory = os.path.join(config.token_cache_dir, "teacher_logits")
+    path = os.path.join(directory, f"{key}.npy" if config.cache_teacher_logits else f"job_{config.job_id}.npy")
+
+    stats_path = path[:-len(".npy")] + ".json"
+    teacher_stats: Dict[str, Any] = {}
+    if is_main:
+        if config.cache_teacher_logits and os.path.exists(path) and os.path.exists(stats_path):
+            callbacks.log("复用已缓存的教师模型软标签")
+            with open(stats_path, encoding="utf-8") as f:
+                teacher_stats = json.load(f)
+        else:
+            logits, teacher_stats = _generate_teacher_logits(config, texts, label_names, callbacks)
+            os.makedirs(directory, exist_ok=True)
+            if config.cache_teacher_logits:
+                with open(stats_path, "w", encoding="utf-8") as f:
+                    json.dump(teacher_stats, f)
+            # 先写临时文件再重命名，避免其他任务读到写了一半的缓存
+            staging = f"{path}.{os.getpid()}.tmp"
+            with open(staging, "wb") as f:
+                np.save(f, logits)
+            os.replace(staging, path)
+    if distributed:
+        dist.barrier()
+
+    logits = np.load(path)
+    if not config.cache_teacher_logits:
+        if distributed:
+            # 所有进程读取完成后再删除
+            dist.barrier()
+        if is_main:
+            os.remove(path)
+    if logits.shape != (len(texts), len(label_names)):
+        raise ValueError(f"教师模型软标签形状{logits.shape}与数据集不一致")
+    return logits, teacher_stats
+
+
+def _generate_teacher_logits(
+    config: TrainingConfig,
+    texts: List[str],
+    label_names: List[str],
+    callbacks: TrainingCallbacks
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """用教师模型推理整个数据集，并测量教师的延迟和大小作为学生的对照"""
+    model, tokenizer = load_for_inference(config.teacher_dir)
+    teacher_labels = [model.config.id2label[i] for i in range(model.config.num_labels)]
+    if teacher_labels != label_names:
+        raise ValueError(f"数据集标签{label_names}与教师模型的标签{teacher_labels}不一致")
+
+    callbacks.log(f"开始生成教师模型软标签: {len(texts)}条样本")
+    start = time.perf_counter()
+    logits = np.zeros((len(texts), len(label_names)), dtype=np.float32)
+    # 按长度排序组批，减少填充
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    with torch.no_grad():
+        for offset in range(0, len(order), TEACHER_BATCH_SIZE):
+            batch = order[offset:offset + TEACHER_BATCH_SIZE]
+            inputs = tokenizer(
+                [texts[i] for i in batch], truncation=True, max_length=config.max_seq_length,
+                padding=True, return_tensors="pt"
+            )
+            logits[batch] = model(**inputs).logits.float().numpy()
+    callbacks.log(f"教师模型软标签生成完成，耗时{time.perf_counter() - start:.1f}秒")
+
+    stats = {
+        "teacher_latency_ms": measure_latency(model, tokenizer, texts, config.max_seq_length),
+        "teacher_size_bytes": directory_size(config.teacher_dir),
+    }
+    return logits, stats
+
+
+def measure_latency(model, tokenizer, texts: List[str], max_seq_length: int) -> float:
+    """
+    测量单条样本推理的中位延迟
+
+    Args:
+        model: 分类模型
+        tokenizer: 分词器
+        texts: 样本文本，循环取用
+        max_seq_length: 截断长度
+
+    Returns:
+        float: 中位延迟（毫秒）
+    """
+    was_training = model.training
+    model.eval()
+    samples = [
+        tokenizer(texts[i % len(texts)], truncation=True, max_length=max_seq_length, return_tensors="pt")
+        for i in range(LATENCY_WARMUP_RUNS + LATENCY_RUNS)
+    ]
+    timings = []
+    with torch.no_grad():
+        for index, inputs in enumerate(samples):
+            start = time.perf_counter()
+            model(**inputs)
+            if index >= LATENCY_WARMUP_RUNS:
+                timings.append((time.perf_counter() - start) * 1000)
+    if was_training:
+        model.train()
+    return round(float(np.median(timings)), 3)
+
+
+def directory_size(path: str) -> int:
+    """模型目录下推理所需文件的总字节数，不含为增量训练保存的优化器状态"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name != OPTIMIZER_STATE_NAME:
+                total += os.path.getsize(os.path.join(root, name))
+    return total
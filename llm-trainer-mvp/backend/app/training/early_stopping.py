@@ -0,0 +1,50 @@
+# 提前停止
+# 跟踪验证集指标，连续patience次评估没有改进超过min_delta时停止训练，不依赖torch
+
+from typing import Optional
+
+
+class EarlyStopping:
+    """基于验证指标的提前停止判断
+
+    patience为None时只记录最优结果，不触发停止。
+    """
+
+    def __init__(self, patience: Optional[int] = None, min_delta: float = 0.0, mode: str = "min"):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.mode = mode
+        self.best: Optional[float] = None
+        self.best_step: Optional[int] = None
+        self.bad_evaluations = 0
+
+    def update(self, value: float, step: int) -> bool:
+        """
+        记录一次评估结果
+
+        Args:
+            value: 指标值
+            step: 评估时的优化步数
+
+        Returns:
+            bool: 是否为新的最优结果
+        """
+        if self.best is None:
+            improved = True
+        elif self.mode == "max":
+            improved = value > self.best + self.min_delta
+        else:
+            improved = value < self.best - self.min_delta
+
+        if improved:
+            self.best = value
+            self.best_step = step
+            self.bad_evaluations = 0
+        else:
+            self.bad_evaluations += 1
+        return improved
+
+    @property
+    def should_stop(self) -> bool:
+        """是否已连续patience次评估没有改进"""
+        return self.patience is not None and self.bad_evaluations >= self.patience
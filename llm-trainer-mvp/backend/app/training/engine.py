@@ -0,0 +1,782 @@
+# 训练引擎
+# 基于Transformers的序列分类微调循环，在训练工作进程中执行，通过回调上报进度
+
+import os
+import json
+import time
+import math
+import logging
+import contextlib
+from typing import Dict, Any, List
+
+import numpy as np
+import torch
+import torch.distributed as dist
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification, get_linear_schedule_with_warmup
+
+from .base import TrainingConfig, TrainingCallbacks
+from .data import (
+    load_text_classification_csv, train_validation_split, LengthBucketBatchSampler,
+    pad_batch, shard_batches, PaddingStats
+)
+from .loader import OFFSETS_FILE, TokenArrays, BatchBuffers, BatchPrefetcher, token_cache_key, write_token_arrays
+from .profiling import (
+    PROFILE_SUMMARY_NAME, PROFILE_TRACE_NAME, PhaseTimer, profile_window, summarize_operators, build_profile_report
+)
+from .distill import distillation_loss, load_teacher_logits, measure_latency, directory_size
+from .early_stopping import EarlyStopping
+from .autotune import PROBE_STEPS, PROBE_PATIENCE, candidate_batch_sizes, choose_batch_size
+from .memory import ModelProfile, estimate_peak_memory
+from .inference import OPTIMIZER_STATE_NAME, is_adapter_dir
+
+logger = logging.getLogger(__name__)
+
+
+def cpu_supports_bf16() -> bool:
+    """
+    判断CPU是否原生支持bf16运算（AVX512-BF16或AMX）
+
+    不支持时bf16由软件模拟，反而比fp32慢，训练引擎会回退到fp32。
+    """
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def run_training(config: TrainingConfig, callbacks: TrainingCallbacks) -> Dict[str, Any]:
+    """
+    执行文本分类微调
+
+    训练在子进程中执行，data_parallel_workers大于1时为多个gloo进程做数据并行。
+    停止时子进程可以被终止，不会在调用线程中留下无法中断的计算。
+
+    Args:
+        config: 训练配置
+        callbacks: 训练回调
+
+    Returns:
+        Dict: 训练结果，包含stopped（是否被中途停止）、output_dir、artifact_type和汇总指标metrics
+    """
+    from .workers import run_worker_processes
+    return run_worker_processes(config, callbacks)
+
+
+def train_loop(
+    config: TrainingConfig,
+    callbacks: TrainingCallbacks,
+    rank: int = 0,
+    world_size: int = 1
+) -> Dict[str, Any]:
+    """
+    训练循环
+
+    数据并行时每个工作进程各执行一份：所有进程按相同种子生成批次后各取一份分片，
+    DistributedDataParallel在反向传播时all-reduce梯度。loss、token数和填充统计每步
+    all-reduce汇总，只有rank 0调用回调和保存模型。
+
+    划分了验证集时每eval_steps步和每轮结束时评估，early_stopping_patience次评估没有改进
+    则提前结束；keep_best_checkpoint为True时每次改进都保存检查点，最终产物为最优检查点。
+
+    Args:
+        config: 训练配置
+        callbacks: 训练回调
+        rank: 当前进程序号
+        world_size: 工作进程总数
+
+    Returns:
+        Dict: 训练结果
+    """
+    distributed = world_size > 1
+    is_main = rank == 0
+    torch.manual_seed(config.seed)
+
+    texts, labels, label_names = load_text_classification_csv(config.dataset_path)
+    if is_main:
+        callbacks.log(f"数据集加载完成: {len(texts)}条样本, {len(label_names)}个类别")
+
+    tokenizer = AutoTokenizer.from_pretrained(config.init_from or config.base_model)
+    token_arrays = _load_token_arrays(config, texts, tokenizer, callbacks, is_main, distributed)
+    train_indices, validation_indices = train_validation_split(len(texts), config.validation_split, config.seed)
+    train_rows = np.asarray(train_indices, dtype=np.int64)
+    lengths = token_arrays.lengths[train_rows].tolist()
+    validation = ([token_arrays[i].tolist() for i in validation_indices], [labels[i] for i in validation_indices])
+    labels = np.asarray([labels[i] for i in train_indices], dtype=np.int64)
+    if is_main and validation_indices:
+        callbacks.log(f"划分验证集: 训练{len(train_indices)}条, 验证{len(validation_indices)}条")
+
+    distill = config.mode == "distill"
+    teacher_logits, teacher_stats = None, {}
+    if distill:
+        all_logits, teacher_stats = load_teacher_logits(
+            config, texts, label_names, callbacks if is_main else TrainingCallbacks(), is_main, distributed
+        )
+        teacher_logits = np.ascontiguousarray(all_logits[train_rows])
+
+    if config.init_from:
+        model = _load_init_model(config, label_names, callbacks if is_main else TrainingCallbacks())
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained(
+            config.base_model,
+            num_labels=len(label_names),
+            id2label={i: name for i, name in enumerate(label_names)},
+            label2id={name: i for i, name in enumerate(label_names)},
+        )
+    if config.gradient_checkpointing:
+        model.gradient_checkpointing_enable()
+    if config.method == "lora" and not hasattr(model, "peft_config"):
+        model = _wrap_lora(model, config, callbacks if is_main else TrainingCallbacks())
+    elif config.method == "lora" and config.gradient_checkpointing:
+        model.enable_input_require_grads()
+    model.train()
+
+    # 保存时使用未包装的模型
+    unwrapped = model
+    if distributed:
+        model = torch.nn.parallel.DistributedDataParallel(model)
+
+    use_bf16 = config.precision == "bf16"
+    if use_bf16 and not cpu_supports_bf16():
+        if is_main:
+            callbacks.log("CPU不支持原生bf16运算，回退到fp32训练")
+        use_bf16 = False
+
+    batch_size = config.batch_size
+    if config.autotune_batch_size:
+        batch_size = _autotune_batch_size(unwrapped, lengths, config, use_bf16, callbacks, is_main)
+        if distributed:
+            # 各进程同时独立试跑（与真实训练的CPU竞争一致），以rank 0的选择为准
+            chosen = torch.tensor([batch_size])
+            dist.broadcast(chosen, src=0)
+            batch_size = int(chosen.item())
+
+    sampler = LengthBucketBatchSampler(
+        lengths,
+        batch_size,
+        bucket_by_length=config.bucket_by_length,
+        shuffle=config.shuffle_within_buckets,
+        seed=config.seed,
+    )
+    accumulation = config.gradient_accumulation_steps
+    steps_per_epoch = math.ceil(math.ceil(len(sampler) / world_size) / accumulation)
+    total_steps = config.epochs * steps_per_epoch
+    optimizer = torch.optim.AdamW([p for p in model.parameters() if p.requires_grad], lr=config.learning_rate)
+    if config.init_from and config.init_optimizer_state:
+        _load_optimizer_state(optimizer, config, callbacks if is_main else TrainingCallbacks())
+    scheduler = get_linear_schedule_with_warmup(optimizer, 0, total_steps)
+    padding = PaddingStats()
+    pad_id = tokenizer.pad_token_id or 0
+    buffers = BatchBuffers(config.prefetch_batches + 1, batch_size, max(lengths))
+
+    def assemble(batch: List[int], slot: int):
+        # 在预取线程中执行；torch.from_numpy与缓冲区共享内存，不再复制
+        input_ids, attention_mask = buffers.gather(token_arrays, train_rows[batch], pad_id, slot)
+        batch_teacher = torch.from_numpy(teacher_logits[batch]) if distill else None
+        return (
+            torch.from_numpy(input_ids), torch.from_numpy(attention_mask), torch.from_numpy(labels[batch]), batch_teacher
+        )
+
+    step = 0
+    train_loss = None
+    tokens = 0
+    examples = 0
+    start_time = time.perf_counter()
+    artifact_type = "lora_adapter" if config.method == "lora" else "full"
+    early_stopping = EarlyStopping(config.early_stopping_patience, config.early_stopping_min_delta)
+    last_eval: Dict[str, float] = {}
+    last_eval_step = None
+    best_saved = False
+    stopped_step = None
+    # 训练循环等待批次的累计时间和优化步的累计耗时
+    data_wait = 0.0
+    step_time = 0.0
+    # 性能分析只在rank 0进行
+    profiling = config.profile and is_main
+    phase_timer = PhaseTimer(enabled=profiling)
+    trace: Dict[str, Any] = {}
+    torch_profiler = _start_torch_profiler(config, trace) if profiling else None
+
+    def summary() -> Dict[str, Any]:
+        if torch_profiler is not None:
+            _write_profile_report(config, torch_profiler, phase_timer, trace, step)
+        elapsed = time.perf_counter() - start_time
+        return {
+            "train_loss": train_loss,
+            "padding_efficiency": padding.efficiency,
+            "tokens_per_sec": tokens / elapsed if elapsed > 0 else 0.0,
+            "examples_per_sec": examples / elapsed if elapsed > 0 else 0.0,
+            "steps": step,
+            "data_parallel_workers": world_size,
+            "data_wait_fraction": data_wait / step_time if step_time > 0 else 0.0,
+            **last_eval,
+            "best_eval_loss": early_stopping.best,
+            "best_step": early_stopping.best_step,
+            "stopped_step": stopped_step,
+        }
+
+    def stop_requested() -> bool:
+        stop = callbacks.should_stop()
+        if distributed:
+            # 任一进程收到停止请求，所有进程在同一步退出，避免集合通信挂起
+            flag = torch.tensor([1 if stop else 0])
+            dist.all_reduce(flag, op=dist.ReduceOp.MAX)
+            stop = bool(flag.item())
+        return stop
+
+    def stopped_result() -> Dict[str, Any]:
+        result = {"stopped": True, "metrics": summary()}
+        if config.save_checkpoint_on_stop and step > 0:
+            # 已有最优检查点时直接使用，不用停止时的模型覆盖
+            if is_main and not best_saved:
+                _save(unwrapped, tokenizer, config, optimizer)
+                callbacks.log(f"已在第{step}步保存停止前的检查点")
+            result.update(output_dir=config.output_dir, artifact_type=artifact_type)
+        return result
+
+    def run_evaluation() -> bool:
+        """评估验证集，返回是否应提前停止"""
+        nonlocal last_eval, last_eval_step, best_saved
+        last_eval_step = step
+        last_eval = evaluate(
+            unwrapped, validation[0], validation[1], batch_size * 2, pad_id, use_bf16, rank, world_size
+        )
+        improved = early_stopping.update(last_eval["eval_loss"], step)
+        if is_main:
+            callbacks.on_evaluate(step, last_eval)
+            callbacks.log(
+                f"第{step}步验证: eval_loss={last_eval['eval_loss']:.4f}, "
+                f"eval_accuracy={last_eval['eval_accuracy']:.4f}" + ("（最优）" if improved else "")
+            )
+            if improved and config.keep_best_checkpoint:
+                _save(unwrapped, tokenizer, config, optimizer)
+        if improved and config.keep_best_checkpoint:
+            best_saved = True
+        return early_stopping.should_stop
+
+    for epoch in range(config.epochs):
+        epoch_loss = 0.0
+        epoch_steps = 0
+        batches = shard_batches(list(sampler.batches(epoch)), rank, world_size)
+        prefetcher = BatchPrefetcher(batches, assemble, config.data_loader_workers, config.prefetch_batches)
+        with contextlib.closing(iter(prefetcher)) as stream:
+            for start in range(0, len(batches), accumulation):
+                if stop_requested():
+                    return stopped_result()
+
+                # 一个优化步内累积多个微批次的梯度，按微批次样本数加权保证与大批次等价
+                step_start = time.perf_counter()
+                wait_before = prefetcher.wait_seconds
+                group = batches[start:start + accumulation]
+                group_size = sum(len(batch) for batch in group)
+                step_loss = 0.0
+                step_real, step_padded = 0, 0
+                for index, batch in enumerate(group):
+                    batch_lengths = [lengths[i] for i in batch]
+                    step_real += sum(batch_lengths)
+                    step_padded += max(batch_lengths) * len(batch_lengths)
+                    with phase_timer.phase("data"):
+                        input_ids, attention_mask, batch_labels, batch_teacher = next(stream)
+
+                    # 累积期间跳过梯度同步，只在优化步的最后一个微批次all-reduce
+                    last = index == len(group) - 1
+                    sync = model.no_sync() if distributed and not last else contextlib.nullcontext()
+                    with sync:
+                        with phase_timer.phase("forward"):
+                            with torch.autocast("cpu", dtype=torch.bfloat16, enabled=use_bf16):
+                                if distill:
+                                    outputs = model(input_ids=input_ids, attention_mask=attention_mask)
+                                else:
+                                    outputs = model(input_ids=input_ids, attention_mask=attention_mask, labels=batch_labels)
+                            if distill:
+                                batch_loss = distillation_loss(
+                                    outputs.logits.float(), batch_teacher, batch_labels,
+                                    config.distill_temperature, config.distill_alpha
+                                )
+                            else:
+                                batch_loss = outputs.loss.float()
+                            loss = batch_loss * (len(batch) / group_size)
+                        with phase_timer.phase("backward"):
+                            loss.backward()
+                    step_loss += loss.item()
+
+                with phase_timer.phase("optimizer"):
+                    optimizer.step()
+                    scheduler.step()
+                    optimizer.zero_grad()
+
+                # 数据等待占比：本步阻塞等待预取批次的时间 / 本步总耗时，数据并行时取各进程平均
+                step_wait = prefetcher.wait_seconds - wait_before
+                step_elapsed = time.perf_counter() - step_start
+                wait_fraction = step_wait / step_elapsed if step_elapsed > 0 else 0.0
+                step_examples = group_size
+                if distributed:
+                    totals = torch.tensor(
+                        [step_loss, float(step_real), float(step_padded), wait_fraction, float(step_examples)],
+                        dtype=torch.float64
+                    )
+                    dist.all_reduce(totals)
+                    step_loss = totals[0].item() / world_size
+                    step_real, step_padded = int(totals[1].item()), int(totals[2].item())
+                    wait_fraction = totals[3].item() / world_size
+                    step_examples = int(totals[4].item())
+                padding.real_tokens += step_real
+                padding.padded_tokens += step_padded
+                tokens += step_real
+                examples += step_examples
+                data_wait += step_wait
+                step_time += step_elapsed
+                phase_timer.end_step(step_elapsed)
+                if torch_profiler is not None:
+                    torch_profiler.step()
+
+                step += 1
+                epoch_loss += step_loss
+                epoch_steps += 1
+                if is_main:
+                    elapsed = time.perf_counter() - start_time
+                    callbacks.on_step(step, total_steps, {
+                        "loss": step_loss,
+                        "learning_rate": scheduler.get_last_lr()[0],
+                        "padding_efficiency": padding.efficiency,
+                        "tokens_per_sec": tokens / elapsed if elapsed > 0 else 0.0,
+                        "examples_per_sec": examples / elapsed if elapsed > 0 else 0.0,
+                        "data_wait_fraction": wait_fraction,
+                    })
+
+                if validation[0] and config.eval_steps and step % config.eval_steps == 0 and run_evaluation():
+                    stopped_step = step
+                    break
+
+        train_loss = epoch_loss / max(epoch_steps, 1)
+        # 按步评估刚好落在轮末时不重复评估
+        if validation[0] and stopped_step is None and last_eval_step != step and run_evaluation():
+            stopped_step = step
+        if stopped_step is not None:
+            if is_main:
+                callbacks.log(
+                    f"验证集指标连续{config.early_stopping_patience}次评估没有改进，在第{step}步提前停止，"
+                    f"最优为第{early_stopping.best_step}步"
+                )
+            break
+
+        proceed = True
+        if is_main:
+            callbacks.log(f"第{epoch + 1}/{config.epochs}轮完成, train_loss={train_loss:.4f}")
+            proceed = callbacks.on_epoch_end(epoch + 1, {"train_loss": train_loss, **last_eval})
+        if distributed:
+            # 由rank 0的回调决定是否继续，广播给所有进程
+            flag = torch.tensor([1 if proceed else 0])
+            dist.broadcast(flag, src=0)
+            proceed = bool(flag.item())
+        if not proceed:
+            return {"stopped": True, "metrics": summary()}
+
+    if is_main and not best_saved:
+        _save(unwrapped, tokenizer, config, optimizer)
+    metrics = summary()
+    if distill and is_main:
+        metrics.update(_student_stats(unwrapped, tokenizer, texts, config, teacher_stats))
+        callbacks.log(
+            f"学生模型: 单条延迟{metrics['latency_ms']}ms, 大小{metrics['model_size_bytes'] / 1024 ** 2:.1f}MB"
+        )
+    return {
+        "stopped": False,
+        "output_dir": config.output_dir,
+        "artifact_type": artifact_type,
+        "metrics": metrics,
+    }
+
+
+def _load_token_arrays(
+    config: TrainingConfig,
+    texts: List[str],
+    tokenizer,
+    callbacks: TrainingCallbacks,
+    is_main: bool,
+    distributed: bool
+) -> TokenArrays:
+    """
+    加载预分词的token数组，缓存中没有时由rank 0分词并写入
+
+    缓存按数据集内容、分词器和截断长度区分，同一数据集上的重复训练和超参搜索的各个试验
+    只分词一次。只截断不填充，填充推迟到组批时按批次内最长序列进行。
+
+    Args:
+        config: 训练配置
+        texts: 数据集文本
+        tokenizer: 分词器
+        callbacks: 训练回调
+        is_main: 是否为rank 0
+        distributed: 是否数据并行
+
+    Returns:
+        TokenArrays: 内存映射的token数组，行顺序与texts一致
+    """
+    tokenizer_name = config.init_from or config.base_model
+    directory = os.path.join(
+        config.token_cache_dir, token_cache_key(config.dataset_path, tokenizer_name, config.max_seq_length)
+    )
+    if is_main:
+        if os.path.exists(os.path.join(directory, OFFSETS_FILE)):
+            callbacks.log("复用已缓存的分词结果")
+        else:
+            encodings = tokenizer(texts, truncation=True, max_length=config.max_seq_length)["input_ids"]
+            write_token_arrays(directory, encodings)
+            callbacks.log(f"分词完成，已写入缓存: {directory}")
+    if distributed:
+        # 其他进程等待rank 0写完缓存后再映射
+        dist.barrier()
+    return TokenArrays(directory)
+
+
+def _start_torch_profiler(config: TrainingConfig, trace: Dict[str, Any]):
+    """
+    启动torch.profiler，只采样第profile_start_step步起的profile_steps个优化步
+
+    采样窗口结束时导出Chrome trace并汇总算子耗时到trace中；窗口外不记录，开销可以忽略。
+
+    Args:
+        config: 训练配置
+        trace: 接收算子汇总和实际采样窗口的字典
+
+    Returns:
+        torch.profiler.profile: 已启动的分析器，每个优化步后调用step()
+    """
+    window = profile_window(config.profile_start_step, config.profile_steps)
+
+    def on_trace_ready(profiler):
+        os.makedirs(config.profile_dir, exist_ok=True)
+        profiler.export_chrome_trace(os.path.join(config.profile_dir, PROFILE_TRACE_NAME))
+        events = profiler.key_averages()
+        trace["operators"] = summarize_operators(events)
+        trace["table"] = events.table(sort_by="self_cpu_time_total", row_limit=20)
+
+    profiler = torch.profiler.profile(
+        activities=[torch.profiler.ProfilerActivity.CPU],
+        schedule=torch.profiler.schedule(**window, repeat=1),
+        on_trace_ready=on_trace_ready,
+        record_shapes=True,
+    )
+    profiler.start()
+    return profiler
+
+
+def _write_profile_report(config: TrainingConfig, profiler, timer: PhaseTimer, trace: Dict[str, Any], step: int):
+    """
+    停止分析器并将性能分析报告写入config.profile_dir
+
+    训练在采样窗口结束前停止时，分析器停止时导出已采样的部分。
+
+    Args:
+        config: 训练配置
+        profiler: torch.profiler分析器
+        timer: 分阶段计时器
+        trace: 算子汇总
+        step: 已完成的优化步数
+    """
+    profiler.stop()
+    window = None
+    if step >= config.profile_start_step:
+        window = [config.profile_start_step, min(config.profile_start_step + config.profile_steps - 1, step)]
+    report = build_profile_report(timer, trace.get("operators"), window, trace.get("table"))
+    os.makedirs(config.profile_dir, exist_ok=True)
+    with open(os.path.join(config.profile_dir, PROFILE_SUMMARY_NAME), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def _autotune_batch_size(
+    model,
+    lengths: List[int],
+    config: TrainingConfig,
+    use_bf16: bool,
+    callbacks: TrainingCallbacks,
+    is_main: bool
+) -> int:
+    """
+    试跑递增的批次大小，选择吞吐量最高的一个
+
+    每个批次大小分别在数据集的中位长度（代表吞吐量）和最长长度（代表峰值内存）下
+    计时前向和反向传播，预计内存超出预算或试跑失败时停止增大。试跑不执行优化器更新，
+    不会改变模型权重；使用未经DDP包装的模型，数据并行时各进程的试跑之间没有集合通信，
+    不会因为各自停止的位置不同而挂起。
+
+    Args:
+        model: 未经DDP包装的模型
+        lengths: 训练集各样本的token长度
+        config: 训练配置
+        use_bf16: 是否使用bf16自动混合精度
+        callbacks: 训练回调
+        is_main: 是否为rank 0
+
+    Returns:
+        int: 选中的批次大小，没有成功的试跑时返回config.batch_size
+    """
+    model_config = model.config.to_dict()
+    profile = ModelProfile.from_config(model_config)
+    sorted_lengths = sorted(lengths)
+    typical = sorted_lengths[len(sorted_lengths) // 2]
+    longest = sorted_lengths[-1]
+    vocab_size = model_config.get("vocab_size", 30522)
+
+    results = []
+    best_throughput = 0.0
+    stale = 0
+    for size in candidate_batch_sizes(config.autotune_max_batch_size):
+        estimated = estimate_peak_memory(
+            profile, size, longest, config.precision, config.method,
+            config.gradient_checkpointing, config.data_parallel_workers
+        )
+        if config.memory_budget_bytes and estimated > config.memory_budget_bytes:
+            break
+
+        ok = True
+        for seq_length in sorted({typical, longest}):
+            try:
+                examples_per_sec = _time_probe(model, size, seq_length, vocab_size, use_bf16)
+            except RuntimeError as e:
+                logger.warning(f"批次大小{size}、序列长度{seq_length}试跑失败: {str(e)}")
+                results.append({"batch_size": size, "seq_length": seq_length, "ok": False})
+                ok = False
+                break
+            results.append({
+                "batch_size": size,
+                "seq_length": seq_length,
+                "examples_per_sec": examples_per_sec,
+                "estimated_memory_bytes": estimated,
+                "ok": True,
+            })
+        if not ok:
+            break
+
+        # 吞吐量连续几次没有提升时，更大的批次只会增加内存占用
+        throughput = next(r["examples_per_sec"] for r in results if r["batch_size"] == size and r["seq_length"] == typical)
+        if throughput > best_throughput:
+            best_throughput = throughput
+            stale = 0
+        else:
+            stale += 1
+            if stale >= PROBE_PATIENCE:
+                break
+
+    model.zero_grad(set_to_none=True)
+    chosen = choose_batch_size(results, typical) or config.batch_size
+    if is_main:
+        callbacks.on_autotune(chosen, results)
+        callbacks.log(f"批次大小自动调优完成: 试跑{len(results)}个配置，选择batch_size={chosen}")
+    return chosen
+
+
+def _time_probe(model, batch_size: int, seq_length: int, vocab_size: int, use_bf16: bool) -> float:
+    """计时给定形状的前向和反向传播，返回样本/秒"""
+    input_ids = torch.randint(0, vocab_size, (batch_size, seq_length))
+    attention_mask = torch.ones_like(input_ids)
+    labels = torch.zeros(batch_size, dtype=torch.long)
+
+    durations = []
+    for probe in range(PROBE_STEPS + 1):
+        begin = time.perf_counter()
+        with torch.autocast("cpu", dtype=torch.bfloat16, enabled=use_bf16):
+            outputs = model(input_ids=input_ids, attention_mask=attention_mask, labels=labels)
+        outputs.loss.float().backward()
+        model.zero_grad(set_to_none=True)
+        # 第一步包含内存分配等一次性开销，不计时
+        if probe > 0:
+            durations.append(time.perf_counter() - begin)
+    durations.sort()
+    return batch_size / durations[len(durations) // 2]
+
+
+def evaluate(
+    model,
+    encodings: List[List[int]],
+    labels: List[int],
+    batch_size: int,
+    pad_id: int,
+    use_bf16: bool = False,
+    rank: int = 0,
+    world_size: int = 1
+) -> Dict[str, float]:
+    """
+    在验证集上评估loss和准确率
+
+    按长度排序后组批以减少填充，在torch.no_grad下前向计算；数据并行时各进程评估一部分样本，
+    再all-reduce汇总，所有进程得到相同的结果。
+
+    Args:
+        model: 未经DDP包装的模型
+        encodings: 验证集token id序列
+        labels: 验证集标签
+        batch_size: 评估批次大小
+        pad_id: 填充token id
+        use_bf16: 是否使用bf16自动混合精度
+        rank: 当前进程序号
+        world_size: 工作进程总数
+
+    Returns:
+        Dict: eval_loss和eval_accuracy
+    """
+    order = sorted(range(len(encodings)), key=lambda i: len(encodings[i]))[rank::world_size]
+    totals = torch.zeros(3, dtype=torch.float64)  # loss之和、正确数、样本数
+    model.eval()
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            input_ids, attention_mask = pad_batch([encodings[i] for i in batch], pad_id)
+            batch_labels = torch.tensor([labels[i] for i in batch])
+            with torch.autocast("cpu", dtype=torch.bfloat16, enabled=use_bf16):
+                outputs = model(
+                    input_ids=torch.tensor(input_ids),
+                    attention_mask=torch.tensor(attention_mask),
+                    labels=batch_labels,
+                )
+            totals[0] += outputs.loss.float().item() * len(batch)
+            totals[1] += (outputs.logits.argmax(dim=-1) == batch_labels).sum().item()
+            totals[2] += len(batch)
+    model.train()
+
+    if world_size > 1:
+        dist.all_reduce(totals)
+    count = max(totals[2].item(), 1)
+    return {"eval_loss": totals[0].item() / count, "eval_accuracy": totals[1].item() / count}
+
+
+def _save(model, tokenizer, config: TrainingConfig, optimizer=None):
+    """保存模型和分词器到config.output_dir，save_optimizer_state为True时一并保存优化器状态"""
+    os.makedirs(config.output_dir, exist_ok=True)
+    # LoRA模式下只保存适配器和分类头权重，另存基座配置以便推理时恢复标签映射
+    model.save_pretrained(config.output_dir)
+    tokenizer.save_pretrained(config.output_dir)
+    if config.method == "lora":
+        model.get_base_model().config.save_pretrained(config.output_dir)
+    if config.save_optimizer_state and optimizer is not None:
+        torch.save(optimizer.state_dict(), os.path.join(config.output_dir, OPTIMIZER_STATE_NAME))
+
+
+def _student_stats(
+    model,
+    tokenizer,
+    texts: List[str],
+    config: TrainingConfig,
+    teacher_stats: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    测量蒸馏得到的学生模型的单条推理延迟和产物大小，并与教师模型对照
+
+    延迟在训练进程中测量，已保存最优检查点时测的是训练结束时的模型，两者结构相同，延迟一致。
+
+    Returns:
+        Dict: latency_ms、model_size_bytes，以及教师的对应值和speedup、compression_ratio
+    """
+    stats = {
+        "latency_ms": measure_latency(model, tokenizer, texts, config.max_seq_length),
+        "model_size_bytes": directory_size(config.output_dir),
+        **teacher_stats,
+    }
+    if teacher_stats.get("teacher_latency_ms") and stats["latency_ms"]:
+        stats["speedup"] = round(teacher_stats["teacher_latency_ms"] / stats["latency_ms"], 2)
+    if teacher_stats.get("teacher_size_bytes") and stats["model_size_bytes"]:
+        stats["compression_ratio"] = round(teacher_stats["teacher_size_bytes"] / stats["model_size_bytes"], 2)
+    return stats
+
+
+def _load_init_model(config: TrainingConfig, label_names: List[str], callbacks: TrainingCallbacks):
+    """
+    从已有训练产物加载模型，用于增量训练
+
+    完整模型产物直接加载；LoRA适配器产物先加载基座模型再叠加适配器，本次仍为LoRA微调时
+    继续训练该适配器（沿用其秩等配置），否则合并权重后做全参数微调。
+
+    Args:
+        config: 训练配置，init_from为产物目录
+        label_names: 本次数据集的标签名称
+        callbacks: 训练回调
+
+    Returns:
+        模型，继续训练适配器时为PeftModel
+
+    Raises:
+        ValueError: 数据集的标签集合与产物不一致
+    """
+    if is_adapter_dir(config.init_from):
+        from peft import PeftModel
+
+        base = AutoModelForSequenceClassification.from_pretrained(
+            config.base_model,
+            config=AutoConfig.from_pretrained(config.init_from),
+        )
+        model = PeftModel.from_pretrained(base, config.init_from, is_trainable=config.method == "lora")
+        if config.method == "lora":
+            callbacks.log("从LoRA适配器产物继续训练，沿用产物的适配器配置")
+        else:
+            model = model.merge_and_unload()
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained(config.init_from)
+
+    # 分类头按产物的标签顺序训练，标签集合不同时无法复用
+    id2label = model.config.id2label
+    init_labels = [id2label[i] for i in range(len(id2label))]
+    if init_labels != label_names:
+        raise ValueError(f"数据集标签{label_names}与初始化模型的标签{init_labels}不一致，无法增量训练")
+    callbacks.log(f"已从训练产物初始化模型权重: {config.init_from}")
+    return model
+
+
+def _load_optimizer_state(optimizer, config: TrainingConfig, callbacks: TrainingCallbacks):
+    """
+    加载初始化产物中保存的优化器状态
+
+    沿用父任务的一阶、二阶矩估计，学习率按本次任务重新设置。产物中没有优化器状态，
+    或可训练参数与保存时不一致（如切换了微调方式）时使用新的优化器。
+
+    Args:
+        optimizer: 已按当前可训练参数创建的优化器
+        config: 训练配置
+        callbacks: 训练回调
+    """
+    path = os.path.join(config.init_from, OPTIMIZER_STATE_NAME)
+    if not os.path.exists(path):
+        callbacks.log("初始化产物中没有保存优化器状态，使用新的优化器")
+        return
+    try:
+        optimizer.load_state_dict(torch.load(path, map_location="cpu"))
+    except ValueError as e:
+        callbacks.log(f"优化器状态与当前可训练参数不匹配，使用新的优化器: {str(e)}")
+        return
+    for group in optimizer.param_groups:
+        # 学习率调度器创建时读取initial_lr，需一并覆盖保存时的值
+        group["lr"] = config.learning_rate
+        group["initial_lr"] = config.learning_rate
+    callbacks.log("已加载初始化产物的优化器状态")
+
+
+def _wrap_lora(model, config: TrainingConfig, callbacks: TrainingCallbacks):
+    """
+    冻结基座模型，注入LoRA低秩适配器
+
+    Args:
+        model: 基座分类模型
+        config: 训练配置
+        callbacks: 训练回调
+
+    Returns:
+        PeftModel: 只有适配器和分类头可训练的模型
+    """
+    from peft import LoraConfig, TaskType, get_peft_model
+
+    lora_config = LoraConfig(
+        task_type=TaskType.SEQ_CLS,
+        r=config.lora_rank,
+        lora_alpha=config.lora_alpha,
+        lora_dropout=config.lora_dropout,
+    )
+    if config.gradient_checkpointing:
+        # 基座参数被冻结后，梯度检查点需要输入嵌入带梯度才能回传到适配器
+        model.enable_input_require_grads()
+    model = get_peft_model(model, lora_config)
+
+    trainable = sum(p.numel() for p in model.parameters() if p.requires_grad)
+    total = sum(p.numel() for p in model.parameters())
+    callbacks.log(f"LoRA微调: 可训练参数{trainable}/{total} ({trainable / total:.2%})")
+    return model
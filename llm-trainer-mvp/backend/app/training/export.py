@@ -0,0 +1,190 @@
+# 模型导出
+# 将训练产物导出为ONNX（动态批次和序列长度）和TorchScript，在样本批次上校验与原模型的数值一致性并测量推理延迟；
+# 模块本身不依赖torch，导出时才导入
+
+import os
+import time
+from typing import List, Dict, Any, Callable
+
+import numpy as np
+
+EXPORT_FORMATS = ("onnx", "torchscript")
+# 各导出格式的模型文件名，分词器和模型配置（标签名称）一并保存在同一目录
+EXPORT_FILES = {"onnx": "model.onnx", "torchscript": "model.pt"}
+ONNX_OPSET = 14
+# 导出结果与原模型logits的最大允许绝对误差
+PARITY_TOLERANCE = 1e-3
+# 校验一致性的样本批次大小；导出时只用其中两条，校验批次的形状与导出时不同，可以发现被固定的维度
+SAMPLE_BATCH_SIZE = 8
+# 测量单条推理延迟的预热和计时次数
+BENCHMARK_WARMUP_RUNS = 3
+BENCHMARK_RUNS = 20
+
+
+def parity_report(reference: np.ndarray, candidate: np.ndarray, tolerance: float = PARITY_TOLERANCE) -> Dict[str, Any]:
+    """
+    比较导出模型与原模型的logits
+
+    Args:
+        reference: 原模型logits
+        candidate: 导出模型logits
+        tolerance: 最大允许绝对误差
+
+    Returns:
+        Dict: max_abs_diff、预测类别一致的比例prediction_agreement，以及是否通过passed
+    """
+    if reference.shape != candidate.shape:
+        return {"max_abs_diff": None, "prediction_agreement": 0.0, "passed": False}
+    max_abs_diff = float(np.abs(reference - candidate).max()) if reference.size else 0.0
+    agreement = float((reference.argmax(axis=-1) == candidate.argmax(axis=-1)).mean()) if reference.size else 1.0
+    return {
+        "max_abs_diff": round(max_abs_diff, 8),
+        "prediction_agreement": round(agreement, 4),
+        "passed": max_abs_diff <= tolerance,
+    }
+
+
+def benchmark(run: Callable[[Dict[str, np.ndarray]], object], samples: List[Dict[str, np.ndarray]]) -> Dict[str, float]:
+    """
+    测量单条样本推理的延迟
+
+    Args:
+        run: 推理函数，参数为input_ids和attention_mask组成的字典
+        samples: 单条样本输入，循环取用；前BENCHMARK_WARMUP_RUNS次不计时
+
+    Returns:
+        Dict: p50_ms、p90_ms和mean_ms
+    """
+    timings = []
+    for index in range(BENCHMARK_WARMUP_RUNS + BENCHMARK_RUNS):
+        inputs = samples[index % len(samples)]
+        start = time.perf_counter()
+        run(inputs)
+        if index >= BENCHMARK_WARMUP_RUNS:
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p90_ms": round(float(np.percentile(timings, 90)), 3),
+        "mean_ms": round(float(np.mean(timings)), 3),
+    }
+
+
+def export_model(model_dir: str, output_dir: str, fmt: str, sample_texts: List[str], max_seq_length: int) -> Dict[str, Any]:
+    """
+    导出训练产物并校验
+
+    Args:
+        model_dir: 训练产物目录（完整模型或LoRA适配器，适配器合并后导出）
+        output_dir: 导出目录
+        fmt: 导出格式，onnx或torchscript
+        sample_texts: 校验一致性和测量延迟用的样本文本
+        max_seq_length: 截断长度
+
+    Returns:
+        Dict: 导出文件路径file、大小size_bytes、一致性校验parity和延迟latency（原模型与导出模型的p50及加速比）
+
+    Raises:
+        ValueError: 导出结果与原模型数值不一致
+    """
+    import torch
+    from .inference import load_for_inference
+
+    model, tokenizer = load_for_inference(model_dir)
+    module = logits_module(model)
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, EXPORT_FILES[fmt])
+
+    texts = sample_texts[:SAMPLE_BATCH_SIZE]
+    example = tokenizer(texts[:2], truncation=True, max_length=max_seq_length, padding=True, return_tensors="pt")
+    example_args = (example["input_ids"], example["attention_mask"])
+    with torch.no_grad():
+        if fmt == "onnx":
+            axes = {0: "batch", 1: "sequence"}
+            torch.onnx.export(
+                module, example_args, path,
+                input_names=["input_ids", "attention_mask"], output_names=["logits"],
+                dynamic_axes={"input_ids": axes, "attention_mask": axes, "logits": {0: "batch"}},
+                opset_version=ONNX_OPSET,
+            )
+        else:
+            torch.jit.save(torch.jit.trace(module, example_args), path)
+    run = exported_runner(path, fmt)
+
+    def reference(inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        with torch.no_grad():
+            return module(torch.from_numpy(inputs["input_ids"]), torch.from_numpy(inputs["attention_mask"])).numpy()
+
+    batch = encode_batch(tokenizer, texts, max_seq_length)
+    parity = parity_report(reference(batch), run(batch))
+    if not parity["passed"]:
+        raise ValueError(f"{fmt}导出结果与原模型不一致，最大误差{parity['max_abs_diff']}")
+
+    # 分词器和模型配置与导出文件放在一起，推理时从中读取标签名称
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+
+    samples = split_examples(batch)
+    reference_latency = benchmark(reference, samples)
+    exported_latency = benchmark(run, samples)
+    return {
+        "format": fmt,
+        "file": path,
+        "size_bytes": os.path.getsize(path),
+        "parity": parity,
+        "latency": {
+            "reference_p50_ms": reference_latency["p50_ms"],
+            "exported_p50_ms": exported_latency["p50_ms"],
+            "exported_p90_ms": exported_latency["p90_ms"],
+            "speedup": round(reference_latency["p50_ms"] / exported_latency["p50_ms"], 3)
+            if exported_latency["p50_ms"] else None,
+        },
+    }
+
+
+def encode_batch(tokenizer, texts: List[str], max_seq_length: int) -> Dict[str, np.ndarray]:
+    """分词并填充为int64的input_ids和attention_mask数组"""
+    batch = tokenizer(texts, truncation=True, max_length=max_seq_length, padding=True, return_tensors="np")
+    return {name: batch[name].astype(np.int64) for name in ("input_ids", "attention_mask")}
+
+
+def split_examples(batch: Dict[str, np.ndarray]) -> List[Dict[str, np.ndarray]]:
+    """将批次拆分为去掉填充的单条样本，用于测量单条推理延迟"""
+    return [
+        {name: batch[name][i:i + 1, :int(batch["attention_mask"][i].sum())] for name in batch}
+        for i in range(len(batch["input_ids"]))
+    ]
+
+
+def logits_module(model):
+    """包装分类模型，只接收input_ids和attention_mask并返回logits张量，便于追踪导出"""
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    return LogitsOnly(model).eval()
+
+
+def exported_runner(path: str, fmt: str) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+    """加载导出文件，返回输入numpy数组、输出logits的推理函数"""
+    if fmt == "onnx":
+        import onnxruntime
+
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        return lambda inputs: session.run(["logits"], inputs)[0]
+
+    import torch
+
+    module = torch.jit.load(path)
+    module.eval()
+
+    def run(inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        with torch.no_grad():
+            return module(torch.from_numpy(inputs["input_ids"]), torch.from_numpy(inputs["attention_mask"])).numpy()
+
+    return run
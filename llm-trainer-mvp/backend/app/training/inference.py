@@ -0,0 +1,87 @@
+# 推理模型加载与评估
+# 根据训练产物类型加载完整模型，或将LoRA适配器叠加到基座模型上；并在数据集上评估训练产物
+
+import os
+from typing import Tuple, Dict, Any
+
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+
+# peft保存适配器时写入的配置文件名
+ADAPTER_CONFIG_NAME = "adapter_config.json"
+# 随模型保存的优化器状态文件名，只用于增量训练，推理时不加载
+OPTIMIZER_STATE_NAME = "optimizer.pt"
+
+
+def is_adapter_dir(model_dir: str) -> bool:
+    """判断目录中是否为LoRA适配器产物"""
+    return os.path.exists(os.path.join(model_dir, ADAPTER_CONFIG_NAME))
+
+
+def load_for_inference(model_dir: str) -> Tuple[object, object]:
+    """
+    加载训练产物用于推理
+
+    LoRA产物只包含适配器权重，先按保存的配置加载基座模型，再叠加适配器并合并权重，
+    合并后推理不再有额外开销。
+
+    Args:
+        model_dir: 训练产物目录
+
+    Returns:
+        Tuple: (model, tokenizer)，模型已切换到eval模式
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    if is_adapter_dir(model_dir):
+        from peft import PeftConfig, PeftModel
+
+        peft_config = PeftConfig.from_pretrained(model_dir)
+        base = AutoModelForSequenceClassification.from_pretrained(
+            peft_config.base_model_name_or_path,
+            config=AutoConfig.from_pretrained(model_dir),
+        )
+        model = PeftModel.from_pretrained(base, model_dir).merge_and_unload()
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+
+    model.eval()
+    return model, tokenizer
+
+
+def evaluate_classifier(model_dir: str, dataset_path: str, max_seq_length: int = 128, batch_size: int = 32) -> Dict[str, Any]:
+    """
+    在数据集上评估训练产物的准确率
+
+    Args:
+        model_dir: 训练产物目录
+        dataset_path: CSV数据集路径，必须包含text和label列
+        max_seq_length: 最大序列长度
+        batch_size: 评估批次大小
+
+    Returns:
+        Dict: accuracy、samples，以及模型标签集合之外而被跳过的样本数skipped
+    """
+    import torch
+    from .data import load_text_classification_csv
+
+    model, tokenizer = load_for_inference(model_dir)
+    texts, labels, label_names = load_text_classification_csv(dataset_path)
+    label2id = model.config.label2id
+    pairs = [(text, label2id[label_names[label]]) for text, label in zip(texts, labels) if label_names[label] in label2id]
+
+    correct = 0
+    with torch.no_grad():
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            inputs = tokenizer(
+                [text for text, _ in batch], truncation=True, max_length=max_seq_length,
+                padding=True, return_tensors="pt"
+            )
+            predictions = model(**inputs).logits.argmax(dim=-1).tolist()
+            correct += sum(int(p == label) for p, (_, label) in zip(predictions, batch))
+
+    return {
+        "accuracy": correct / len(pairs) if pairs else None,
+        "samples": len(pairs),
+        "skipped": len(texts) - len(pairs),
+    }
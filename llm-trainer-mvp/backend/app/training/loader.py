@@ -0,0 +1,202 @@
+# 训练数据加载
+# 预分词结果保存为内存映射的token数组，后台线程提前组装批次，训练循环只等待已就绪的批次；不依赖torch
+
+import os
+import uuid
+import time
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Sequence, Iterator, Callable, Tuple, Optional
+
+import numpy as np
+
+# token数组文件名：所有样本的token id首尾相接存放，offsets记录每个样本的起止位置
+TOKENS_FILE = "tokens.bin"
+OFFSETS_FILE = "offsets.npy"
+TOKEN_DTYPE = np.int32
+
+
+def token_cache_key(dataset_path: str, tokenizer_name: str, max_seq_length: int) -> str:
+    """
+    计算预分词缓存的键
+
+    数据集按文件内容计算哈希，文件被覆盖后不会命中旧缓存。
+
+    Args:
+        dataset_path: 数据集文件路径
+        tokenizer_name: 分词器名称或路径
+        max_seq_length: 截断长度
+
+    Returns:
+        str: sha256十六进制字符串
+    """
+    digest = hashlib.sha256()
+    with open(dataset_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    digest.update(f"|{tokenizer_name}|{max_seq_length}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def write_token_arrays(directory: str, encodings: Sequence[Sequence[int]]):
+    """
+    将分词结果写入token数组目录
+
+    先写入同级临时目录再重命名，并发写入同一缓存时只有一个生效，读取方不会看到写了一半的文件。
+
+    Args:
+        directory: 目标目录
+        encodings: 每个样本的token id序列
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = os.path.join(parent, f".{os.path.basename(directory)}.{uuid.uuid4().hex}")
+    os.makedirs(staging)
+    try:
+        offsets = np.zeros(len(encodings) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(ids) for ids in encodings])
+        tokens = np.memmap(
+            os.path.join(staging, TOKENS_FILE), dtype=TOKEN_DTYPE, mode="w+", shape=(max(int(offsets[-1]), 1),)
+        )
+        for i, ids in enumerate(encodings):
+            tokens[offsets[i]:offsets[i + 1]] = ids
+        tokens.flush()
+        del tokens
+        np.save(os.path.join(staging, OFFSETS_FILE), offsets)
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # 其他任务已写入相同内容的缓存
+            if not os.path.exists(os.path.join(directory, OFFSETS_FILE)):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+class TokenArrays:
+    """内存映射的预分词数据
+
+    以只读方式映射token数组，数据并行的多个进程共享同一份页缓存，不必各自持有分词结果。
+    """
+
+    def __init__(self, directory: str):
+        self.offsets = np.load(os.path.join(directory, OFFSETS_FILE))
+        self.tokens = np.memmap(os.path.join(directory, TOKENS_FILE), dtype=TOKEN_DTYPE, mode="r")
+        self.lengths = np.diff(self.offsets)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    def gather(
+        self,
+        indices: Sequence[int],
+        pad_id: int,
+        input_ids: Optional[np.ndarray] = None,
+        attention_mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        组装一个批次并动态填充到批次内最长序列的长度
+
+        Args:
+            indices: 样本索引
+            pad_id: 填充token id
+            input_ids: 可复用的一维缓冲区，容量不小于批次样本数乘以最长序列长度
+            attention_mask: 同上，用于attention_mask
+
+        Returns:
+            Tuple: (input_ids, attention_mask)，形状为(样本数, 批内最长长度)的连续数组
+        """
+        lengths = self.lengths[indices]
+        shape = (len(indices), int(lengths.max()))
+        size = shape[0] * shape[1]
+        if input_ids is None or input_ids.size < size:
+            input_ids = np.empty(size, dtype=np.int64)
+            attention_mask = np.empty(size, dtype=np.int64)
+        # 取缓冲区前size个元素再reshape，得到连续的视图
+        ids = input_ids[:size].reshape(shape)
+        mask = attention_mask[:size].reshape(shape)
+        ids.fill(pad_id)
+        mask.fill(0)
+        for row, (index, length) in enumerate(zip(indices, lengths)):
+            ids[row, :length] = self[index]
+            mask[row, :length] = 1
+        return ids, mask
+
+
+class BatchPrefetcher:
+    """批次预取器
+
+    后台线程池按顺序提前组装prefetch个批次，训练循环取批次时通常已就绪。批次组装到
+    prefetch + 1个预分配的缓冲区中循环复用：取第k个批次时提交第k + prefetch个，
+    它复用的是训练循环已用完的第k - 1个批次的缓冲区，因此不会覆盖正在使用的数据。
+
+    wait_seconds累计训练循环阻塞等待批次的时间，用于计算数据等待占比。
+    """
+
+    def __init__(
+        self,
+        batches: Sequence[List[int]],
+        assemble: Callable[[List[int], int], object],
+        num_workers: int = 2,
+        prefetch: int = 4
+    ):
+        """
+        Args:
+            batches: 一轮的批次样本索引
+            assemble: 组装函数，参数为批次样本索引和缓冲区槽位号
+            num_workers: 组装线程数，为0时在训练循环线程中同步组装
+            prefetch: 提前组装的批次数
+        """
+        self.batches = batches
+        self.assemble = assemble
+        self.num_workers = num_workers
+        self.prefetch = max(prefetch, 1)
+        self.slots = self.prefetch + 1
+        self.wait_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self.batches)
+
+    def __iter__(self) -> Iterator[object]:
+        if self.num_workers <= 0:
+            for position, batch in enumerate(self.batches):
+                start = time.perf_counter()
+                result = self.assemble(batch, position % self.slots)
+                self.wait_seconds += time.perf_counter() - start
+                yield result
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="batch-prefetch")
+        futures = {}
+        try:
+            for position in range(min(self.prefetch, len(self.batches))):
+                futures[position] = executor.submit(self.assemble, self.batches[position], position % self.slots)
+            for position in range(len(self.batches)):
+                ahead = position + self.prefetch
+                if ahead < len(self.batches):
+                    futures[ahead] = executor.submit(self.assemble, self.batches[ahead], ahead % self.slots)
+                start = time.perf_counter()
+                result = futures.pop(position).result()
+                self.wait_seconds += time.perf_counter() - start
+                yield result
+        finally:
+            # 提前退出（停止训练、提前停止）时不再组装剩余批次
+            for future in futures.values():
+                future.cancel()
+            executor.shutdown(wait=True)
+
+
+class BatchBuffers:
+    """预分配的批次缓冲区，按槽位复用，避免每个批次重新分配内存"""
+
+    def __init__(self, slots: int, batch_size: int, max_seq_length: int):
+        capacity = batch_size * max_seq_length
+        self.input_ids = [np.empty(capacity, dtype=np.int64) for _ in range(slots)]
+        self.attention_mask = [np.empty(capacity, dtype=np.int64) for _ in range(slots)]
+
+    def gather(self, arrays: TokenArrays, indices: Sequence[int], pad_id: int, slot: int) -> Tuple[np.ndarray, np.ndarray]:
+        return arrays.gather(indices, pad_id, self.input_ids[slot], self.attention_mask[slot])
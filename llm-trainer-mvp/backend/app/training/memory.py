@@ -0,0 +1,130 @@
+# 训练内存估算
+# 根据模型规模、序列长度、批次大小和精度估算训练进程的峰值常驻内存，用于准入控制，不依赖torch
+
+import os
+import json
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 每个训练进程的固定开销（Python解释器、torch/transformers运行时、分词器等）
+PROCESS_OVERHEAD_BYTES = 600 * 1024 ** 2
+# LoRA可训练参数占比的保守估计（适配器+分类头）
+LORA_TRAINABLE_FRACTION = 0.02
+
+
+@dataclass
+class ModelProfile:
+    """估算所需的模型结构参数"""
+    hidden_size: int = 768
+    num_layers: int = 12
+    num_heads: int = 12
+    vocab_size: int = 30522
+    max_positions: int = 512
+
+    @property
+    def param_count(self) -> int:
+        """参数量：嵌入层加每层约12h²（注意力4h²，前馈8h²）"""
+        h = self.hidden_size
+        return (self.vocab_size + self.max_positions) * h + self.num_layers * (12 * h * h + 13 * h)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ModelProfile":
+        """从Transformers模型配置字典构造"""
+        return cls(
+            hidden_size=config.get("hidden_size", 768),
+            num_layers=config.get("num_hidden_layers", 12),
+            num_heads=config.get("num_attention_heads", 12),
+            vocab_size=config.get("vocab_size", 30522),
+            max_positions=config.get("max_position_embeddings", 512),
+        )
+
+
+def load_model_profile(base_model: str) -> ModelProfile:
+    """
+    读取基座模型的结构参数
+
+    只读取本地目录或本地缓存中的config.json，读取不到时按bert-base规模估算，
+    避免在请求处理中访问网络。
+
+    Args:
+        base_model: 基座模型名称或本地路径
+
+    Returns:
+        ModelProfile: 模型结构参数
+    """
+    config = None
+    config_path = os.path.join(base_model, "config.json")
+    try:
+        if os.path.exists(config_path):
+            with open(config_path, encoding="utf-8") as f:
+                config = json.load(f)
+        else:
+            from transformers import AutoConfig
+            config = AutoConfig.from_pretrained(base_model, local_files_only=True).to_dict()
+    except Exception as e:
+        logger.debug(f"读取模型配置失败，按默认规模估算内存: {str(e)}")
+
+    if not config:
+        return ModelProfile()
+    return ModelProfile.from_config(config)
+
+
+def estimate_peak_memory(
+    profile: ModelProfile,
+    batch_size: int,
+    max_seq_length: int,
+    precision: str = "fp32",
+    method: str = "full",
+    gradient_checkpointing: bool = False,
+    data_parallel_workers: int = 1
+) -> int:
+    """
+    估算训练任务所有进程合计的峰值常驻内存
+
+    - 权重按fp32保存；全参数微调另有梯度和AdamW两份状态，共16字节/参数；
+      LoRA只有少量参数需要梯度和优化器状态
+    - 激活值按每层约17·b·s·h个元素加注意力矩阵2.5·a·b·s²个元素估算（即16位下34·b·s·h
+      加5·a·b·s²字节），bf16自动混合精度下元素按2字节计；梯度检查点只保留每层输入和一层的完整激活
+    - 梯度累积不影响峰值，数据并行时每个进程各持有一份模型和自己的激活值
+
+    Args:
+        profile: 模型结构参数
+        batch_size: 微批次大小
+        max_seq_length: 最大序列长度（动态填充下的最坏情况）
+        precision: fp32/bf16
+        method: full/lora
+        gradient_checkpointing: 是否启用梯度检查点
+        data_parallel_workers: 数据并行进程数
+
+    Returns:
+        int: 预计峰值内存（字节）
+    """
+    params = profile.param_count
+    if method == "lora":
+        trainable = int(params * LORA_TRAINABLE_FRACTION)
+        state_bytes = params * 4 + trainable * 12
+    else:
+        state_bytes = params * 16
+
+    element_bytes = 2 if precision == "bf16" else 4
+    b, s, h = batch_size, max_seq_length, profile.hidden_size
+    per_layer = (34 * b * s * h + 5 * profile.num_heads * b * s * s) // 2
+    if gradient_checkpointing:
+        activation_elements = profile.num_layers * b * s * h + per_layer
+    else:
+        activation_elements = profile.num_layers * per_layer
+    activation_bytes = activation_elements * element_bytes
+
+    per_process = PROCESS_OVERHEAD_BYTES + state_bytes + activation_bytes
+    return per_process * data_parallel_workers
+
+
+def host_memory_bytes() -> Optional[int]:
+    """本机物理内存总量，无法获取时返回None"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
@@ -0,0 +1,139 @@
+# 训练性能分析
+# 按阶段（取数据、前向、反向、优化器）累计每个优化步的耗时，生成分阶段耗时汇总；不依赖torch
+
+import time
+import contextlib
+from typing import Dict, Any, List, Optional
+
+# 分析报告文件名
+PROFILE_SUMMARY_NAME = "summary.json"
+PROFILE_TRACE_NAME = "trace.json"
+# 优化步内依次经历的阶段；数据并行时梯度all-reduce发生在反向传播中，计入backward
+PHASES = ("data", "forward", "backward", "optimizer")
+
+
+class PhaseTimer:
+    """分阶段计时器
+
+    disabled时phase返回空上下文，训练循环不必区分是否开启性能分析。
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.totals = {phase: 0.0 for phase in PHASES}
+        self.step_seconds = 0.0
+        self.steps = 0
+
+    def phase(self, name: str):
+        """计时一个阶段，同一步内可多次进入（如梯度累积的多个微批次）"""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._timed(name)
+
+    @contextlib.contextmanager
+    def _timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] += time.perf_counter() - start
+
+    def end_step(self, elapsed: float):
+        """记录一个优化步的总耗时"""
+        if self.enabled:
+            self.steps += 1
+            self.step_seconds += elapsed
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        分阶段耗时汇总
+
+        Returns:
+            List[Dict]: 每个阶段的total_seconds、mean_ms（每步平均）和fraction（占优化步总耗时比例），
+                末尾的other为各阶段之外的耗时（进度回调、指标汇总、停止检查等）
+        """
+        rows = []
+        other = self.step_seconds - sum(self.totals.values())
+        for phase, seconds in list(self.totals.items()) + [("other", max(other, 0.0))]:
+            rows.append({
+                "phase": phase,
+                "total_seconds": round(seconds, 6),
+                "mean_ms": round(seconds / self.steps * 1000, 3) if self.steps else 0.0,
+                "fraction": round(seconds / self.step_seconds, 4) if self.step_seconds else 0.0,
+            })
+        return rows
+
+
+def format_phase_table(rows: List[Dict[str, Any]]) -> str:
+    """将分阶段耗时汇总格式化为文本表格"""
+    lines = [f"{'phase':<10}{'total_s':>12}{'mean_ms':>12}{'fraction':>10}"]
+    for row in rows:
+        lines.append(
+            f"{row['phase']:<10}{row['total_seconds']:>12.3f}{row['mean_ms']:>12.3f}{row['fraction']:>10.1%}"
+        )
+    return "\n".join(lines)
+
+
+def profile_window(start_step: int, steps: int) -> Dict[str, int]:
+    """
+    计算torch.profiler调度参数，使采样窗口恰好覆盖第start_step步起的steps个优化步
+
+    优化步从1开始编号，采样前预热一步（start_step为1时无法预热）。
+
+    Returns:
+        Dict: torch.profiler.schedule的wait、warmup、active参数
+    """
+    warmup = 1 if start_step > 1 else 0
+    return {"wait": start_step - 1 - warmup, "warmup": warmup, "active": steps}
+
+
+def summarize_operators(events, limit: int = 30) -> List[Dict[str, Any]]:
+    """
+    汇总采样窗口内自身CPU耗时最多的算子
+
+    Args:
+        events: torch.profiler的key_averages()结果
+        limit: 返回的算子数
+
+    Returns:
+        List[Dict]: 算子名称、调用次数、自身CPU耗时和总CPU耗时（毫秒）
+    """
+    ranked = sorted(events, key=lambda event: event.self_cpu_time_total, reverse=True)[:limit]
+    return [
+        {
+            "name": event.key,
+            "calls": event.count,
+            "self_cpu_ms": round(event.self_cpu_time_total / 1000, 3),
+            "cpu_total_ms": round(event.cpu_time_total / 1000, 3),
+        }
+        for event in ranked
+    ]
+
+
+def build_profile_report(
+    timer: PhaseTimer,
+    operators: Optional[List[Dict[str, Any]]],
+    window: Optional[List[int]],
+    operator_table: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    组装性能分析报告
+
+    Args:
+        timer: 分阶段计时器
+        operators: 采样窗口内的算子汇总，窗口未开始时为None
+        window: 实际采样的优化步范围[起, 止]，窗口未开始时为None
+        operator_table: torch.profiler生成的算子耗时文本表格
+
+    Returns:
+        Dict: 报告内容，写入summary.json
+    """
+    phases = timer.summary()
+    return {
+        "steps": timer.steps,
+        "phases": phases,
+        "phase_table": format_phase_table(phases),
+        "trace_window": window,
+        "operators": operators or [],
+        "operator_table": operator_table,
+    }
@@ -0,0 +1,112 @@
+# 模型量化
+# 将训练产物的Linear层动态量化为int8（权重int8存储，激活在推理时动态量化），以TorchScript保存；
+# 在验证集上比较量化前后的准确率，并测量延迟和大小；模块本身不依赖torch，量化时才导入
+
+import os
+from typing import List, Dict, Any, Sequence
+
+import numpy as np
+
+from .export import EXPORT_FILES, SAMPLE_BATCH_SIZE, benchmark, encode_batch, split_examples, logits_module, exported_runner
+
+QUANTIZED_FORMAT = "int8"
+# 评估准确率的批次大小
+EVAL_BATCH_SIZE = 32
+
+
+def accuracy_report(reference: Sequence[int], quantized: Sequence[int], labels: Sequence[int]) -> Dict[str, Any]:
+    """
+    比较量化前后模型在验证样本上的预测
+
+    Args:
+        reference: 原模型预测的类别id
+        quantized: 量化模型预测的类别id
+        labels: 真实类别id
+
+    Returns:
+        Dict: 原模型和量化模型的准确率、准确率变化accuracy_delta（量化减原模型）和预测一致的比例agreement
+    """
+    reference, quantized, labels = np.asarray(reference), np.asarray(quantized), np.asarray(labels)
+    if not len(labels):
+        return {"samples": 0, "reference_accuracy": None, "quantized_accuracy": None, "accuracy_delta": None, "agreement": None}
+    reference_accuracy = float((reference == labels).mean())
+    quantized_accuracy = float((quantized == labels).mean())
+    return {
+        "samples": int(len(labels)),
+        "reference_accuracy": round(reference_accuracy, 4),
+        "quantized_accuracy": round(quantized_accuracy, 4),
+        "accuracy_delta": round(quantized_accuracy - reference_accuracy, 4),
+        "agreement": round(float((reference == quantized).mean()), 4),
+    }
+
+
+def quantize_model(
+    model_dir: str,
+    output_dir: str,
+    texts: List[str],
+    label_names: List[str],
+    max_seq_length: int
+) -> Dict[str, Any]:
+    """
+    生成int8动态量化变体
+
+    Args:
+        model_dir: 训练产物目录（完整模型或LoRA适配器，适配器合并后量化）
+        output_dir: 输出目录，保存TorchScript模型、分词器和模型配置
+        texts: 验证样本文本
+        label_names: 验证样本的真实标签名称，模型标签集合之外的样本不参与评估
+        max_seq_length: 截断长度
+
+    Returns:
+        Dict: 文件路径file、大小size_bytes和原模型fp32权重大小、验证集准确率对比accuracy、延迟latency
+    """
+    import torch
+    from .inference import load_for_inference
+
+    model, tokenizer = load_for_inference(model_dir)
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    reference_module, quantized_module = logits_module(model), logits_module(quantized)
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, EXPORT_FILES["torchscript"])
+    example = encode_batch(tokenizer, texts[:2], max_seq_length)
+    with torch.no_grad():
+        traced = torch.jit.trace(
+            quantized_module, (torch.from_numpy(example["input_ids"]), torch.from_numpy(example["attention_mask"]))
+        )
+    torch.jit.save(traced, path)
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+    run = exported_runner(path, "torchscript")
+
+    def reference(inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        with torch.no_grad():
+            return reference_module(
+                torch.from_numpy(inputs["input_ids"]), torch.from_numpy(inputs["attention_mask"])
+            ).numpy()
+
+    label2id = model.config.label2id
+    pairs = [(text, label2id[name]) for text, name in zip(texts, label_names) if name in label2id]
+    reference_predictions, quantized_predictions = [], []
+    for start in range(0, len(pairs), EVAL_BATCH_SIZE):
+        batch = encode_batch(tokenizer, [text for text, _ in pairs[start:start + EVAL_BATCH_SIZE]], max_seq_length)
+        reference_predictions.extend(reference(batch).argmax(axis=-1).tolist())
+        quantized_predictions.extend(run(batch).argmax(axis=-1).tolist())
+
+    samples = split_examples(encode_batch(tokenizer, texts[:SAMPLE_BATCH_SIZE], max_seq_length))
+    reference_latency = benchmark(reference, samples)
+    quantized_latency = benchmark(run, samples)
+    return {
+        "format": QUANTIZED_FORMAT,
+        "file": path,
+        "size_bytes": os.path.getsize(path),
+        "reference_size_bytes": sum(t.numel() * t.element_size() for t in model.state_dict().values()),
+        "accuracy": accuracy_report(reference_predictions, quantized_predictions, [label for _, label in pairs]),
+        "latency": {
+            "reference_p50_ms": reference_latency["p50_ms"],
+            "exported_p50_ms": quantized_latency["p50_ms"],
+            "exported_p90_ms": quantized_latency["p90_ms"],
+            "speedup": round(reference_latency["p50_ms"] / quantized_latency["p50_ms"], 3)
+            if quantized_latency["p50_ms"] else None,
+        },
+    }
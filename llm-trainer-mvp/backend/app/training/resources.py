@@ -0,0 +1,100 @@
+# 训练资源用量统计
+# 父进程定期从/proc采样训练工作进程的CPU时间、常驻内存和磁盘读写字节数，汇总为任务级资源用量；不依赖torch
+
+import os
+import time
+from typing import List, Dict, Any, Optional
+
+# 每秒时钟滴答数，/proc/<pid>/stat中的CPU时间以此为单位
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def read_process_usage(pid: int, proc_root: str = "/proc") -> Optional[Dict[str, float]]:
+    """
+    读取进程的累计资源用量
+
+    Args:
+        pid: 进程ID
+        proc_root: proc文件系统挂载点
+
+    Returns:
+        Optional[Dict]: cpu_seconds（用户态加内核态）、rss_bytes、read_bytes和write_bytes（实际落盘的字节数），
+            进程已退出或不支持/proc时为None
+    """
+    base = os.path.join(proc_root, str(pid))
+    try:
+        with open(os.path.join(base, "stat")) as f:
+            # 进程名可能包含空格，从最后一个右括号之后开始按字段切分；utime、stime为第14、15个字段
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(os.path.join(base, "statm")) as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    usage = {
+        "cpu_seconds": (int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+        "rss_bytes": resident_pages * PAGE_SIZE,
+        "read_bytes": 0,
+        "write_bytes": 0,
+    }
+    try:
+        with open(os.path.join(base, "io")) as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("read_bytes", "write_bytes"):
+                    usage[name] = int(value)
+    except OSError:
+        # 部分容器环境不允许读取io统计
+        pass
+    return usage
+
+
+class ResourceSampler:
+    """训练工作进程的资源用量采样器
+
+    CPU时间和读写字节数是累计值，每个进程保留最后一次采样的值，进程退出后仍计入汇总；
+    常驻内存按每次采样时所有进程之和计算峰值和平均值。
+    """
+
+    def __init__(self, proc_root: str = "/proc"):
+        self.proc_root = proc_root
+        self.started = time.monotonic()
+        self.samples = 0
+        self.peak_rss_bytes = 0
+        self._rss_total = 0
+        self._last: Dict[int, Dict[str, float]] = {}
+
+    def sample(self, pids: List[int]):
+        """采样一次各进程的资源用量"""
+        rss = 0
+        for pid in pids:
+            usage = read_process_usage(pid, self.proc_root)
+            if usage is None:
+                continue
+            self._last[pid] = usage
+            rss += usage["rss_bytes"]
+        if rss:
+            self.samples += 1
+            self._rss_total += rss
+            self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+
+    def summary(self, examples_per_sec: Optional[float] = None) -> Dict[str, Any]:
+        """
+        截至目前的资源用量
+
+        Args:
+            examples_per_sec: 训练引擎统计的每秒训练样本数
+
+        Returns:
+            Dict: cpu_seconds、peak_rss_bytes、avg_rss_bytes、read_bytes、write_bytes、wall_seconds和examples_per_sec
+        """
+        return {
+            "cpu_seconds": round(sum(u["cpu_seconds"] for u in self._last.values()), 3),
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "avg_rss_bytes": self._rss_total // self.samples if self.samples else 0,
+            "read_bytes": int(sum(u["read_bytes"] for u in self._last.values())),
+            "write_bytes": int(sum(u["write_bytes"] for u in self._last.values())),
+            "wall_seconds": round(time.monotonic() - self.started, 3),
+            "examples_per_sec": examples_per_sec,
+        }
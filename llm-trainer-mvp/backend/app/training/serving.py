@@ -0,0 +1,98 @@
+# 在线推理模型
+# 加载训练产物或其导出、量化变体，对一批文本输出预测类别和置信度；模块本身不依赖torch，加载时才导入
+
+import os
+from typing import List, Dict, Tuple, Callable
+
+import numpy as np
+
+from .export import EXPORT_FILES, encode_batch, logits_module, exported_runner
+from .quantize import QUANTIZED_FORMAT
+
+# 没有训练任务配置时（如默认预训练模型）的截断长度
+DEFAULT_MAX_SEQ_LENGTH = 128
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """按最后一维计算softmax概率"""
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+class Predictor:
+    """已加载的推理模型
+
+    Attributes:
+        size_bytes: 模型常驻内存的估计字节数，完整模型按权重张量计算，导出变体按导出文件大小计算
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        run: Callable[[Dict[str, np.ndarray]], np.ndarray],
+        id2label: Dict[int, str],
+        max_seq_length: int,
+        size_bytes: int
+    ):
+        self.tokenizer = tokenizer
+        self.run = run
+        self.id2label = id2label
+        self.max_seq_length = max_seq_length
+        self.size_bytes = size_bytes
+
+    def predict(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """
+        批量预测
+
+        Args:
+            texts: 输入文本，按批次中最长的文本填充
+
+        Returns:
+            List[Tuple]: 每条文本的(预测类别, 置信度)
+        """
+        probabilities = softmax(self.run(encode_batch(self.tokenizer, texts, self.max_seq_length)))
+        indices = probabilities.argmax(axis=-1)
+        return [
+            (self.id2label[int(index)], float(row[index]))
+            for index, row in zip(indices, probabilities)
+        ]
+
+
+def load_predictor(model_path: str, artifact_type: str, max_seq_length: int = DEFAULT_MAX_SEQ_LENGTH) -> Predictor:
+    """
+    加载推理模型
+
+    Args:
+        model_path: 产物目录，或默认预训练模型的名称
+        artifact_type: 产物类型，full/lora_adapter按训练产物加载，onnx/torchscript/int8加载导出文件
+        max_seq_length: 截断长度
+
+    Returns:
+        Predictor: 推理模型
+    """
+    if artifact_type in EXPORT_FILES or artifact_type == QUANTIZED_FORMAT:
+        from transformers import AutoConfig, AutoTokenizer
+
+        # int8变体以TorchScript保存
+        fmt = "onnx" if artifact_type == "onnx" else "torchscript"
+        path = os.path.join(model_path, EXPORT_FILES[fmt])
+        return Predictor(
+            AutoTokenizer.from_pretrained(model_path),
+            exported_runner(path, fmt),
+            AutoConfig.from_pretrained(model_path).id2label,
+            max_seq_length,
+            os.path.getsize(path)
+        )
+
+    import torch
+    from .inference import load_for_inference
+
+    model, tokenizer = load_for_inference(model_path)
+    module = logits_module(model)
+
+    def run(inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        with torch.no_grad():
+            return module(torch.from_numpy(inputs["input_ids"]), torch.from_numpy(inputs["attention_mask"])).numpy()
+
+    size_bytes = sum(t.numel() * t.element_size() for t in model.state_dict().values())
+    return Predictor(tokenizer, run, model.config.id2label, max_seq_length, size_bytes)
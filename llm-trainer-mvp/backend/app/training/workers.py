@@ -0,0 +1,200 @@
+# 训练工作进程
+# 训练在独立的子进程中执行（数据并行时为多个gloo进程），rank 0的进度和指标经队列回传到父进程的训练回调，
+# 停止时先协作取消，超过宽限期仍未退出则终止进程，保证CPU及时释放
+
+import os
+import time
+import queue
+import socket
+import logging
+import multiprocessing
+from typing import Dict, Any, Optional
+
+import torch
+import torch.distributed as dist
+
+from .base import TrainingConfig, TrainingCallbacks
+from .resources import ResourceSampler
+
+logger = logging.getLogger(__name__)
+
+# 父进程轮询事件队列的间隔（秒），同时用于检查停止请求和工作进程是否异常退出
+EVENT_POLL_INTERVAL = 0.5
+# 采样工作进程资源用量的间隔，以及通过回调上报的间隔（秒）
+RESOURCE_SAMPLE_INTERVAL = 1.0
+RESOURCE_REPORT_INTERVAL = 5.0
+
+
+def run_worker_processes(config: TrainingConfig, callbacks: TrainingCallbacks) -> Dict[str, Any]:
+    """
+    在子进程中执行训练并等待结束
+
+    回调只在父进程中调用（它们会访问数据库和事件循环）。rank 0把on_step/log/on_epoch_end
+    作为事件放入队列，父进程转发给回调；on_epoch_end的返回值经应答队列送回rank 0。
+    父进程每次轮询都检查callbacks.should_stop()，收到停止请求后置位共享的取消标志，
+    工作进程每步检查该标志并在当前步结束后退出；超过config.cancel_grace_seconds仍未退出时
+    终止进程。父进程同时按RESOURCE_SAMPLE_INTERVAL采样各工作进程的资源用量，定期并在结束时
+    通过callbacks.on_resources上报。
+
+    Args:
+        config: 训练配置
+        callbacks: 训练回调
+
+    Returns:
+        Dict: rank 0的训练结果；进程被强制终止时stopped为True且terminated为True
+
+    Raises:
+        RuntimeError: 工作进程训练失败或异常退出
+    """
+    world_size = config.data_parallel_workers
+    ctx = multiprocessing.get_context("spawn")
+    events = ctx.Queue()
+    replies = ctx.Queue()
+    cancel_event = ctx.Event()
+    port = _free_port()
+
+    if world_size > 1:
+        callbacks.log(f"启动数据并行训练: {world_size}个gloo工作进程")
+    workers = [
+        ctx.Process(
+            target=_worker,
+            args=(rank, world_size, port, config, events, replies, cancel_event),
+            daemon=True,
+        )
+        for rank in range(world_size)
+    ]
+    for worker in workers:
+        worker.start()
+
+    result = None
+    error = None
+    last_metrics: Dict[str, Any] = {}
+    cancel_deadline: Optional[float] = None
+    sampler = ResourceSampler()
+    last_sample = last_report = time.monotonic()
+    try:
+        while result is None and error is None:
+            now = time.monotonic()
+            if now - last_sample >= RESOURCE_SAMPLE_INTERVAL:
+                last_sample = now
+                sampler.sample([w.pid for w in workers])
+            if now - last_report >= RESOURCE_REPORT_INTERVAL:
+                last_report = now
+                callbacks.on_resources(sampler.summary(last_metrics.get("examples_per_sec")))
+            if cancel_deadline is None and callbacks.should_stop():
+                cancel_event.set()
+                cancel_deadline = time.monotonic() + config.cancel_grace_seconds
+            if cancel_deadline is not None and time.monotonic() > cancel_deadline:
+                _terminate(workers)
+                callbacks.log(f"训练进程未在{config.cancel_grace_seconds}秒内退出，已强制终止")
+                return {"stopped": True, "terminated": True, "metrics": last_metrics}
+
+            try:
+                event = events.get(timeout=EVENT_POLL_INTERVAL)
+            except queue.Empty:
+                dead = [w for w in workers if w.exitcode not in (None, 0)]
+                if dead:
+                    error = f"工作进程异常退出: exitcode={dead[0].exitcode}"
+                continue
+
+            kind = event[0]
+            if kind == "step":
+                last_metrics = dict(event[3], steps=event[1])
+                callbacks.on_step(*event[1:])
+            elif kind == "autotune":
+                callbacks.on_autotune(*event[1:])
+            elif kind == "evaluate":
+                callbacks.on_evaluate(*event[1:])
+            elif kind == "log":
+                callbacks.log(event[1])
+            elif kind == "epoch_end":
+                replies.put(callbacks.on_epoch_end(*event[1:]))
+            elif kind == "result":
+                result = event[1]
+            elif kind == "error":
+                error = event[1]
+    finally:
+        # 工作进程退出后无法再读取其/proc，结束前最后采样一次
+        sampler.sample([w.pid for w in workers])
+        if error is not None:
+            cancel_event.set()
+        for worker in workers:
+            worker.join(timeout=config.cancel_grace_seconds)
+        _terminate(workers)
+        examples_per_sec = (result or {}).get("metrics", {}).get("examples_per_sec", last_metrics.get("examples_per_sec"))
+        callbacks.on_resources(sampler.summary(examples_per_sec))
+
+    if error is not None:
+        raise RuntimeError(f"训练进程失败: {error}")
+    return result
+
+
+def _terminate(workers):
+    """终止仍在运行的工作进程，SIGTERM无效时发送SIGKILL"""
+    alive = [w for w in workers if w.is_alive()]
+    for worker in alive:
+        worker.terminate()
+    for worker in alive:
+        worker.join(timeout=5)
+        if worker.is_alive():
+            worker.kill()
+            worker.join()
+
+
+def _free_port() -> int:
+    """获取一个空闲端口作为进程组的通信端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _WorkerCallbacks(TrainingCallbacks):
+    """工作进程内的回调：rank 0将事件转发到父进程，取消信号来自共享Event"""
+
+    def __init__(self, events, replies, cancel_event):
+        self.events = events
+        self.replies = replies
+        self.cancel_event = cancel_event
+
+    def on_step(self, step: int, total_steps: int, metrics: Dict[str, float]):
+        self.events.put(("step", step, total_steps, metrics))
+
+    def on_autotune(self, batch_size: int, results):
+        self.events.put(("autotune", batch_size, results))
+
+    def on_evaluate(self, step: int, metrics: Dict[str, float]):
+        self.events.put(("evaluate", step, metrics))
+
+    def on_epoch_end(self, epoch: int, metrics: Dict[str, float]) -> bool:
+        self.events.put(("epoch_end", epoch, metrics))
+        return self.replies.get()
+
+    def log(self, message: str):
+        self.events.put(("log", message))
+
+    def should_stop(self) -> bool:
+        return self.cancel_event.is_set()
+
+
+def _worker(rank, world_size, port, config, events, replies, cancel_event):
+    """工作进程入口"""
+    from .engine import train_loop
+
+    distributed = world_size > 1
+    if distributed:
+        os.environ["MASTER_ADDR"] = "127.0.0.1"
+        os.environ["MASTER_PORT"] = str(port)
+        # 各进程平分CPU核心，避免线程数超订
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // world_size))
+        dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    callbacks = _WorkerCallbacks(events, replies, cancel_event)
+    try:
+        result = train_loop(config, callbacks, rank=rank, world_size=world_size)
+        if rank == 0:
+            events.put(("result", result))
+    except Exception as e:
+        logger.exception(f"训练工作进程{rank}失败")
+        events.put(("error", f"rank {rank}: {str(e)}"))
+    finally:
+        if distributed:
+            dist.destroy_process_group()
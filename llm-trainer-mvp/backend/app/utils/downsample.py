@@ -0,0 +1,101 @@
+# 时间序列降采样工具
+# 用于在服务端将训练指标压缩到指定点数，减少传输和前端绘图开销
+
+from typing import List, Sequence, Tuple
+
+Series = Tuple[List[float], List[float]]
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> Series:
+    """
+    Largest-Triangle-Three-Buckets 降采样
+
+    保留首尾点，其余每个桶中选取与前一个选中点、下一个桶均值构成三角形面积最大的点，
+    能较好地保留曲线形状（峰值、拐点）。
+
+    Args:
+        xs: 横坐标（如step），需递增
+        ys: 纵坐标（指标值）
+        threshold: 目标点数
+
+    Returns:
+        Tuple: (降采样后的横坐标, 降采样后的纵坐标)
+    """
+    length = len(xs)
+    if threshold >= length or threshold < 3:
+        return list(xs), list(ys)
+
+    sampled_x = [xs[0]]
+    sampled_y = [ys[0]]
+    bucket_size = (length - 2) / (threshold - 2)
+    selected = 0
+
+    for i in range(threshold - 2):
+        # 下一个桶的均值点
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, length)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        # 当前桶中选择三角形面积最大的点
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        point_x, point_y = xs[selected], ys[selected]
+        max_area = -1.0
+        candidate = start
+        for j in range(start, end):
+            area = abs((point_x - avg_x) * (ys[j] - point_y) - (point_x - xs[j]) * (avg_y - point_y))
+            if area > max_area:
+                max_area = area
+                candidate = j
+        selected = candidate
+        sampled_x.append(xs[selected])
+        sampled_y.append(ys[selected])
+
+    sampled_x.append(xs[-1])
+    sampled_y.append(ys[-1])
+    return sampled_x, sampled_y
+
+
+def minmax_buckets(xs: Sequence[float], ys: Sequence[float], threshold: int) -> Series:
+    """
+    最小/最大值分桶降采样
+
+    将序列均分为threshold/2个桶，每个桶按出现顺序保留最小值点和最大值点，
+    保证尖峰（如loss突增）不会被平滑掉。
+
+    Args:
+        xs: 横坐标（如step），需递增
+        ys: 纵坐标（指标值）
+        threshold: 目标点数
+
+    Returns:
+        Tuple: (降采样后的横坐标, 降采样后的纵坐标)
+    """
+    length = len(xs)
+    buckets = threshold // 2
+    if threshold >= length or buckets < 1:
+        return list(xs), list(ys)
+
+    sampled_x: List[float] = []
+    sampled_y: List[float] = []
+    bucket_size = length / buckets
+    for i in range(buckets):
+        start = int(i * bucket_size)
+        end = int((i + 1) * bucket_size)
+        if start >= end:
+            continue
+        bucket = range(start, end)
+        low = min(bucket, key=lambda j: ys[j])
+        high = max(bucket, key=lambda j: ys[j])
+        for j in sorted({low, high}):
+            sampled_x.append(xs[j])
+            sampled_y.append(ys[j])
+    return sampled_x, sampled_y
+
+
+DOWNSAMPLE_METHODS = {
+    "lttb": lttb,
+    "minmax": minmax_buckets,
+}
@@ -0,0 +1,35 @@
+# 文件内容哈希
+# 按(路径, 大小, 修改时间)缓存文件的sha256，同一文件未变化时不重复读取
+
+import os
+import hashlib
+import threading
+from typing import Dict, Tuple
+
+_digests: Dict[Tuple[str, int, int], str] = {}
+_lock = threading.Lock()
+
+
+def file_sha256(path: str) -> str:
+    """
+    计算文件内容的sha256
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        str: sha256十六进制字符串
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        if key in _digests:
+            return _digests[key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    with _lock:
+        _digests[key] = digest.hexdigest()
+    return _digests[key]
@@ -0,0 +1,263 @@
+# 结构化训练日志
+# 日志按JSONL记录（ts、level、step、message）追加到活动分段，超过大小后压缩归档；
+# 分段索引记录每段的逻辑偏移量、时间、步数范围和级别计数，查询只读取相关分段
+
+import os
+import gzip
+import json
+import threading
+import importlib.util
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from .log_tail import tail_lines, read_from_offset, MAX_READ_BYTES
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+# 分段索引文件后缀
+INDEX_SUFFIX = ".index.json"
+
+# 同一日志的写入、轮转和读取串行执行，避免读取时分段被轮转
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def make_record(message: str, level: str = "INFO", step: Optional[int] = None) -> Dict[str, Any]:
+    """构造一条日志记录"""
+    return {"ts": datetime.now().isoformat(), "level": level, "step": step, "message": message}
+
+
+def format_record(record: Dict[str, Any]) -> str:
+    """将日志记录格式化为一行文本"""
+    step = f" [step {record['step']}]" if record.get("step") is not None else ""
+    prefix = f"[{record['ts']}] " if record.get("ts") else ""
+    return f"{prefix}[{record.get('level', 'INFO')}]{step} {record['message']}"
+
+
+def parse_line(line: str) -> Dict[str, Any]:
+    """解析一行日志；结构化日志之前的纯文本日志作为INFO级别的消息返回"""
+    try:
+        record = json.loads(line)
+        if isinstance(record, dict) and "message" in record:
+            return record
+    except ValueError:
+        pass
+    return {"ts": None, "level": "INFO", "step": None, "message": line}
+
+
+def _codec(compression: str) -> Tuple[str, Any, Any]:
+    """
+    分段压缩方式
+
+    zstd需要安装zstandard，未安装时回退到gzip。
+
+    Returns:
+        Tuple: (文件后缀, 压缩函数, 解压函数)
+    """
+    if compression == "zstd" and importlib.util.find_spec("zstandard") is not None:
+        import zstandard
+        return ".zst", zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+    return ".gz", gzip.compress, gzip.decompress
+
+
+def _decompress(path: str) -> bytes:
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".zst"):
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _segment_stats(lines: List[str]) -> Dict[str, Any]:
+    """统计分段内的时间范围、步数范围和各级别记录数，写入分段索引"""
+    records = [parse_line(line) for line in lines]
+    stamps = [r["ts"] for r in records if r.get("ts")]
+    steps = [r["step"] for r in records if r.get("step") is not None]
+    levels: Dict[str, int] = {}
+    for record in records:
+        levels[record.get("level", "INFO")] = levels.get(record.get("level", "INFO"), 0) + 1
+    return {
+        "records": len(records),
+        "first_ts": min(stamps) if stamps else None,
+        "last_ts": max(stamps) if stamps else None,
+        "min_step": min(steps) if steps else None,
+        "max_step": max(steps) if steps else None,
+        "levels": levels,
+    }
+
+
+class JobLog:
+    """训练任务的分段日志
+
+    path为活动分段，归档分段为path.{序号}.gz（或.zst），索引为path.index.json。
+    偏移量是跨分段的逻辑偏移量（未压缩字节数），轮转后客户端游标仍然有效。
+    """
+
+    def __init__(self, path: str, rotate_bytes: int = 4 * 1024 * 1024, compression: str = "gzip"):
+        self.path = path
+        self.rotate_bytes = rotate_bytes
+        self.compression = compression
+        self.index_path = path + INDEX_SUFFIX
+        self.lock = _lock_for(path)
+
+    def append(self, record: Dict[str, Any]):
+        """追加一条记录，活动分段超过rotate_bytes时轮转"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                size = f.tell()
+            if self.rotate_bytes and size >= self.rotate_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        """压缩归档活动分段并登记到索引，调用方需持有锁"""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        index = self._load_index()
+        suffix, compress, _ = _codec(self.compression)
+        name = f"{os.path.basename(self.path)}.{len(index) + 1}{suffix}"
+        with open(os.path.join(os.path.dirname(self.path), name), "wb") as f:
+            f.write(compress(data))
+
+        start = index[-1]["start_offset"] + index[-1]["bytes"] if index else 0
+        lines = [line for line in data.decode("utf-8", errors="replace").split("\n") if line.strip()]
+        index.append({"file": name, "start_offset": start, "bytes": len(data), **_segment_stats(lines)})
+        # 先写索引再清空活动分段，中途失败时最多重复一段日志而不会丢失
+        staging = self.index_path + ".tmp"
+        with open(staging, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(staging, self.index_path)
+        open(self.path, "w").close()
+
+    def _load_index(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_segment(self, segment: Dict[str, Any]) -> List[str]:
+        data = _decompress(os.path.join(os.path.dirname(self.path), segment["file"]))
+        return [line for line in data.decode("utf-8", errors="replace").split("\n") if line.strip()]
+
+    def _archived_size(self, index: List[Dict[str, Any]]) -> int:
+        return index[-1]["start_offset"] + index[-1]["bytes"] if index else 0
+
+    def size(self) -> int:
+        """日志的逻辑大小（所有分段未压缩字节数之和），用作读取游标"""
+        with self.lock:
+            active = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            return self._archived_size(self._load_index()) + active
+
+    def tail(self, lines: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        读取最后若干条记录
+
+        先从活动分段末尾反向读取，不够时再从新到旧解压归档分段。
+
+        Returns:
+            Tuple: (记录列表（按时间顺序）, 当前逻辑偏移量)
+        """
+        with self.lock:
+            index = self._load_index()
+            result: List[str] = []
+            active = 0
+            if os.path.exists(self.path):
+                active = os.path.getsize(self.path)
+                result = tail_lines(self.path, lines, end=active)
+            for segment in reversed(index):
+                if len(result) >= lines:
+                    break
+                result = self._read_segment(segment)[-(lines - len(result)):] + result
+            return [parse_line(line) for line in result], self._archived_size(index) + active
+
+    def read_after(self, offset: int, max_bytes: int = MAX_READ_BYTES) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        读取逻辑偏移量之后新增的记录
+
+        只读取偏移量所在的一个分段，读到分段末尾时has_more为True，客户端用新偏移量继续读取。
+
+        Returns:
+            Tuple: (记录列表, 新的逻辑偏移量, 是否还有未读取的数据)
+        """
+        with self.lock:
+            index = self._load_index()
+            archived = self._archived_size(index)
+            active = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if offset > archived + active:
+                offset = 0
+
+            if offset >= archived:
+                if not active:
+                    return [], offset, False
+                lines, local, has_more = read_from_offset(self.path, offset - archived, max_bytes)
+                return [parse_line(line) for line in lines], archived + local, has_more
+
+            segment = next(s for s in index if s["start_offset"] + s["bytes"] > offset)
+            data = _decompress(os.path.join(os.path.dirname(self.path), segment["file"]))
+            chunk = data[offset - segment["start_offset"]:][:max_bytes]
+            # 截断在行中间时退回到最后一个完整行；单行超过max_bytes时整块返回，保证游标前进
+            end = len(chunk)
+            if len(chunk) == max_bytes:
+                end = chunk.rfind(b"\n") + 1 or len(chunk)
+            lines = [line for line in chunk[:end].decode("utf-8", errors="replace").split("\n") if line.strip()]
+            return [parse_line(line) for line in lines], offset + end, True
+
+    def query(
+        self,
+        lines: int,
+        level: Optional[str] = None,
+        start_step: Optional[int] = None,
+        end_step: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        按级别和步数范围筛选最后若干条记录
+
+        按索引跳过不含该级别或步数范围不相交的归档分段，只解压可能命中的分段。
+
+        Args:
+            lines: 返回的最多记录数
+            level: 最低级别，如WARNING时返回WARNING和ERROR
+            start_step: 起始步数（含）
+            end_step: 结束步数（含）
+
+        Returns:
+            List[Dict]: 命中的记录（按时间顺序）
+        """
+        levels = set(LEVELS[LEVELS.index(level):]) if level in LEVELS else None
+        step_filter = start_step is not None or end_step is not None
+        low = start_step if start_step is not None else float("-inf")
+        high = end_step if end_step is not None else float("inf")
+
+        def matches(record: Dict[str, Any]) -> bool:
+            if levels is not None and record.get("level", "INFO") not in levels:
+                return False
+            if step_filter and (record.get("step") is None or not low <= record["step"] <= high):
+                return False
+            return True
+
+        def relevant(segment: Dict[str, Any]) -> bool:
+            if levels is not None and not any(segment["levels"].get(name) for name in levels):
+                return False
+            if step_filter and (
+                segment["min_step"] is None or segment["max_step"] < low or segment["min_step"] > high
+            ):
+                return False
+            return True
+
+        with self.lock:
+            result: List[Dict[str, Any]] = []
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8", errors="replace") as f:
+                    result = [r for r in (parse_line(line) for line in f if line.strip()) if matches(r)]
+            for segment in reversed(self._load_index()):
+                if len(result) >= lines:
+                    break
+                if relevant(segment):
+                    result = [r for r in map(parse_line, self._read_segment(segment)) if matches(r)] + result
+            return result[-lines:]
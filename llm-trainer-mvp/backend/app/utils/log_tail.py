@@ -0,0 +1,85 @@
+# 日志文件读取工具
+# 基于文件偏移量读取日志，避免每次请求都读取整个文件
+
+import os
+from typing import List, Optional, Tuple
+
+# 反向读取时每次seek的块大小
+BLOCK_SIZE = 8192
+# 游标读取单次最多返回的字节数
+MAX_READ_BYTES = 1024 * 1024
+
+
+def _decode_lines(data: bytes) -> List[str]:
+    """将字节按行解码，忽略空行"""
+    return [line.decode("utf-8", errors="replace").rstrip("\r") for line in data.split(b"\n") if line.strip()]
+
+
+def tail_lines(file_path: str, lines: int, end: Optional[int] = None, block_size: int = BLOCK_SIZE) -> List[str]:
+    """
+    从文件末尾反向按块读取最后若干行
+
+    读取量只与所需行数相关，与文件大小无关。
+
+    Args:
+        file_path: 日志文件路径
+        lines: 需要的行数
+        end: 读取截止的字节偏移量，默认为文件末尾
+        block_size: 每次读取的块大小
+
+    Returns:
+        List[str]: 最后lines行（按文件顺序）
+    """
+    if lines <= 0:
+        return []
+
+    with open(file_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell() if end is None else min(end, f.tell())
+        data = b""
+        # 多读一个换行符，保证最早的一行是完整的
+        while position > 0 and data.count(b"\n") <= lines:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+
+    result = _decode_lines(data)
+    return result[-lines:]
+
+
+def read_from_offset(file_path: str, offset: int, max_bytes: int = MAX_READ_BYTES) -> Tuple[List[str], int, bool]:
+    """
+    读取指定偏移量之后新增的完整日志行
+
+    只返回以换行符结尾的完整行，未写完的最后一行留到下次读取。
+
+    Args:
+        file_path: 日志文件路径
+        offset: 上次读取后返回的字节偏移量
+        max_bytes: 单次最多读取的字节数
+
+    Returns:
+        Tuple: (新增日志行, 新的偏移量, 是否还有未读取的数据)
+    """
+    file_size = os.path.getsize(file_path)
+    # 文件被截断或重建时从头读取
+    if offset > file_size:
+        offset = 0
+
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        data = f.read(max_bytes)
+
+    end = data.rfind(b"\n")
+    if end == -1:
+        if len(data) < max_bytes:
+            return [], offset, False
+        # 单行超过max_bytes时整块返回，保证游标前进
+        end = len(data) - 1
+
+    consumed = data[:end + 1]
+    new_offset = offset + len(consumed)
+    # 未读满说明已到文件末尾，剩余部分只可能是未写完的行
+    has_more = len(data) == max_bytes and new_offset < file_size
+    return _decode_lines(consumed), new_offset, has_more
@@ -0,0 +1,140 @@
+# 推理请求动态组批
+# 收集并发到达的推理请求，在最长等待时间内或达到批次上限时合并为一次批量推理，再把结果分发给各请求
+
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 统计延迟分位数时保留的最近请求数
+LATENCY_WINDOW = 1000
+
+
+class MicroBatcher:
+    """单个模型的动态组批队列
+
+    后台任务取出第一个请求后继续收集，直到达到max_batch_size或等待超过max_wait_ms，
+    然后调用run_batch执行一次批量推理；执行期间到达的请求进入下一批。
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int,
+        max_wait_ms: float
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = 0
+        self.batches = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._queue: Optional[asyncio.Queue] = None
+        self._full: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        # 后台任务已从队列取出、尚未分发结果的批次
+        self._inflight: List[Tuple[Any, asyncio.Future]] = []
+
+    async def submit(self, item: Any) -> Any:
+        """
+        提交一条请求并等待所在批次的结果
+
+        Args:
+            item: 请求输入
+
+        Returns:
+            Any: run_batch对该输入返回的结果
+
+        Raises:
+            Exception: 批量推理抛出的异常会传给该批次的所有请求
+            RuntimeError: 请求完成前组批队列被关闭或后台任务异常退出
+        """
+        if self._worker is None or self._worker.done():
+            if self._worker is not None:
+                # 后台任务已退出，旧队列和未完成批次中的请求不会再被处理
+                error = None if self._worker.cancelled() else self._worker.exception()
+                self._fail_pending(error or RuntimeError("组批后台任务已停止"))
+            self._queue = asyncio.Queue()
+            self._full = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        if self._queue.qsize() + 1 >= self.max_batch_size:
+            self._full.set()
+        try:
+            return await future
+        finally:
+            self._latencies.append((time.perf_counter() - start) * 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        组批统计
+
+        Returns:
+            Dict: 请求数、批次数、平均批次大小，以及最近LATENCY_WINDOW个请求从提交到返回的p50_ms和p99_ms
+        """
+        latencies = list(self._latencies)
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 3) if self.batches else None,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3) if latencies else None,
+        }
+
+    async def close(self):
+        """停止后台任务，尚未完成的请求收到RuntimeError"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            self._fail_pending(RuntimeError("组批队列已关闭"))
+
+    def _fail_pending(self, error: BaseException):
+        """把异常分发给执行中的批次和队列中剩余的请求"""
+        pending, self._inflight = self._inflight, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _run(self):
+        while True:
+            batch = self._inflight = [await self._queue.get()]
+            if self._queue.qsize() + 1 < self.max_batch_size:
+                # 等待凑满批次或超时；只等待事件而不直接等待队列，超时不会丢失请求
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._execute(batch)
+            self._inflight = []
+
+    async def _execute(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """执行一次批量推理并把结果或异常分发给各请求"""
+        self.requests += len(batch)
+        self.batches += 1
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"批量推理返回{len(results)}条结果，期望{len(batch)}条")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            # 等待期间取消的请求不再设置结果
+            if not future.done():
+                future.set_result(result)
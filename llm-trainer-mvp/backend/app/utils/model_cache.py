@@ -0,0 +1,128 @@
+# 推理模型缓存
+# 按最近使用顺序淘汰的模型缓存，以模型常驻内存的字节数而不是个数限制容量；固定的模型不会被淘汰
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class ModelCache:
+    """按字节数限制容量的LRU模型缓存
+
+    放入模型时从最久未使用的开始淘汰未固定的模型，直到总字节数不超过上限；
+    未固定的模型超出剩余容量时不缓存，调用方只使用一次。固定的模型总是缓存，但其字节数同样计入总量。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._pinned = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """取出缓存的模型并标记为最近使用，计入命中或未命中"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """取出缓存的模型，不改变使用顺序也不计入统计"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def put(self, key: Hashable, value: Any, size_bytes: int) -> bool:
+        """
+        放入模型
+
+        Args:
+            key: 缓存键
+            value: 已加载的模型
+            size_bytes: 模型常驻内存的字节数
+
+        Returns:
+            bool: 是否已缓存
+        """
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            pinned = key in self._pinned
+            if not pinned and size_bytes > self.max_bytes - self._pinned_bytes():
+                return False
+            self._entries[key] = (value, size_bytes)
+            self._bytes += size_bytes
+            self._evict(keep=key)
+            return True
+
+    def pin(self, key: Hashable):
+        """固定模型，固定后不会被淘汰；可以在模型放入之前固定"""
+        with self._lock:
+            self._pinned.add(key)
+
+    def unpin(self, key: Hashable):
+        """取消固定，超出容量时按使用顺序淘汰"""
+        with self._lock:
+            self._pinned.discard(key)
+            self._evict()
+
+    def remove(self, key: Hashable):
+        """移除模型，同时取消固定"""
+        with self._lock:
+            self._pinned.discard(key)
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def invalidate(self, key: Hashable):
+        """丢弃已缓存的模型但保留固定，模型文件被覆盖后下次放入的是重新加载的模型"""
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        """清空缓存和固定"""
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存统计
+
+        Returns:
+            Dict: 命中、未命中、淘汰次数和命中率，当前字节数和上限，以及按最久未使用到最近使用排列的模型
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "models": [
+                    {"key": key, "size_bytes": size, "pinned": key in self._pinned}
+                    for key, (_, size) in self._entries.items()
+                ],
+            }
+
+    def _pinned_bytes(self) -> int:
+        return sum(size for key, (_, size) in self._entries.items() if key in self._pinned)
+
+    def _evict(self, keep: Optional[Hashable] = None):
+        """从最久未使用的开始淘汰未固定的模型，直到不超过上限"""
+        candidates: List[Hashable] = [key for key in self._entries if key not in self._pinned and key != keep]
+        for key in candidates:
+            if self._bytes <= self.max_bytes:
+                break
+            self._bytes -= self._entries.pop(key)[1]
+            self.evictions += 1
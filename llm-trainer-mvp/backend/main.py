@@ -116,6 +116,10 @@ async def startup_event():
         logger.error(f"数据库初始化失败: {str(e)}")
         raise
     
+    # 上次退出时仍在运行的流水线已中断，标记为失败以便重新运行
+    from app.services.pipeline_service import pipeline_service
+    pipeline_service.recover_interrupted_runs()
+    
     logger.info("应用启动完成")
 
 @app.on_event("shutdown")
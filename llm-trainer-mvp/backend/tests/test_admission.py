@@ -0,0 +1,93 @@
+import asyncio
+
+from sqlmodel import Session
+
+from app.models import TrainingJob
+from app.services.job_scheduler import TrainingScheduler
+from app.services.training_service import training_service
+from app.training.memory import ModelProfile, estimate_peak_memory
+
+GB = 1024 ** 3
+
+
+def test_estimate_grows_with_batch_and_sequence():
+    """测试估算随批次大小和序列长度增长"""
+    profile = ModelProfile()
+    small = estimate_peak_memory(profile, batch_size=8, max_seq_length=128)
+    assert estimate_peak_memory(profile, batch_size=32, max_seq_length=128) > small
+    assert estimate_peak_memory(profile, batch_size=8, max_seq_length=512) > small
+    assert estimate_peak_memory(profile, batch_size=8, max_seq_length=128, data_parallel_workers=4) == 4 * small
+
+
+def test_memory_saving_options_reduce_estimate():
+    """测试bf16、梯度检查点和LoRA降低估算"""
+    profile = ModelProfile()
+    base = estimate_peak_memory(profile, batch_size=32, max_seq_length=256)
+    assert estimate_peak_memory(profile, batch_size=32, max_seq_length=256, precision="bf16") < base
+    assert estimate_peak_memory(profile, batch_size=32, max_seq_length=256, gradient_checkpointing=True) < base
+    assert estimate_peak_memory(profile, batch_size=32, max_seq_length=256, method="lora") < base
+
+
+async def test_scheduler_queues_jobs_over_memory_budget():
+    """测试预计内存超出预算的任务排队，直到已运行任务释放内存；排队按提交顺序，小任务不越过大任务"""
+    scheduler = TrainingScheduler(max_concurrent=4, memory_budget=10 * GB)
+    started = []
+    release = asyncio.Event()
+
+    async def runner(job_id):
+        started.append(job_id)
+        await release.wait()
+
+    scheduler.submit(1, runner, 6 * GB)
+    scheduler.submit(2, runner, 6 * GB)
+    scheduler.submit(3, runner, 3 * GB)
+    await asyncio.sleep(0.01)
+    assert started == [1]
+    assert scheduler.reserved_memory == 6 * GB
+    assert scheduler.queued_count == 2
+
+    release.set()
+    await asyncio.sleep(0.01)
+    assert started == [1, 2, 3]
+    assert not scheduler.fits_budget(11 * GB)
+
+
+async def test_cancelled_queued_job_leaves_the_queue():
+    """测试排队中被取消的任务离开队列，不阻塞后面的任务"""
+    scheduler = TrainingScheduler(max_concurrent=1)
+    started = []
+    release = asyncio.Event()
+
+    async def runner(job_id):
+        started.append(job_id)
+        await release.wait()
+
+    for job_id in (1, 2, 3, 4):
+        scheduler.submit(job_id, runner)
+    # 任务2在开始执行前被取消，任务3在排队等待时被取消
+    scheduler._tasks[2].cancel()
+    await asyncio.sleep(0.01)
+    scheduler._tasks[3].cancel()
+    release.set()
+    await asyncio.sleep(0.01)
+    assert started == [1, 4]
+    assert scheduler.queued_count == 0
+
+
+def test_memory_calibration_uses_sampled_peak_of_completed_jobs(test_db_engine):
+    """测试校准系数取已完成任务采样峰值与估算值之比的中位数，并限制在取值范围内"""
+    with Session(test_db_engine) as session:
+        assert training_service._memory_calibration(session) == 1.0
+        for job_id, status, peak in ((1, "completed", 2 * GB), (2, "completed", 3 * GB), (3, "failed", 9 * GB)):
+            session.add(TrainingJob(
+                id=job_id, dataset_id=1, user_id=1, status=status, estimated_memory_bytes=GB, peak_rss_bytes=peak
+            ))
+        session.commit()
+        assert training_service._memory_calibration(session) == 3.0
+
+        for job_id in (4, 5):
+            session.add(TrainingJob(
+                id=job_id, dataset_id=1, user_id=1, status="completed", estimated_memory_bytes=GB, peak_rss_bytes=10 * GB
+            ))
+        session.commit()
+        assert training_service._memory_calibration(session) == 4.0
@@ -0,0 +1,22 @@
+from app.training.autotune import candidate_batch_sizes, choose_batch_size
+
+
+def test_candidate_batch_sizes():
+    """测试候选批次大小按2的幂递增并包含上限"""
+    assert candidate_batch_sizes(1) == [1]
+    assert candidate_batch_sizes(16) == [1, 2, 4, 8, 16]
+    assert candidate_batch_sizes(48) == [1, 2, 4, 8, 16, 32, 48]
+
+
+def test_choose_batch_size_prefers_throughput_and_skips_failures():
+    """测试选择代表性长度下吞吐量最高、且最长序列下也能运行的批次大小"""
+    results = [
+        {"batch_size": 8, "seq_length": 64, "examples_per_sec": 100.0},
+        {"batch_size": 8, "seq_length": 256, "examples_per_sec": 30.0},
+        {"batch_size": 16, "seq_length": 64, "examples_per_sec": 140.0},
+        {"batch_size": 16, "seq_length": 256, "examples_per_sec": 35.0},
+        {"batch_size": 32, "seq_length": 64, "examples_per_sec": 150.0},
+        {"batch_size": 32, "seq_length": 256, "ok": False},
+    ]
+    assert choose_batch_size(results, 64) == 16
+    assert choose_batch_size([], 64) is None
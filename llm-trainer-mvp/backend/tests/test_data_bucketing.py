@@ -0,0 +1,61 @@
+from app.training.data import LengthBucketBatchSampler, pad_batch, shard_batches, PaddingStats
+
+
+def _padding_efficiency(sampler, lengths, epoch=0):
+    stats = PaddingStats()
+    for batch in sampler.batches(epoch):
+        stats.update([lengths[i] for i in batch])
+    return stats.efficiency
+
+
+def test_sampler_covers_every_sample_once():
+    """测试每轮每个样本恰好出现一次"""
+    lengths = [(i * 37) % 100 + 1 for i in range(103)]
+    sampler = LengthBucketBatchSampler(lengths, batch_size=8, bucket_multiplier=4)
+    batches = list(sampler.batches(0))
+    assert len(batches) == len(sampler)
+    assert sorted(i for batch in batches for i in batch) == list(range(103))
+
+
+def test_bucketing_reduces_padding():
+    """测试按长度分桶比随机组批填充更少"""
+    lengths = [(i * 37) % 100 + 1 for i in range(256)]
+    bucketed = LengthBucketBatchSampler(lengths, batch_size=16, bucket_multiplier=2)
+    unbucketed = LengthBucketBatchSampler(lengths, batch_size=16, bucket_by_length=False)
+    assert _padding_efficiency(bucketed, lengths) > 0.85
+    assert _padding_efficiency(bucketed, lengths) > _padding_efficiency(unbucketed, lengths)
+
+
+def test_shuffle_changes_between_epochs_and_is_seeded():
+    """测试打乱顺序每轮不同且可复现"""
+    lengths = [i % 50 + 1 for i in range(200)]
+    sampler = LengthBucketBatchSampler(lengths, batch_size=8, seed=1)
+    assert list(sampler.batches(0)) == list(sampler.batches(0))
+    assert list(sampler.batches(0)) != list(sampler.batches(1))
+
+    fixed = LengthBucketBatchSampler(lengths, batch_size=8, shuffle=False)
+    assert list(fixed.batches(0)) == list(fixed.batches(1))
+
+
+def test_pad_batch_pads_to_longest():
+    """测试动态填充到批次内最长序列"""
+    input_ids, attention_mask = pad_batch([[5, 6, 7], [8]], pad_id=0)
+    assert input_ids == [[5, 6, 7], [8, 0, 0]]
+    assert attention_mask == [[1, 1, 1], [1, 0, 0]]
+
+
+def test_padding_stats():
+    """测试填充效率统计"""
+    stats = PaddingStats()
+    assert stats.efficiency == 1.0
+    stats.update([3, 1])
+    assert stats.efficiency == 4 / 6
+
+
+def test_shard_batches_gives_every_rank_same_step_count():
+    """测试数据并行分片后各进程批次数相同且覆盖全部批次"""
+    batches = [[i] for i in range(10)]
+    shards = [shard_batches(batches, rank, 4) for rank in range(4)]
+    assert {len(shard) for shard in shards} == {3}
+    assert {b[0] for shard in shards for b in shard} == set(range(10))
+    assert shard_batches(batches, 0, 1) == batches
@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from app.db import upgrade_schema
+from app.models import TrainingJob
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_adds_missing_columns_to_old_tables(engine):
+    """测试旧数据库的训练任务表补齐新增列和索引后可以正常读写"""
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE trainingjob (id INTEGER PRIMARY KEY, dataset_id INTEGER NOT NULL, "
+            "user_id INTEGER NOT NULL, status VARCHAR NOT NULL, epochs INTEGER NOT NULL)"
+        ))
+        connection.execute(text("INSERT INTO trainingjob VALUES (1, 1, 1, 'completed', 3)"))
+    SQLModel.metadata.create_all(engine)
+
+    added = upgrade_schema(engine)
+
+    assert "trainingjob.fingerprint" in added
+    assert "trainingjob.progress" in added
+    assert any(index["name"] == "ix_trainingjob_fingerprint" for index in inspect(engine).get_indexes("trainingjob"))
+    with Session(engine) as session:
+        job = session.exec(select(TrainingJob)).one()
+        assert (job.epochs, job.progress, job.validation_split, job.bucket_by_length) == (3, 0.0, 0.0, True)
+        session.add(TrainingJob(dataset_id=1, user_id=1, fingerprint="abc"))
+        session.commit()
+    assert upgrade_schema(engine) == []
+
+
+def test_upgrade_rejects_columns_without_default(engine):
+    """测试不可为空且没有默认值的列无法自动补齐时给出明确错误"""
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE trainingsweep (id INTEGER PRIMARY KEY)"))
+    SQLModel.metadata.create_all(engine)
+
+    with pytest.raises(RuntimeError, match="trainingsweep.search_space"):
+        upgrade_schema(engine)
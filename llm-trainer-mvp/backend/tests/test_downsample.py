@@ -0,0 +1,45 @@
+import math
+
+from app.utils.downsample import lttb, minmax_buckets
+
+
+def _series(n):
+    xs = list(range(n))
+    ys = [math.sin(x / 50.0) for x in xs]
+    return xs, ys
+
+
+def test_lttb_reduces_to_threshold_and_keeps_endpoints():
+    """测试LTTB降采样到目标点数并保留首尾点"""
+    xs, ys = _series(10000)
+    sx, sy = lttb(xs, ys, 200)
+    assert len(sx) == len(sy) == 200
+    assert sx[0] == 0 and sx[-1] == 9999
+    assert sx == sorted(sx)
+
+
+def test_lttb_keeps_spike():
+    """测试LTTB保留尖峰点"""
+    xs = list(range(1000))
+    ys = [0.0] * 1000
+    ys[537] = 100.0
+    sx, sy = lttb(xs, ys, 20)
+    assert 537 in sx
+    assert max(sy) == 100.0
+
+
+def test_minmax_keeps_extremes_per_bucket():
+    """测试最小/最大值分桶保留每个区间的极值"""
+    xs, ys = _series(10000)
+    sx, sy = minmax_buckets(xs, ys, 100)
+    assert len(sx) <= 100
+    assert max(sy) == max(ys)
+    assert min(sy) == min(ys)
+    assert sx == sorted(sx)
+
+
+def test_short_series_returned_unchanged():
+    """测试点数不超过目标时原样返回"""
+    xs, ys = _series(50)
+    assert lttb(xs, ys, 100) == (xs, ys)
+    assert minmax_buckets(xs, ys, 100) == (xs, ys)
@@ -0,0 +1,45 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import TrainingRequest
+from app.training.data import train_validation_split
+from app.training.early_stopping import EarlyStopping
+
+
+def test_early_stopping_patience_and_min_delta():
+    """测试连续patience次没有超过min_delta的改进时停止"""
+    stopper = EarlyStopping(patience=2, min_delta=0.01)
+    assert stopper.update(1.0, step=10)
+    assert stopper.update(0.8, step=20)
+    assert not stopper.update(0.795, step=30)   # 改进小于min_delta
+    assert not stopper.should_stop
+    assert not stopper.update(0.9, step=40)
+    assert stopper.should_stop
+    assert stopper.best == 0.8
+    assert stopper.best_step == 20
+
+
+def test_early_stopping_without_patience_only_tracks_best():
+    """测试未设置patience时只记录最优结果"""
+    stopper = EarlyStopping()
+    for step, value in enumerate([0.5, 0.6, 0.7, 0.8], start=1):
+        stopper.update(value, step)
+    assert not stopper.should_stop
+    assert stopper.best_step == 1
+
+
+def test_train_validation_split_is_disjoint_and_seeded():
+    """测试验证集划分不重叠且可复现"""
+    train, validation = train_validation_split(100, 0.2, seed=3)
+    assert len(validation) == 20
+    assert sorted(train + validation) == list(range(100))
+    assert train_validation_split(100, 0.2, seed=3) == (train, validation)
+    assert train_validation_split(100, 0.0) == (list(range(100)), [])
+
+
+def test_early_stopping_requires_validation_split():
+    """测试默认不划分验证集，提前停止需要显式划分验证集"""
+    assert TrainingRequest(dataset_id=1).validation_split == 0
+    with pytest.raises(ValidationError):
+        TrainingRequest(dataset_id=1, early_stopping_patience=3)
+    assert TrainingRequest(dataset_id=1, validation_split=0.1, early_stopping_patience=3).early_stopping_patience == 3
@@ -0,0 +1,202 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from app.training.base import TrainingConfig, TrainingCallbacks
+from app.training.engine import train_loop
+from app.training.workers import run_worker_processes
+
+WORDS = ["good", "great", "fine", "nice", "bad", "awful", "poor", "sad", "very", "not", "movie", "food"]
+
+
+class RecordingCallbacks(TrainingCallbacks):
+    """记录训练事件的回调，stop_after_steps步之后请求停止"""
+
+    def __init__(self, stop_after_steps=None):
+        self.steps = []
+        self.logs = []
+        self.resources = []
+        self.stop_after_steps = stop_after_steps
+
+    def on_step(self, step, total_steps, metrics):
+        self.steps.append((step, total_steps, metrics))
+
+    def log(self, message):
+        self.logs.append(message)
+
+    def on_resources(self, usage):
+        self.resources.append(usage)
+
+    def should_stop(self):
+        return self.stop_after_steps is not None and len(self.steps) >= self.stop_after_steps
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """随机初始化的极小BERT分类模型和分词器，不需要下载"""
+    model_dir = tmp_path_factory.mktemp("tiny-bert")
+    vocab = model_dir / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *WORDS]), encoding="utf-8")
+    transformers.BertTokenizerFast(vocab_file=str(vocab)).save_pretrained(model_dir)
+    config = transformers.BertConfig(
+        vocab_size=5 + len(WORDS),
+        hidden_size=16,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=32,
+        max_position_embeddings=32,
+        hidden_dropout_prob=0.0,
+        attention_probs_dropout_prob=0.0,
+    )
+    torch.manual_seed(0)
+    transformers.BertForSequenceClassification(config).save_pretrained(model_dir)
+    return str(model_dir)
+
+
+def write_dataset(path, rows=20, labels=("neg", "pos")):
+    """生成长度不一的文本分类CSV"""
+    lines = ["text,label"]
+    for i in range(rows):
+        label = labels[i % len(labels)]
+        words = WORDS[:4] if label == labels[-1] else WORDS[4:8]
+        lines.append(" ".join(words[(i + j) % 4] for j in range(1 + i % 6)) + f",{label}")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def make_config(tmp_path, base_model, dataset_path, **overrides):
+    options = dict(
+        job_id=1,
+        dataset_path=dataset_path,
+        output_dir=str(tmp_path / "output"),
+        base_model=base_model,
+        epochs=1,
+        learning_rate=1e-3,
+        batch_size=4,
+        max_seq_length=16,
+        token_cache_dir=str(tmp_path / "token_cache"),
+        cancel_grace_seconds=10.0,
+    )
+    options.update(overrides)
+    return TrainingConfig(**options)
+
+
+def test_one_epoch_in_worker_process(tmp_path, tiny_model):
+    """测试在工作进程中训练一轮：产物写入输出目录，逐步回调包含填充效率"""
+    dataset = write_dataset(tmp_path / "data.csv")
+    callbacks = RecordingCallbacks()
+
+    result = run_worker_processes(make_config(tmp_path, tiny_model, dataset), callbacks)
+
+    assert result["stopped"] is False
+    assert result["artifact_type"] == "full"
+    assert os.path.exists(os.path.join(result["output_dir"], "config.json"))
+    assert [step for step, _, _ in callbacks.steps] == list(range(1, 6))
+    assert all(total == 5 for _, total, _ in callbacks.steps)
+    assert all(0 < metrics["padding_efficiency"] <= 1 for _, _, metrics in callbacks.steps)
+    assert 0 < result["metrics"]["padding_efficiency"] <= 1
+    assert result["metrics"]["steps"] == 5
+    assert callbacks.resources
+
+
+def test_gradient_accumulation_matches_large_batch(tmp_path, tiny_model):
+    """测试4条样本累积2个微批次与8条样本的批次训练结果一致，最后一步的微批次大小不同（4+2）"""
+    dataset = write_dataset(tmp_path / "data.csv", rows=22)
+    options = dict(bucket_by_length=False, shuffle_within_buckets=False)
+    large = make_config(tmp_path / "large", tiny_model, dataset, batch_size=8, **options)
+    accumulated = make_config(
+        tmp_path / "accumulated", tiny_model, dataset, batch_size=4, gradient_accumulation_steps=2, **options
+    )
+    large_callbacks, accumulated_callbacks = RecordingCallbacks(), RecordingCallbacks()
+
+    train_loop(large, large_callbacks)
+    train_loop(accumulated, accumulated_callbacks)
+
+    assert len(large_callbacks.steps) == len(accumulated_callbacks.steps) == 3
+    for (_, _, expected), (_, _, actual) in zip(large_callbacks.steps, accumulated_callbacks.steps):
+        assert actual["loss"] == pytest.approx(expected["loss"], abs=1e-5)
+    expected_weights = transformers.AutoModelForSequenceClassification.from_pretrained(large.output_dir).state_dict()
+    actual_weights = transformers.AutoModelForSequenceClassification.from_pretrained(accumulated.output_dir).state_dict()
+    for name, weight in expected_weights.items():
+        assert torch.allclose(actual_weights[name], weight, atol=1e-5), name
+
+
+def test_data_parallel_two_workers(tmp_path, tiny_model):
+    """测试两个gloo工作进程数据并行训练，批次分片后优化步数减半"""
+    dataset = write_dataset(tmp_path / "data.csv")
+    callbacks = RecordingCallbacks()
+
+    result = run_worker_processes(make_config(tmp_path, tiny_model, dataset, data_parallel_workers=2), callbacks)
+
+    assert result["stopped"] is False
+    assert os.path.exists(os.path.join(result["output_dir"], "config.json"))
+    assert result["metrics"]["data_parallel_workers"] == 2
+    # 5个批次分给2个进程，每个进程3步
+    assert [step for step, _, _ in callbacks.steps] == [1, 2, 3]
+    assert any("gloo" in message for message in callbacks.logs)
+
+
+def test_stop_request_exits_cooperatively(tmp_path, tiny_model):
+    """测试收到停止请求后工作进程在宽限期内自行退出，并保存停止前的检查点"""
+    dataset = write_dataset(tmp_path / "data.csv")
+    callbacks = RecordingCallbacks(stop_after_steps=1)
+    config = make_config(tmp_path, tiny_model, dataset, epochs=20, save_checkpoint_on_stop=True)
+
+    result = run_worker_processes(config, callbacks)
+
+    assert result["stopped"] is True
+    # 未被强制终止，说明工作进程在宽限期内响应了取消标志
+    assert "terminated" not in result
+    assert len(callbacks.steps) < 20 * 5
+    assert os.path.exists(os.path.join(result["output_dir"], "config.json"))
+
+
+@pytest.fixture(scope="module")
+def trained_model(tmp_path_factory, tiny_model):
+    """在neg/pos数据集上训练一轮的产物，用作增量训练的初始化和蒸馏的教师"""
+    tmp_path = tmp_path_factory.mktemp("trained")
+    config = make_config(tmp_path, tiny_model, write_dataset(tmp_path / "data.csv"))
+    return train_loop(config, RecordingCallbacks())["output_dir"]
+
+
+def test_warm_start_continues_from_artifact(tmp_path, tiny_model, trained_model):
+    """测试从标签相同的训练产物继续训练"""
+    dataset = write_dataset(tmp_path / "data.csv")
+    callbacks = RecordingCallbacks()
+
+    result = train_loop(make_config(tmp_path, tiny_model, dataset, init_from=trained_model), callbacks)
+
+    assert result["stopped"] is False
+    assert any(trained_model in message for message in callbacks.logs)
+
+
+def test_warm_start_rejects_label_mismatch(tmp_path, tiny_model, trained_model):
+    """测试数据集标签与初始化产物不一致时拒绝增量训练"""
+    dataset = write_dataset(tmp_path / "data.csv", labels=("a", "b", "c"))
+
+    with pytest.raises(ValueError, match="不一致"):
+        train_loop(make_config(tmp_path, tiny_model, dataset, init_from=trained_model), RecordingCallbacks())
+
+
+def test_distillation_reports_latency_and_size(tmp_path, tiny_model, trained_model):
+    """测试蒸馏模式缓存教师软标签，并输出学生和教师的延迟与大小"""
+    dataset = write_dataset(tmp_path / "data.csv")
+    config = make_config(tmp_path, tiny_model, dataset, mode="distill", teacher_dir=trained_model)
+
+    metrics = train_loop(config, RecordingCallbacks())["metrics"]
+
+    assert metrics["latency_ms"] > 0
+    assert metrics["model_size_bytes"] > 0
+    assert metrics["teacher_latency_ms"] > 0
+    assert metrics["speedup"] > 0
+
+    callbacks = RecordingCallbacks()
+    again = make_config(
+        tmp_path / "again", tiny_model, dataset,
+        mode="distill", teacher_dir=trained_model, token_cache_dir=config.token_cache_dir
+    )
+    train_loop(again, callbacks)
+    assert any("复用已缓存的教师模型软标签" in message for message in callbacks.logs)
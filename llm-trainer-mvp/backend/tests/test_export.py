@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import ExportRequest, PredictionRequest, TrainingRequest
+from app.training.export import benchmark, parity_report
+from app.training.quantize import accuracy_report
+
+
+def test_parity_report_passes_within_tolerance():
+    """测试导出结果在误差范围内时通过一致性校验"""
+    reference = np.array([[0.1, 0.9], [0.8, 0.2]], dtype=np.float32)
+    report = parity_report(reference, reference + 1e-5)
+    assert report["passed"] is True
+    assert report["prediction_agreement"] == 1.0
+
+
+def test_parity_report_detects_mismatch():
+    """测试数值或形状不一致时校验失败"""
+    reference = np.array([[0.1, 0.9], [0.8, 0.2]], dtype=np.float32)
+    report = parity_report(reference, reference[:, ::-1])
+    assert report["passed"] is False
+    assert report["prediction_agreement"] == 0.0
+    assert parity_report(reference, reference[:1])["passed"] is False
+
+
+def test_benchmark_cycles_samples():
+    """测试延迟测量循环取用样本并跳过预热"""
+    seen = []
+    stats = benchmark(lambda inputs: seen.append(inputs["id"]), [{"id": 0}, {"id": 1}])
+    assert set(seen) == {0, 1}
+    assert stats["p50_ms"] <= stats["p90_ms"]
+
+
+def test_export_formats_validation():
+    """测试导出格式校验和去重"""
+    assert ExportRequest().formats == ["onnx", "torchscript"]
+    assert TrainingRequest(dataset_id=1, export_formats=["onnx", "onnx"]).export_formats == ["onnx"]
+    with pytest.raises(ValidationError):
+        ExportRequest(formats=["tflite"])
+    with pytest.raises(ValidationError):
+        ExportRequest(formats=[])
+
+
+def test_quantization_accuracy_report():
+    """测试量化前后准确率对比"""
+    report = accuracy_report([0, 1, 1, 0], [0, 1, 0, 0], [0, 1, 1, 1])
+    assert report["reference_accuracy"] == 0.75
+    assert report["quantized_accuracy"] == 0.5
+    assert report["accuracy_delta"] == -0.25
+    assert report["agreement"] == 0.75
+    assert accuracy_report([], [], [])["accuracy_delta"] is None
+
+
+def test_prediction_variant_requires_model():
+    """测试预测选择量化变体时需要指定训练任务"""
+    assert PredictionRequest(text="hello", model_id=1, variant="int8").variant == "int8"
+    with pytest.raises(ValidationError):
+        PredictionRequest(text="hello", variant="int8")
+    with pytest.raises(ValidationError):
+        PredictionRequest(text="hello", model_id=1, variant="fp16")
@@ -0,0 +1,78 @@
+import os
+import json
+
+import pytest
+
+from app.utils.job_log import JobLog, make_record, format_record, parse_line
+
+
+@pytest.fixture
+def job_log(tmp_path):
+    """写入100条记录、每条约90字节，按1KB轮转得到多个归档分段"""
+    log = JobLog(str(tmp_path / "training_job_1.jsonl"), rotate_bytes=1024)
+    for step in range(100):
+        level = "WARNING" if step % 25 == 0 else "INFO"
+        log.append(make_record(f"message {step}", level, step))
+    return log
+
+
+def test_rotation_compresses_segments_and_builds_index(job_log, tmp_path):
+    """测试超过大小后轮转为压缩分段，索引记录步数范围和级别计数"""
+    with open(job_log.index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    assert len(index) > 1
+    assert all(os.path.exists(tmp_path / segment["file"]) for segment in index)
+    assert all(segment["file"].endswith(".gz") for segment in index)
+    assert index[0]["start_offset"] == 0
+    assert index[1]["start_offset"] == index[0]["bytes"]
+    assert index[0]["min_step"] == 0
+    assert index[0]["levels"]["WARNING"] == 1
+    assert os.path.getsize(job_log.path) < 1024
+
+
+def test_tail_spans_segments(job_log):
+    """测试读取最后N条记录跨越归档分段"""
+    records, offset = job_log.tail(30)
+    assert [r["step"] for r in records] == list(range(70, 100))
+    assert offset == job_log.size()
+
+
+def test_read_after_follows_logical_offsets(job_log):
+    """测试按逻辑偏移量增量读取，跨分段后游标仍然连续"""
+    steps = []
+    offset, has_more = 0, True
+    while has_more:
+        records, offset, has_more = job_log.read_after(offset)
+        steps.extend(r["step"] for r in records)
+    assert steps == list(range(100))
+    assert offset == job_log.size()
+
+
+def test_read_after_advances_past_oversized_archived_record(tmp_path):
+    """测试归档分段中单条记录超过max_bytes时游标仍然前进，不会一直返回has_more"""
+    log = JobLog(str(tmp_path / "training_job_2.jsonl"), rotate_bytes=256)
+    log.append(make_record("x" * 500, "INFO", 1))
+    log.append(make_record("done", "INFO", 2))
+
+    offset, has_more, reads = 0, True, 0
+    while has_more and reads < 20:
+        _, new_offset, has_more = log.read_after(offset, max_bytes=200)
+        assert new_offset > offset or not has_more
+        offset, reads = new_offset, reads + 1
+    assert not has_more
+    assert offset == log.size()
+
+
+def test_query_filters_by_level_and_step(job_log):
+    """测试按级别和步数范围查询"""
+    assert [r["step"] for r in job_log.query(100, level="WARNING")] == [0, 25, 50, 75]
+    assert [r["step"] for r in job_log.query(100, start_step=10, end_step=14)] == [10, 11, 12, 13, 14]
+    assert [r["step"] for r in job_log.query(2, start_step=10, end_step=14)] == [13, 14]
+
+
+def test_legacy_plain_text_lines():
+    """测试结构化之前的纯文本日志按消息解析"""
+    record = parse_line("[2024-01-01 00:00:00] 训练进度: 10%")
+    assert record["level"] == "INFO"
+    assert record["message"] == "[2024-01-01 00:00:00] 训练进度: 10%"
+    assert format_record(record) == "[INFO] [2024-01-01 00:00:00] 训练进度: 10%"
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import numpy as np
+
+from app.training.data import pad_batch
+from app.training.loader import BatchBuffers, BatchPrefetcher, TokenArrays, token_cache_key, write_token_arrays
+
+
+ENCODINGS = [[101, 7, 102], [101, 102], [101, 5, 6, 7, 102], [101, 9, 102]]
+
+
+def test_token_arrays_round_trip(tmp_path):
+    """测试token数组写入后按样本读出一致"""
+    directory = tmp_path / "cache" / "key"
+    write_token_arrays(str(directory), ENCODINGS)
+    arrays = TokenArrays(str(directory))
+    assert len(arrays) == 4
+    assert arrays.lengths.tolist() == [3, 2, 5, 3]
+    assert [arrays[i].tolist() for i in range(4)] == ENCODINGS
+
+    # 相同内容再次写入时保留已有缓存，不留下临时目录
+    write_token_arrays(str(directory), ENCODINGS)
+    assert sorted(p.name for p in (tmp_path / "cache").iterdir()) == ["key"]
+
+
+def test_gather_matches_pad_batch_and_reuses_buffers(tmp_path):
+    """测试组批结果与动态填充一致，并复用预分配缓冲区"""
+    write_token_arrays(str(tmp_path / "key"), ENCODINGS)
+    arrays = TokenArrays(str(tmp_path / "key"))
+    buffers = BatchBuffers(slots=2, batch_size=2, max_seq_length=5)
+
+    input_ids, attention_mask = buffers.gather(arrays, [2, 1], pad_id=0, slot=1)
+    expected_ids, expected_mask = pad_batch([ENCODINGS[2], ENCODINGS[1]], 0)
+    assert input_ids.tolist() == expected_ids
+    assert attention_mask.tolist() == expected_mask
+    assert input_ids.flags["C_CONTIGUOUS"]
+    assert np.shares_memory(input_ids, buffers.input_ids[1])
+
+
+def test_token_cache_key_depends_on_content_and_tokenizer(tmp_path):
+    """测试缓存键随数据内容、分词器和截断长度变化"""
+    path = tmp_path / "data.csv"
+    path.write_text("text,label\na,x\n")
+    key = token_cache_key(str(path), "bert-base-uncased", 128)
+    assert key == token_cache_key(str(path), "bert-base-uncased", 128)
+    assert key != token_cache_key(str(path), "bert-base-uncased", 64)
+    assert key != token_cache_key(str(path), "distilbert-base-uncased", 128)
+    path.write_text("text,label\nb,x\n")
+    assert key != token_cache_key(str(path), "bert-base-uncased", 128)
+
+
+def test_prefetcher_preserves_order_and_never_overwrites_live_slot():
+    """测试预取保持批次顺序，且正在使用的批次的槽位不会被后台线程改写"""
+    batches = [[i] for i in range(20)]
+    slots_in_use = {}
+    lock = threading.Lock()
+
+    def assemble(batch, slot):
+        time.sleep(0.001)
+        with lock:
+            slots_in_use[slot] = batch[0]
+        return batch[0], slot
+
+    prefetcher = BatchPrefetcher(batches, assemble, num_workers=3, prefetch=4)
+    seen = []
+    for value, slot in prefetcher:
+        time.sleep(0.002)
+        with lock:
+            assert slots_in_use[slot] == value
+        seen.append(value)
+    assert seen == list(range(20))
+    assert prefetcher.wait_seconds >= 0
+
+
+def test_prefetcher_stops_early_and_measures_wait():
+    """测试提前结束迭代时关闭线程池，同步组批时等待时间计入组批耗时"""
+    prefetcher = BatchPrefetcher([[i] for i in range(100)], lambda batch, slot: batch, num_workers=2, prefetch=2)
+    stream = iter(prefetcher)
+    assert next(stream) == [0]
+    stream.close()
+
+    slow = BatchPrefetcher([[0], [1]], lambda batch, slot: time.sleep(0.01) or batch, num_workers=0)
+    assert list(slow) == [[0], [1]]
+    assert slow.wait_seconds >= 0.02
@@ -0,0 +1,74 @@
+import pytest
+
+from app.utils.log_tail import tail_lines, read_from_offset
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """创建一个包含100行的日志文件"""
+    path = tmp_path / "training_job_1.log"
+    path.write_text("".join(f"line {i}\n" for i in range(100)), encoding="utf-8")
+    return path
+
+
+def test_tail_lines_returns_last_lines(log_file):
+    """测试反向分块读取最后N行"""
+    assert tail_lines(str(log_file), 3) == ["line 97", "line 98", "line 99"]
+    # 小块大小强制多次seek
+    assert tail_lines(str(log_file), 5, block_size=7) == [f"line {i}" for i in range(95, 100)]
+
+
+def test_tail_lines_more_than_file(log_file):
+    """测试请求行数超过文件行数时返回全部"""
+    result = tail_lines(str(log_file), 1000)
+    assert len(result) == 100
+    assert result[0] == "line 0"
+
+
+def test_tail_lines_respects_end_offset(log_file):
+    """测试按截止偏移量读取"""
+    end = len("".join(f"line {i}\n" for i in range(10)))
+    assert tail_lines(str(log_file), 2, end=end) == ["line 8", "line 9"]
+
+
+def test_read_from_offset_returns_only_new_lines(log_file):
+    """测试游标只返回新增的完整行"""
+    size = log_file.stat().st_size
+    logs, offset, has_more = read_from_offset(str(log_file), size)
+    assert logs == [] and offset == size and not has_more
+
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write("new 1\nnew 2\npartial")
+
+    logs, offset, has_more = read_from_offset(str(log_file), offset)
+    assert logs == ["new 1", "new 2"]
+    assert not has_more
+
+    # 未写完的行在补全后返回
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(" done\n")
+    logs, offset, _ = read_from_offset(str(log_file), offset)
+    assert logs == ["partial done"]
+    assert offset == log_file.stat().st_size
+
+
+def test_read_from_offset_paginates_by_max_bytes(log_file):
+    """测试单次读取上限与has_more标记"""
+    logs, offset, has_more = read_from_offset(str(log_file), 0, max_bytes=20)
+    assert logs == ["line 0", "line 1"]
+    assert has_more
+
+    collected = list(logs)
+    while has_more:
+        logs, offset, has_more = read_from_offset(str(log_file), offset, max_bytes=20)
+        collected.extend(logs)
+    assert collected == [f"line {i}" for i in range(100)]
+
+
+def test_read_from_offset_restarts_after_truncate(log_file):
+    """测试文件被截断后从头读取"""
+    size = log_file.stat().st_size
+    log_file.write_text("fresh\n", encoding="utf-8")
+    logs, offset, _ = read_from_offset(str(log_file), size)
+    assert logs == ["fresh"]
+    assert offset == len("fresh\n")
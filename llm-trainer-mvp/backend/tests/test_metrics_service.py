@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlmodel import Session
+
+from app.models import TrainingJob
+from app.services import metrics_service as metrics_module
+from app.services.metrics_service import MetricsService
+
+
+@pytest.fixture
+def service(test_db_engine, monkeypatch):
+    @contextmanager
+    def db_context():
+        with Session(test_db_engine) as session:
+            yield session
+            session.commit()
+
+    monkeypatch.setattr(metrics_module, "get_db_context", db_context)
+    with db_context() as session:
+        session.add(TrainingJob(id=1, dataset_id=1, user_id=1))
+    return MetricsService()
+
+
+async def test_series_includes_unflushed_metrics(service):
+    """测试运行中任务尚未写入数据库的指标也出现在查询结果中"""
+    service.flush_size = 4
+    for step in range(1, 4):
+        service.record(1, step, {"loss": 1.0 / step, "accuracy": None})
+    assert service._buffers[1]
+
+    result = await service.get_metric_series(1)
+    assert result["series"]["loss"]["steps"] == [1, 2, 3]
+    assert "accuracy" not in result["series"]
+
+
+async def test_series_merges_flushed_and_buffered_metrics(service):
+    """测试已写入和缓冲中的指标按步数合并"""
+    service.flush_size = 2
+    for step in range(1, 6):
+        service.record(1, step, {"loss": float(step)})
+
+    result = await service.get_metric_series(1, names=["loss"])
+    assert result["series"]["loss"]["steps"] == [1, 2, 3, 4, 5]
+    assert result["series"]["loss"]["values"] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert result["series"]["loss"]["total_points"] == 5
@@ -0,0 +1,114 @@
+import asyncio
+
+from app.utils.micro_batch import MicroBatcher
+
+
+def test_concurrent_requests_share_one_batch():
+    """测试等待时间内到达的并发请求合并为一次批量推理，结果按请求分发"""
+    batches = []
+
+    async def run_batch(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        await batcher.close()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(main())
+    assert results == [0, 10, 20, 30, 40]
+    assert batches == [[0, 1, 2, 3, 4]]
+    assert stats["avg_batch_size"] == 5
+    assert stats["p50_ms"] <= stats["p99_ms"]
+
+
+def test_full_batch_runs_without_waiting():
+    """测试达到批次上限时立即执行，剩余请求进入下一批"""
+    batches = []
+
+    async def run_batch(items):
+        batches.append(list(items))
+        return items
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait_ms=10000)
+        results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(4))), 5)
+        await batcher.close()
+        return results
+
+    assert asyncio.run(main()) == [0, 1, 2, 3]
+    assert batches == [[0, 1], [2, 3]]
+
+
+def test_batch_error_propagates_to_every_request():
+    """测试批量推理失败时该批次的所有请求都收到异常"""
+    async def run_batch(items):
+        raise RuntimeError("boom")
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=5)
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        await batcher.close()
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_close_fails_inflight_and_queued_requests():
+    """测试关闭时执行中的批次和排队的请求都收到异常，不会一直等待"""
+    started = asyncio.Event()
+
+    async def run_batch(items):
+        started.set()
+        await asyncio.Event().wait()
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=1, max_wait_ms=5)
+        inflight = asyncio.ensure_future(batcher.submit(1))
+        await started.wait()
+        queued = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        await batcher.close()
+        return await asyncio.wait_for(asyncio.gather(inflight, queued, return_exceptions=True), 1)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_requests_of_stopped_worker_fail_before_restart():
+    """测试后台任务意外退出后，下一次提交先让旧队列中的请求失败，再启动新的后台任务"""
+    started = asyncio.Event()
+
+    async def run_batch(items):
+        started.set()
+        if items == [1]:
+            await asyncio.Event().wait()
+        return items
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=1, max_wait_ms=5)
+        inflight = asyncio.ensure_future(batcher.submit(1))
+        await started.wait()
+        queued = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        batcher._worker.cancel()
+        await asyncio.sleep(0)
+        result = await asyncio.wait_for(batcher.submit(3), 1)
+        stale = await asyncio.wait_for(asyncio.gather(inflight, queued, return_exceptions=True), 1)
+        await batcher.close()
+        return result, stale
+
+    result, stale = asyncio.run(main())
+    assert result == 3
+    assert all(isinstance(error, RuntimeError) for error in stale)
+
+
+def test_stats_before_any_request():
+    """测试没有请求时统计为空"""
+    stats = MicroBatcher(lambda items: None, max_batch_size=4, max_wait_ms=5).stats()
+    assert stats["requests"] == 0
+    assert stats["avg_batch_size"] is None
+    assert stats["p99_ms"] is None
@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services import prediction_service as prediction_module
+from app.services.prediction_service import PredictionService
+from app.training.serving import Predictor, softmax
+from app.utils.model_cache import ModelCache
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    """测试超出字节上限时淘汰最久未使用的模型"""
+    cache = ModelCache(max_bytes=100)
+    assert cache.put("a", "model-a", 40)
+    assert cache.put("b", "model-b", 40)
+    assert cache.get("a") == "model-a"
+    assert cache.put("c", "model-c", 40)
+
+    assert cache.peek("b") is None
+    assert cache.get("a") == "model-a"
+    stats = cache.stats()
+    assert [model["key"] for model in stats["models"]] == ["c", "a"]
+    assert stats["bytes"] == 80
+    assert stats["evictions"] == 1
+
+
+def test_cache_counts_hits_and_misses():
+    """测试命中和未命中计数，peek不计入统计"""
+    cache = ModelCache(max_bytes=100)
+    assert cache.get("a") is None
+    cache.put("a", "model-a", 10)
+    cache.get("a")
+    cache.peek("a")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_pinned_models_are_not_evicted():
+    """测试固定的模型不被淘汰，超出剩余容量的未固定模型不缓存"""
+    cache = ModelCache(max_bytes=100)
+    cache.pin("a")
+    cache.put("a", "model-a", 70)
+    cache.put("b", "model-b", 30)
+    cache.put("c", "model-c", 30)
+    assert cache.peek("a") == "model-a"
+    assert cache.peek("b") is None
+    assert cache.put("d", "model-d", 40) is False
+
+    cache.pin("e")
+    assert cache.put("e", "model-e", 50)
+    assert cache.stats()["bytes"] == 120
+    cache.unpin("a")
+    assert cache.peek("a") is None
+    assert cache.stats()["bytes"] == 50
+
+
+def test_invalidate_keeps_pin():
+    """测试丢弃缓存的模型后固定状态保留，重新放入的模型仍不被淘汰"""
+    cache = ModelCache(max_bytes=100)
+    cache.pin("a")
+    cache.put("a", "old-a", 60)
+    cache.invalidate("a")
+    assert cache.peek("a") is None
+    assert cache.stats()["bytes"] == 0
+    cache.put("a", "new-a", 60)
+    cache.put("b", "model-b", 60)
+    assert cache.peek("a") == "new-a"
+
+
+async def test_service_reloads_invalidated_and_keeps_one_uncached_model(monkeypatch):
+    """测试超出缓存容量的模型只加载一次，重新导出后丢弃旧模型并重新加载"""
+    loads = []
+
+    def load_predictor(path, artifact_type, max_seq_length):
+        loads.append(path)
+        return SimpleNamespace(path=path, size_bytes=1000)
+
+    monkeypatch.setattr(prediction_module, "load_predictor", load_predictor)
+    service = PredictionService()
+    service.model_cache = ModelCache(max_bytes=100)
+    model_info = {
+        "cache_key": "artifact:1", "model_name": "m", "model_path": "m",
+        "artifact_type": "onnx", "max_seq_length": 16,
+    }
+
+    first = await service._get_predictor(model_info)
+    assert await service._get_predictor(model_info) is first
+    assert loads == ["m"]
+    assert service.get_cache_stats()["uncached_model"] == "artifact:1"
+
+    service.invalidate_model("artifact:1")
+    assert await service._get_predictor(model_info) is not first
+    assert loads == ["m", "m"]
+
+
+def test_softmax_rows_sum_to_one():
+    """测试softmax按行归一化且数值稳定"""
+    probabilities = softmax(np.array([[1000.0, 1000.0], [0.0, np.log(3.0)]]))
+    assert np.allclose(probabilities.sum(axis=-1), 1.0)
+    assert np.allclose(probabilities, [[0.5, 0.5], [0.25, 0.75]])
+
+
+def test_predictor_returns_label_and_confidence_per_text():
+    """测试推理模型按批次输出每条文本的类别和置信度"""
+    def tokenizer(texts, **kwargs):
+        width = max(len(text) for text in texts)
+        return {
+            "input_ids": np.array([[1] * len(text) + [0] * (width - len(text)) for text in texts]),
+            "attention_mask": np.array([[1] * len(text) + [0] * (width - len(text)) for text in texts]),
+        }
+
+    def run(inputs):
+        lengths = inputs["attention_mask"].sum(axis=-1)
+        return np.stack([lengths.astype(float), 3.0 - lengths], axis=-1)
+
+    predictor = Predictor(tokenizer, run, {0: "long", 1: "short"}, max_seq_length=16, size_bytes=1)
+    results = predictor.predict(["abc", "a"])
+    assert [label for label, _ in results] == ["long", "short"]
+    assert all(0.5 < confidence <= 1.0 for _, confidence in results)
@@ -0,0 +1,180 @@
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+
+from app.core.errors import InvalidParamsException
+from app.schemas import PipelineStep
+from app.services.pipeline_service import clean_dataframe, step_input_hash, topological_order
+
+
+def _step(name, type_="train", depends_on=None, **params):
+    return PipelineStep(name=name, type=type_, depends_on=depends_on or [], params=params)
+
+
+def test_topological_order_respects_dependencies():
+    """测试拓扑顺序中依赖总在被依赖步骤之前"""
+    steps = [
+        _step("export", "export", ["train"]),
+        _step("evaluate", "evaluate", ["train"]),
+        _step("train", "train", ["clean"]),
+        _step("clean", "preprocess", dataset_id=1),
+    ]
+    order = topological_order(steps)
+    assert order.index("clean") < order.index("train") < order.index("evaluate")
+    assert order.index("train") < order.index("export")
+
+
+def test_topological_order_rejects_invalid_graphs():
+    """测试重复名称、未知依赖和循环依赖被拒绝"""
+    with pytest.raises(InvalidParamsException):
+        topological_order([_step("a"), _step("a")])
+    with pytest.raises(InvalidParamsException):
+        topological_order([_step("a", depends_on=["missing"])])
+    with pytest.raises(InvalidParamsException):
+        topological_order([_step("a", depends_on=["b"]), _step("b", depends_on=["a"])])
+
+
+def test_input_hash_is_stable_and_propagates_changes():
+    """测试输入哈希与参数顺序无关，且参数、上游和源数据变化都会改变哈希"""
+    base = step_input_hash("train", {"epochs": 3, "learning_rate": 1e-4}, ["u1", "u2"], "src")
+    assert base == step_input_hash("train", {"learning_rate": 1e-4, "epochs": 3}, ["u2", "u1"], "src")
+    assert base != step_input_hash("train", {"epochs": 4, "learning_rate": 1e-4}, ["u1", "u2"], "src")
+    assert base != step_input_hash("train", {"epochs": 3, "learning_rate": 1e-4}, ["u1", "u3"], "src")
+    assert base != step_input_hash("train", {"epochs": 3, "learning_rate": 1e-4}, ["u1", "u2"], "other")
+    assert base != step_input_hash("evaluate", {"epochs": 3, "learning_rate": 1e-4}, ["u1", "u2"], "src")
+
+
+def test_clean_dataframe_strips_filters_and_dedupes():
+    """测试数据清洗去除空白、空文本、长度不符和重复样本"""
+    df = pd.DataFrame({
+        "text": ["  hello ", "hello", "", "a", "Longer text here", None],
+        "label": ["pos", "pos", "neg", "neg", "neg", "pos"],
+    })
+    cleaned = clean_dataframe(df, {"min_length": 2})
+    assert cleaned["text"].tolist() == ["hello", "Longer text here"]
+
+    kept = clean_dataframe(df, {"dedupe": False, "lowercase": True})
+    assert kept["text"].tolist() == ["hello", "hello", "a", "longer text here"]
+
+
+@pytest.fixture
+def pipeline_db(test_db_engine, monkeypatch):
+    """流水线服务使用测试数据库，并创建一个单步骤流水线"""
+    from contextlib import contextmanager
+
+    from sqlmodel import Session
+
+    from app.models import TrainingPipeline
+    from app.services import pipeline_service as pipeline_module
+
+    @contextmanager
+    def db_context():
+        with Session(test_db_engine, expire_on_commit=False) as session:
+            yield session
+            session.commit()
+
+    monkeypatch.setattr(pipeline_module, "get_db_context", db_context)
+    with db_context() as session:
+        session.add(TrainingPipeline(id=1, user_id=1, name="p", steps=json.dumps([_step("train", dataset_id=1).dict()])))
+    return db_context
+
+
+def _pipeline_state(db_context, run_number):
+    from sqlmodel import select
+
+    from app.models import PipelineStepRun, TrainingPipeline
+
+    with db_context() as session:
+        runs = session.exec(select(PipelineStepRun).where(PipelineStepRun.run_number == run_number)).all()
+        return session.get(TrainingPipeline, 1).status, [run.status for run in runs]
+
+
+async def test_interrupted_execution_marks_pipeline_failed(pipeline_db, monkeypatch):
+    """测试执行被中断时流水线和未完成的步骤记为失败，之后可以重新运行"""
+    from app.services.pipeline_service import PipelineService
+
+    service = PipelineService()
+
+    async def hang(*args):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(service, "_run_step", hang)
+    await service.run_pipeline(1)
+    task = service._tasks[1]
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert _pipeline_state(pipeline_db, 1) == ("failed", ["failed"])
+    assert (await service.run_pipeline(1))["run_number"] == 2
+    service._tasks[1].cancel()
+
+
+async def test_stale_running_pipeline_can_be_rerun(pipeline_db, monkeypatch):
+    """测试服务重启后遗留的running状态不阻止重新运行，启动时恢复为失败"""
+    from app.services.pipeline_service import PipelineService
+
+    service = PipelineService()
+
+    async def hang(*args):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(service, "_run_step", hang)
+    await service.run_pipeline(1)
+    # 模拟服务重启：新的服务实例中没有该流水线的执行任务
+    service._tasks.pop(1).cancel()
+    restarted = PipelineService()
+    monkeypatch.setattr(restarted, "_run_step", hang)
+
+    assert (await restarted.run_pipeline(1))["run_number"] == 2
+    assert _pipeline_state(pipeline_db, 1)[1] == ["failed"]
+    with pytest.raises(InvalidParamsException):
+        await restarted.run_pipeline(1)
+
+    restarted._tasks.pop(1).cancel()
+    assert PipelineService().recover_interrupted_runs() == 1
+    assert _pipeline_state(pipeline_db, 2) == ("failed", ["failed"])
+
+
+def test_artifact_lookup_skips_export_variants(pipeline_db):
+    """测试训练步骤取训练产物，而不是之后登记的导出变体"""
+    from app.models import ModelArtifact
+    from app.services.pipeline_service import PipelineService
+
+    with pipeline_db() as session:
+        session.add(ModelArtifact(id=1, training_job_id=1, user_id=1, name="m", file_path="m"))
+        session.add(ModelArtifact(
+            id=2, training_job_id=1, user_id=1, name="m-onnx", file_path="m/onnx", artifact_type="onnx", source_artifact_id=1
+        ))
+
+    assert PipelineService()._get_artifact(1).file_path == "m"
+
+
+async def test_export_step_uses_export_service(pipeline_db, monkeypatch, tmp_path):
+    """测试导出步骤通过导出服务导出训练产物，任一格式失败时步骤失败"""
+    from app.models import ModelArtifact
+    from app.services import pipeline_service as pipeline_module
+    from app.services.pipeline_service import PipelineService
+
+    with pipeline_db() as session:
+        session.add(ModelArtifact(id=1, training_job_id=1, user_id=1, name="m", file_path=str(tmp_path)))
+    calls = []
+
+    async def export_artifact(artifact_id, formats):
+        calls.append((artifact_id, formats))
+        return [{"format": fmt, "artifact_id": 10 + i} if fmt != "int8" else {"format": fmt, "error": "精度下降"}
+                for i, fmt in enumerate(formats)]
+
+    monkeypatch.setattr(pipeline_module.export_service, "check_formats", lambda formats: None)
+    monkeypatch.setattr(pipeline_module.export_service, "export_artifact", export_artifact)
+    service = PipelineService()
+
+    outputs = await service._run_export(_step("export", "export", formats=["onnx", "torchscript"]), {"training_job_id": 1}, 1)
+    assert outputs["variants"] == {"onnx": 10, "torchscript": 11}
+    assert calls == [(1, ["onnx", "torchscript"])]
+    with pytest.raises(Exception, match="精度下降"):
+        await service._run_export(_step("export", "export", formats=["int8"]), {"training_job_id": 1}, 1)
+    with pytest.raises(InvalidParamsException):
+        await service._run_export(_step("export", "export", formats=["zip"]), {"training_job_id": 1}, 1)
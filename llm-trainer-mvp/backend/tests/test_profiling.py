@@ -0,0 +1,54 @@
+import time
+
+from app.training.profiling import PhaseTimer, build_profile_report, profile_window
+
+
+def test_phase_timer_accumulates_phases_and_other():
+    """测试分阶段耗时累计，阶段之外的耗时计入other"""
+    timer = PhaseTimer()
+    for _ in range(2):
+        start = time.perf_counter()
+        with timer.phase("data"):
+            time.sleep(0.002)
+        with timer.phase("forward"):
+            time.sleep(0.004)
+        with timer.phase("forward"):
+            time.sleep(0.004)
+        time.sleep(0.002)
+        timer.end_step(time.perf_counter() - start)
+
+    rows = {row["phase"]: row for row in timer.summary()}
+    assert list(rows) == ["data", "forward", "backward", "optimizer", "other"]
+    assert timer.steps == 2
+    assert rows["forward"]["total_seconds"] > rows["data"]["total_seconds"]
+    assert rows["backward"]["total_seconds"] == 0
+    assert rows["other"]["total_seconds"] > 0
+    assert abs(sum(row["fraction"] for row in rows.values()) - 1) < 0.01
+
+
+def test_disabled_timer_records_nothing():
+    """测试未开启性能分析时不记录"""
+    timer = PhaseTimer(enabled=False)
+    with timer.phase("data"):
+        pass
+    timer.end_step(1.0)
+    assert timer.steps == 0
+    assert all(row["total_seconds"] == 0 for row in timer.summary())
+
+
+def test_profile_window_covers_requested_steps():
+    """测试采样窗口从指定优化步开始"""
+    assert profile_window(3, 5) == {"wait": 1, "warmup": 1, "active": 5}
+    assert profile_window(1, 2) == {"wait": 0, "warmup": 0, "active": 2}
+    window = profile_window(10, 4)
+    assert window["wait"] + window["warmup"] + 1 == 10
+
+
+def test_report_includes_phase_table():
+    """测试报告包含阶段表格和采样窗口"""
+    timer = PhaseTimer()
+    timer.end_step(0.5)
+    report = build_profile_report(timer, None, [3, 7], "table")
+    assert report["trace_window"] == [3, 7]
+    assert report["operators"] == []
+    assert report["phase_table"].splitlines()[0].split() == ["phase", "total_s", "mean_ms", "fraction"]
@@ -0,0 +1,79 @@
+import asyncio
+
+from app.services.progress_broker import ProgressBroker
+
+
+async def test_publish_fans_out_to_all_subscribers():
+    """测试一次发布被所有订阅者收到"""
+    broker = ProgressBroker()
+    q1 = broker.subscribe(1)
+    q2 = broker.subscribe(1)
+
+    broker.publish(1, "progress", {"progress": 10.0})
+
+    for queue in (q1, q2):
+        message = queue.get_nowait()
+        assert message["event"] == "progress"
+        assert message["data"]["progress"] == 10.0
+
+
+async def test_publish_without_subscribers_is_noop():
+    """测试没有订阅者时发布不报错"""
+    broker = ProgressBroker()
+    broker.publish(42, "log", {"line": "hello"})
+    assert broker.subscriber_count(42) == 0
+
+
+async def test_slow_subscriber_drops_oldest_event():
+    """测试队列满时丢弃最旧事件"""
+    broker = ProgressBroker(max_queue_size=2)
+    queue = broker.subscribe(1)
+
+    for progress in (10.0, 20.0, 30.0):
+        broker.publish(1, "progress", {"progress": progress})
+
+    assert queue.qsize() == 2
+    assert queue.get_nowait()["data"]["progress"] == 20.0
+    assert queue.get_nowait()["data"]["progress"] == 30.0
+
+
+async def test_listen_stops_on_terminal_status():
+    """测试收到结束状态后监听结束并自动取消订阅"""
+    broker = ProgressBroker()
+    received = []
+
+    async def consume():
+        async for message in broker.listen(1, heartbeat=1):
+            received.append(message)
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+    assert broker.subscriber_count(1) == 1
+
+    broker.publish(1, "progress", {"progress": 50.0})
+    broker.publish(1, "status", {"status": "completed"})
+    await asyncio.wait_for(task, timeout=1)
+
+    assert [m["event"] for m in received] == ["progress", "status"]
+    assert broker.subscriber_count(1) == 0
+
+
+async def test_listen_yields_heartbeat_on_timeout():
+    """测试超时未收到事件时产出心跳"""
+    broker = ProgressBroker()
+    stream = broker.listen(1, heartbeat=0.01)
+    assert await stream.__anext__() is None
+    await stream.aclose()
+    assert broker.subscriber_count(1) == 0
+
+
+async def test_listen_receives_events_published_before_iteration():
+    """测试先订阅的队列在开始监听前收到的结束状态不会丢失"""
+    broker = ProgressBroker()
+    queue = broker.subscribe(1)
+    broker.publish(1, "status", {"status": "completed"})
+
+    received = [message async for message in broker.listen(1, heartbeat=1, queue=queue)]
+
+    assert [m["data"]["status"] for m in received] == ["completed"]
+    assert broker.subscriber_count(1) == 0
@@ -0,0 +1,53 @@
+import os
+
+from app.training.resources import ResourceSampler, read_process_usage
+
+
+def write_proc(root, pid, utime, stime, resident_pages, read_bytes=0, write_bytes=0):
+    """在临时目录中构造/proc/<pid>的stat、statm和io文件"""
+    base = root / str(pid)
+    base.mkdir(exist_ok=True)
+    fields = ["S"] + ["0"] * 10 + [str(utime), str(stime)] + ["0"] * 30
+    (base / "stat").write_text(f"{pid} (python worker) {' '.join(fields)}\n")
+    (base / "statm").write_text(f"1000 {resident_pages} 0 0 0 0 0\n")
+    (base / "io").write_text(f"rchar: 1\nwchar: 1\nread_bytes: {read_bytes}\nwrite_bytes: {write_bytes}\n")
+
+
+def test_read_process_usage_parses_proc_files(tmp_path):
+    """测试解析CPU时间、常驻内存和读写字节数，进程名含空格和括号"""
+    from app.training import resources
+
+    write_proc(tmp_path, 7, utime=resources.CLOCK_TICKS * 2, stime=resources.CLOCK_TICKS, resident_pages=10, read_bytes=4096)
+    usage = read_process_usage(7, str(tmp_path))
+    assert usage["cpu_seconds"] == 3.0
+    assert usage["rss_bytes"] == 10 * resources.PAGE_SIZE
+    assert usage["read_bytes"] == 4096
+    assert read_process_usage(8, str(tmp_path)) is None
+
+
+def test_sampler_keeps_counters_of_exited_workers(tmp_path):
+    """测试进程退出后累计值仍计入汇总，内存按各次采样之和计算峰值和平均值"""
+    from app.training import resources
+
+    write_proc(tmp_path, 1, utime=resources.CLOCK_TICKS, stime=0, resident_pages=100, write_bytes=10)
+    write_proc(tmp_path, 2, utime=resources.CLOCK_TICKS, stime=0, resident_pages=300, write_bytes=20)
+    sampler = ResourceSampler(str(tmp_path))
+    sampler.sample([1, 2])
+    for name in os.listdir(tmp_path / "2"):
+        os.remove(tmp_path / "2" / name)
+    sampler.sample([1, 2])
+
+    summary = sampler.summary(examples_per_sec=12.5)
+    assert summary["cpu_seconds"] == 2.0
+    assert summary["write_bytes"] == 30
+    assert summary["peak_rss_bytes"] == 400 * resources.PAGE_SIZE
+    assert summary["avg_rss_bytes"] == 250 * resources.PAGE_SIZE
+    assert summary["examples_per_sec"] == 12.5
+
+
+def test_sampler_reads_current_process():
+    """测试在Linux上能采样当前进程"""
+    sampler = ResourceSampler()
+    sampler.sample([os.getpid()])
+    if os.path.exists("/proc/self/stat"):
+        assert sampler.summary()["peak_rss_bytes"] > 0
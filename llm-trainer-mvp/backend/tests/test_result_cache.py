@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import Session
+
+from app.models import ModelArtifact
+from app.schemas import TrainingRequest
+from app.services import training_service as training_module
+from app.services.training_service import training_service
+
+
+class DatasetSession:
+    """只提供按ID获取数据集的会话替身"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get(self, model, dataset_id):
+        return SimpleNamespace(file_path=str(self.path))
+
+
+@pytest.fixture
+def session(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("text,label\ngood,pos\nbad,neg\n", encoding="utf-8")
+    return DatasetSession(path)
+
+
+def fingerprint(session, **options):
+    return training_service._training_fingerprint(session, TrainingRequest(dataset_id=1, **options), None, None)
+
+
+def test_fingerprint_ignores_fields_that_do_not_change_results(session):
+    """测试描述、force、性能分析和检查点保存等字段不影响训练结果指纹"""
+    base = fingerprint(session)
+    assert fingerprint(session, description="again", force=True, profile=True, export_formats=["onnx"]) == base
+    assert fingerprint(
+        session, save_checkpoint_on_stop=True, save_optimizer_state=True, data_parallel_workers=2,
+        gradient_checkpointing=True
+    ) == base
+
+
+def test_fingerprint_changes_with_hyperparameters_and_seed(session):
+    """测试超参数和随机种子改变训练结果指纹"""
+    base = fingerprint(session)
+    assert fingerprint(session, learning_rate=1e-4) != base
+    assert fingerprint(session, seed=7) != base
+    assert fingerprint(session, mode="distill", teacher_job_id=2) != base
+
+
+def test_fingerprint_changes_with_dataset_content(session):
+    """测试数据集内容变化后训练结果指纹改变"""
+    base = fingerprint(session)
+    session.path.write_text("text,label\ngood,pos\nbad,neg\nok,pos\n", encoding="utf-8")
+    assert fingerprint(session) != base
+
+
+def test_missing_export_formats_skips_existing_variants(test_db_engine, monkeypatch):
+    """测试复用已完成任务时只补充尚未导出的格式"""
+    monkeypatch.setattr(training_module, "engine_available", lambda: True)
+    with Session(test_db_engine) as db:
+        db.add(ModelArtifact(id=1, training_job_id=1, user_id=1, name="m", file_path="m"))
+        db.add(ModelArtifact(id=2, training_job_id=1, user_id=1, name="m-onnx", file_path="m-onnx",
+                             artifact_type="onnx", source_artifact_id=1))
+        db.commit()
+        assert training_service._missing_export_formats(db, 1, ["onnx", "int8"]) == ["int8"]
+        assert training_service._missing_export_formats(db, 1, ["onnx"]) == []
+        assert training_service._missing_export_formats(db, 1, []) == []
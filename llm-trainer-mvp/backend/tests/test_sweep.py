@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import Session, select
+
+from app.core.errors import InvalidParamsException
+from app.models import TrainingJob, TrainingSweep
+from app.schemas import SearchRange, SweepRequest
+from app.services import sweep_service as sweep_module
+from app.services.sweep_service import AshaScheduler, SweepService, check_sweep_metric, expand_search_space
+
+
+def test_grid_expands_cartesian_product():
+    """测试网格搜索展开为笛卡尔积"""
+    configs = expand_search_space(
+        "grid", {"learning_rate": [1e-5, 1e-4], "batch_size": [8, 16, 32]}, max_trials=10
+    )
+    assert len(configs) == 6
+    assert {"learning_rate": 1e-4, "batch_size": 32} in configs
+    assert all(isinstance(c["batch_size"], int) for c in configs)
+
+
+def test_grid_rejects_ranges_and_too_many_trials():
+    """测试网格搜索不接受范围且受max_trials限制"""
+    with pytest.raises(InvalidParamsException):
+        expand_search_space("grid", {"learning_rate": SearchRange(min=1e-5, max=1e-3)}, max_trials=10)
+    with pytest.raises(InvalidParamsException):
+        expand_search_space("grid", {"batch_size": [8, 16, 32]}, max_trials=2)
+
+
+def test_random_search_is_seeded_and_within_range():
+    """测试随机搜索可复现且取值在范围内"""
+    space = {
+        "learning_rate": SearchRange(min=1e-5, max=1e-3, log=True),
+        "epochs": [1, 2, 3],
+    }
+    first = expand_search_space("random", space, max_trials=8, seed=7)
+    second = expand_search_space("random", space, max_trials=8, seed=7)
+    assert first == second
+    assert len(first) == 8
+    assert all(1e-5 <= c["learning_rate"] <= 1e-3 for c in first)
+    assert all(c["epochs"] in (1, 2, 3) for c in first)
+
+
+def test_unknown_parameter_rejected():
+    """测试不支持的参数被拒绝"""
+    with pytest.raises(InvalidParamsException):
+        expand_search_space("grid", {"dropout": [0.1]}, max_trials=10)
+
+
+def test_asha_rungs():
+    """测试检查点为grace_epochs * reduction_factor^k"""
+    asha = AshaScheduler(reduction_factor=3, grace_epochs=1)
+    assert [e for e in range(1, 30) if asha.is_rung(e)] == [1, 3, 9, 27]
+
+
+def test_asha_stops_trials_outside_top_fraction():
+    """测试到达检查点时只保留前1/reduction_factor的试验"""
+    asha = AshaScheduler(reduction_factor=3, grace_epochs=1, mode="min")
+    assert asha.report(1, 1, 0.5)       # 第一个到达的试验继续
+    assert not asha.report(2, 1, 0.9)   # 比已有结果差
+    assert asha.report(3, 1, 0.3)       # 新的最优
+    # 非检查点轮次不做淘汰
+    assert asha.report(1, 2, 0.45)
+
+
+def test_asha_max_mode_and_best_trial():
+    """测试max方向及最优试验选择"""
+    asha = AshaScheduler(reduction_factor=2, grace_epochs=1, mode="max")
+    assert asha.report(1, 1, 0.6)
+    assert asha.report(2, 1, 0.8)
+    assert not asha.report(3, 1, 0.1)
+    asha.report(2, 2, 0.85)
+    asha.report(1, 2, 0.9)
+    # 被淘汰的试验即使早期指标更好也不参与最终比较
+    assert asha.best_trial() == 1
+
+
+def test_sweep_metric_must_be_reported_by_trials():
+    """测试比较指标必须是试验每轮会上报的指标，验证集指标需要划分验证集"""
+    check_sweep_metric("eval_loss", 0.1)
+    check_sweep_metric("train_loss", 0)
+    with pytest.raises(InvalidParamsException):
+        check_sweep_metric("eval_loss", 0)
+    with pytest.raises(InvalidParamsException):
+        check_sweep_metric("f1", 0.1)
+
+
+@pytest.fixture
+def db_context(test_db_engine, monkeypatch):
+    @contextmanager
+    def db_context():
+        with Session(test_db_engine) as session:
+            yield session
+            session.commit()
+
+    monkeypatch.setattr(sweep_module, "get_db_context", db_context)
+    return db_context
+
+
+def test_missing_metric_stops_trial(db_context):
+    """测试试验没有上报比较指标时停止，而不是当作继续训练"""
+    with db_context() as session:
+        session.add(TrainingSweep(id=1, dataset_id=1, user_id=1, search_space="{}", metric="eval_loss"))
+    service = SweepService()
+    service._schedulers[1] = AshaScheduler()
+
+    assert service.report_epoch(10, 1, 1, {"eval_loss": 0.5})
+    assert not service.report_epoch(11, 1, 1, {"train_loss": 0.5})
+
+
+async def test_failed_trial_creation_rolls_back_sweep(db_context, monkeypatch):
+    """测试某个试验创建失败时删除已创建的试验，搜索标记为失败且不保留ASHA状态"""
+    def create_job(session, request, user_id, sweep_id=None):
+        if request.batch_size > 16:
+            raise InvalidParamsException("预计峰值内存超过训练内存预算")
+        job = TrainingJob(dataset_id=1, user_id=user_id, sweep_id=sweep_id, batch_size=request.batch_size)
+        session.add(job)
+        session.commit()
+        return job
+
+    monkeypatch.setattr(sweep_module.training_service, "get_usable_dataset", lambda *args: SimpleNamespace(user_id=1))
+    monkeypatch.setattr(sweep_module.training_service, "create_job", create_job)
+    service = SweepService()
+
+    with pytest.raises(InvalidParamsException):
+        await service.start_sweep(SweepRequest(dataset_id=1, search_space={"batch_size": [8, 16, 64]}), user_id=1)
+
+    with db_context() as session:
+        assert session.exec(select(TrainingJob)).all() == []
+        assert session.exec(select(TrainingSweep)).one().status == "failed"
+    assert service._schedulers == {}
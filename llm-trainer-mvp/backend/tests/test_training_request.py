@@ -0,0 +1,63 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import TrainingRequest
+
+
+def test_training_request_defaults():
+    """测试训练选项默认值"""
+    request = TrainingRequest(dataset_id=1)
+    assert request.gradient_accumulation_steps == 1
+    assert request.precision == "fp32"
+    assert request.gradient_checkpointing is False
+
+
+def test_training_request_accepts_bf16_and_accumulation():
+    """测试bf16精度和梯度累积"""
+    request = TrainingRequest(dataset_id=1, precision="bf16", gradient_accumulation_steps=16)
+    assert request.precision == "bf16"
+    assert request.gradient_accumulation_steps == 16
+
+
+@pytest.mark.parametrize("options", [
+    {"precision": "fp16"},
+    {"gradient_accumulation_steps": 0},
+    {"gradient_accumulation_steps": 65},
+])
+def test_training_request_rejects_invalid_options(options):
+    """测试非法训练选项被拒绝"""
+    with pytest.raises(ValidationError):
+        TrainingRequest(dataset_id=1, **options)
+
+
+def test_training_request_method():
+    """测试微调方式校验"""
+    assert TrainingRequest(dataset_id=1).method == "full"
+    assert TrainingRequest(dataset_id=1, method="lora", lora_rank=4).lora_rank == 4
+    with pytest.raises(ValidationError):
+        TrainingRequest(dataset_id=1, method="qlora")
+
+
+def test_training_request_warm_start():
+    """测试增量训练的初始化来源校验"""
+    request = TrainingRequest(dataset_id=1, parent_job_id=3, init_optimizer_state=True)
+    assert request.parent_job_id == 3
+    assert TrainingRequest(dataset_id=1, init_from_artifact=5).init_from_artifact == 5
+    with pytest.raises(ValidationError):
+        TrainingRequest(dataset_id=1, parent_job_id=3, init_from_artifact=5)
+    with pytest.raises(ValidationError):
+        TrainingRequest(dataset_id=1, init_optimizer_state=True)
+
+
+def test_training_request_distill_mode():
+    """测试蒸馏模式需要教师任务且不能与增量训练同时使用"""
+    request = TrainingRequest(dataset_id=1, mode="distill", teacher_job_id=2, student_model="distilbert-base-uncased")
+    assert request.distill_alpha == 0.5
+    with pytest.raises(ValidationError):
+        TrainingRequest(dataset_id=1, mode="distill")
+    with pytest.raises(ValidationError):
+        TrainingRequest(dataset_id=1, teacher_job_id=2)
+    with pytest.raises(ValidationError):
+        TrainingRequest(dataset_id=1, mode="distill", teacher_job_id=2, parent_job_id=3)
+    with pytest.raises(ValidationError):
+        TrainingRequest(dataset_id=1, mode="prune")
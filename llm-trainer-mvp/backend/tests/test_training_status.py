@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlmodel import Session
+
+from app.core.errors import TrainingNotFoundException
+from app.models import Dataset, TrainingJob
+from app.services import training_service as training_module
+from app.services.training_service import training_service
+
+
+@pytest.fixture
+def jobs(test_db_engine, monkeypatch):
+    @contextmanager
+    def db_context():
+        with Session(test_db_engine) as session:
+            yield session
+            session.commit()
+
+    monkeypatch.setattr(training_module, "get_db_context", db_context)
+    with db_context() as session:
+        session.add(Dataset(id=1, name="d", file_path="d.csv", user_id=1))
+        # 任务2由用户2用用户1的数据集创建（如管理员代为训练），权限以任务所属用户为准
+        session.add(TrainingJob(id=1, dataset_id=1, user_id=1))
+        session.add(TrainingJob(id=2, dataset_id=1, user_id=2))
+
+
+async def test_status_permission_follows_job_owner(jobs):
+    """测试训练状态按任务所属用户校验权限，与其他任务接口一致"""
+    assert (await training_service.get_training_status(2, user_id=2))["job_id"] == 2
+    with pytest.raises(TrainingNotFoundException):
+        await training_service.get_training_status(2, user_id=1)
+    with pytest.raises(TrainingNotFoundException):
+        await training_service.get_training_status(1, user_id=2)
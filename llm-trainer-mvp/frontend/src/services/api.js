@@ -61,9 +61,18 @@ const trainingService = {
     return handleResponse(axiosInstance.get(`/api/train/logs/${jobId}?lines=${lines}`));
   },
 
-  // 获取所有训练任务
+  // 分页获取训练任务，cursor传入上一页返回的next_cursor
+  getTrainingJobsPage({ status, datasetId, limit = 50, cursor } = {}) {
+    const params = { limit };
+    if (status) params.status = status;
+    if (datasetId) params.dataset_id = datasetId;
+    if (cursor) params.cursor = cursor;
+    return handleResponse(axiosInstance.get('/api/train/jobs', { params }));
+  },
+
+  // 获取最近的训练任务（第一页）
   getTrainingJobs() {
-    return handleResponse(axiosInstance.get('/api/train/jobs'));
+    return this.getTrainingJobsPage().then(page => page.items);
   }
 };
 